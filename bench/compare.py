@@ -0,0 +1,48 @@
+import argparse
+import json
+import sys
+
+
+def get_config_key(result):
+    return result['spec'], result['samples'], result['width'], result['height']
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('base_json', type=str)
+    parser.add_argument('head_json', type=str)
+    # a config regresses when its throughput drops or its peak rss grows by more than this fraction
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.base_json, 'r') as f:
+        base = json.load(f)
+    with open(args.head_json, 'r') as f:
+        head = json.load(f)
+    base_results = {get_config_key(result): result for result in base['results'] if not result.get('failed')}
+
+    n_regressions = 0
+    print(f'{"config":<32} {"base scenes/s":>14} {"head scenes/s":>14} {"speedup":>8} {"rss ratio":>10}')
+    for head_result in head['results']:
+        key = get_config_key(head_result)
+        if key not in base_results or head_result.get('failed'):
+            continue
+        base_result = base_results[key]
+        speedup = head_result['scenes_per_second'] / base_result['scenes_per_second']
+        rss_ratio = head_result['peak_rss'] / base_result['peak_rss']
+        is_regression = speedup < 1 - args.threshold or rss_ratio > 1 + args.threshold
+        n_regressions += int(is_regression)
+        config_name = f'{key[0]} {key[1]} {key[2]}x{key[3]}'
+        print(f'{config_name:<32} {base_result["scenes_per_second"]:>14.3f} {head_result["scenes_per_second"]:>14.3f}',
+              f'{speedup:>8.3f} {rss_ratio:>10.3f}', 'REGRESSION' if is_regression else '')
+        for mode, seconds in head_result['seconds_per_camera'].items():
+            if mode in base_result['seconds_per_camera']:
+                print(f'    {mode:<12} {base_result["seconds_per_camera"][mode]:>10.4f} s/camera',
+                      f'-> {seconds:>10.4f} s/camera')
+
+    print(base.get('commit'), '->', head.get('commit'), f'{n_regressions} regressions')
+    sys.exit(1 if n_regressions > 0 else 0)
+
+
+if __name__ == '__main__':
+    main()
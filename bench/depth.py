@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy
+
+# lib lives in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lib.depth
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', default=256, type=int)
+    parser.add_argument('--height', default=256, type=int)
+    parser.add_argument('--min_depth', default=0.1, type=float)
+    parser.add_argument('--max_depth', default=100.0, type=float)
+    parser.add_argument('--num_repeats', default=10, type=int)
+    args = parser.parse_args()
+
+    # log-uniform depths plus the background depth cycles writes for empty pixels
+    zs = numpy.exp(numpy.random.uniform(numpy.log(args.min_depth), numpy.log(args.max_depth),
+                                        (args.height, args.width))).astype(numpy.float32)
+    zs[0, :] = 1e10
+
+    print(f'{"format":<10} {"write (s)":>10} {"read (s)":>10} {"bytes":>10} {"max rel err":>12} {"max abs err":>12}')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filepath = os.path.join(temp_dir, 'depth')
+        for depth_format in lib.depth.DEPTH_FORMATS:
+            start_time = time.perf_counter()
+            for _ in range(args.num_repeats):
+                lib.depth.write_depth(filepath, zs, depth_format)
+            write_time = (time.perf_counter() - start_time) / args.num_repeats
+
+            start_time = time.perf_counter()
+            for _ in range(args.num_repeats):
+                decoded = lib.depth.read_depth(filepath, depth_format)
+            read_time = (time.perf_counter() - start_time) / args.num_repeats
+
+            size = os.path.getsize(filepath + lib.depth.get_depth_extension(depth_format))
+            is_foreground = zs < 1e6
+            error = numpy.abs(decoded[is_foreground] - zs[is_foreground])
+            print(f'{depth_format:<10} {write_time:>10.6f} {read_time:>10.6f} {size:>10}',
+                  f'{numpy.max(error / zs[is_foreground]):>12.3e} {numpy.max(error):>12.3e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy
+
+# the generators live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lib
+import bench.specs
+
+
+def get_dense_scene_data(args, num_objects):
+    return next(iter(bench.specs.get_dense_render_data(args, num_objects).scenes_data.values()))
+
+
+def run_size(num_objects, seed):
+    # generating and blending should both grow linearly with the number of objects
+    random.seed(seed)
+    numpy.random.seed(seed)
+    args = bench.specs.get_args(os.path.join(bench.specs.BENCH_DIR, 'properties.json'), 1, 'output/bench/renders')
+    start_time = time.time()
+    scene_data = get_dense_scene_data(args, num_objects)
+    result = {'num_objects': num_objects, 'generate_seconds': time.time() - start_time}
+
+    # every size starts from an empty scene
+    lib.blend.blended_scene_data = None
+    for stage, blend in (('scene', lambda: lib.blend.blend_scene(scene_data)),
+                         ('segmentation', lib.blend_segmentation.blend_segmentation),
+                         ('nocs', lambda: lib.blend_nocs.blend_nocs({object_name: object_data.shape_pair[0]
+                                                                     for object_name, object_data
+                                                                     in scene_data.objects_data.items()}))):
+        start_time = time.time()
+        blend()
+        result[f'{stage}_seconds'] = time.time() - start_time
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_objects', type=int, default=(10, 100, 500), nargs='+')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--results_json', type=str, default=None)
+    # blender passes the script arguments after '--'
+    args = parser.parse_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else None)
+
+    results = []
+    for num_objects in args.num_objects:
+        result = run_size(num_objects, args.seed)
+        results.append(result)
+        seconds = {key[:-len('_seconds')]: value for key, value in result.items() if key.endswith('_seconds')}
+        print(f'{num_objects:>6} objects:', ', '.join([f'{stage} {value:.3f} s' for stage, value in seconds.items()]),
+              f'({sum(seconds.values()) / num_objects * 1e3:.3f} ms per object)')
+
+    if args.results_json is not None:
+        with open(args.results_json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
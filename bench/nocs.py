@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy
+
+# lib lives in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lib.blend_nocs
+
+try:
+    import bpy
+except ImportError as e:
+    print(e)
+
+
+def get_vertex_color_layer_loops(obj):
+    # the per-loop implementation lib.blend_nocs.get_vertex_color_layer used to have, kept as the baseline
+    vertex_color_layer = obj.data.vertex_colors.new()
+
+    min_coord = numpy.zeros(3)
+    max_coord = numpy.zeros(3)
+    for loop_index, loop in enumerate(obj.data.loops):
+        vertex_coord = obj.data.vertices[loop.vertex_index].co
+        max_coord = numpy.maximum(max_coord, vertex_coord)
+        min_coord = numpy.minimum(min_coord, vertex_coord)
+
+    if numpy.sum(max_coord - min_coord == 0) > 0:
+        return None
+
+    for loop_index, loop in enumerate(obj.data.loops):
+        loop_vert_index = loop.vertex_index
+
+        color = (numpy.array(obj.data.vertices[loop_vert_index].co) - min_coord) / (max_coord - min_coord)
+        vertex_color_layer.data[loop_index].color[:3] = color
+        vertex_color_layer.data[loop_index].color[3] = 1
+
+    return vertex_color_layer
+
+
+def remove_new_layers(obj, layer_names):
+    # a mesh holds at most 8 vertex colour layers, so every repeat removes the one it made
+    for vertex_color_layer in list(obj.data.vertex_colors):
+        if vertex_color_layer.name not in layer_names:
+            obj.data.vertex_colors.remove(vertex_color_layer)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shape_dir', default='data/shapes')
+    parser.add_argument('--num_repeats', default=3, type=int)
+    parser.add_argument('--skip_loops', action='store_true')
+    # blender passes the script arguments after '--'
+    args = parser.parse_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else None)
+
+    bpy.ops.wm.read_factory_settings()
+    print(f'{"shape":<32} {"loops":>10} {"loops (s)":>12} {"foreach (s)":>12} {"speedup":>10}')
+    for dir_entry in sorted(os.scandir(args.shape_dir), key=lambda dir_entry: dir_entry.name):
+        if not dir_entry.name.endswith('.blend'):
+            continue
+        shape_name = os.path.splitext(dir_entry.name)[0]
+        bpy.ops.wm.append(filename=os.path.join(args.shape_dir, dir_entry.name, 'Object', shape_name))
+        obj = bpy.data.objects[shape_name]
+        if obj.type != 'MESH':
+            bpy.data.objects.remove(obj)
+            continue
+
+        layer_names = [vertex_color_layer.name for vertex_color_layer in obj.data.vertex_colors]
+        loops_time = numpy.nan
+        if not args.skip_loops:
+            loops_time = 0.0
+            for _ in range(args.num_repeats):
+                start_time = time.perf_counter()
+                get_vertex_color_layer_loops(obj)
+                loops_time += (time.perf_counter() - start_time) / args.num_repeats
+                remove_new_layers(obj, layer_names)
+
+        foreach_time = 0.0
+        for _ in range(args.num_repeats):
+            lib.blend_nocs.nocs_colors.clear()
+            start_time = time.perf_counter()
+            lib.blend_nocs.get_vertex_color_layer(obj, lib.blend_nocs.NOCS_LAYER_NAME)
+            foreach_time += (time.perf_counter() - start_time) / args.num_repeats
+            remove_new_layers(obj, layer_names)
+
+        print(f'{shape_name:<32} {len(obj.data.loops):>10} {loops_time:>12.6f} {foreach_time:>12.6f}',
+              f'{loops_time / foreach_time:>10.1f}')
+        bpy.data.objects.remove(obj)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# the generators live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lib
+import bench.specs
+
+
+def get_configs(spec_names, samples, resolutions):
+    return [{'spec': spec_name, 'samples': n_samples, 'width': width, 'height': height}
+            for spec_name in spec_names
+            for n_samples in samples
+            for width, height in resolutions]
+
+
+def run_config(config, output_dir, threads):
+    render_data = bench.specs.get_spec(config['spec'], output_dir)
+    render_data.name = f'{config["spec"]}_{config["samples"]}_{config["width"]}x{config["height"]}'
+    render_data.render_num_samples = config['samples']
+    render_data.width = config['width']
+    render_data.height = config['height']
+    render_data.device_type = 'CPU'
+
+    lib.profile.enable()
+    lib.profile.clear()
+    start_time = time.time()
+    lib.blend.blend_render(render_data, True, threads)
+    seconds = time.time() - start_time
+
+    # seconds per camera per mode count every render and write stage attributed to that mode
+    mode_seconds = {}
+    mode_cameras = {}
+    for event in lib.profile.events:
+        if event['stage'] in lib.profile.RENDER_STAGES and 'camera' in event:
+            mode_seconds[event['mode']] = mode_seconds.get(event['mode'], 0.0) + event['duration']
+            mode_cameras.setdefault(event['mode'], set()).add((event['scene'], event['camera']))
+
+    n_scenes = len(render_data.scenes_data)
+    n_cameras = sum([len(scene_data.cameras_data) for scene_data in render_data.scenes_data.values()])
+    return {
+        **config,
+        'n_scenes': n_scenes,
+        'n_cameras': n_cameras,
+        'seconds': seconds,
+        'scenes_per_second': n_scenes / seconds,
+        'seconds_per_camera': {mode: mode_seconds[mode] / len(mode_cameras[mode]) for mode in mode_seconds},
+        'stages': lib.profile.get_summary(),
+        # kilobytes on linux, bytes on macos
+        'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def get_config_command(config_path, result_path, args):
+    script = os.path.abspath(__file__)
+    script_args = ['--config_json', config_path, '--result_json', result_path, '--output_dir', args.output_dir]
+    if args.threads is not None:
+        script_args += ['--threads', str(args.threads)]
+    if args.blender is None:
+        return [sys.executable, script] + script_args
+    return [args.blender, '--background', '--factory-startup', '--python', script, '--'] + script_args
+
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--specs', type=str, default=bench.specs.SPEC_NAMES, nargs='+',
+                        choices=bench.specs.SPEC_NAMES)
+    parser.add_argument('--samples', type=int, default=(16, 64), nargs='+')
+    parser.add_argument('--resolutions', type=str, default=('128x128', '256x256'), nargs='+')
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--blender', type=str, default=None)
+    parser.add_argument('--output_dir', type=str, default='output/bench/renders')
+    parser.add_argument('--results_json', type=str, default=None)
+    # set by the driver: every config runs in its own process so peak rss belongs to that config alone
+    parser.add_argument('--config_json', type=str, default=None)
+    parser.add_argument('--result_json', type=str, default=None)
+    args = parser.parse_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else None)
+
+    if args.config_json is not None:
+        with open(args.config_json, 'r') as f:
+            config = json.load(f)
+        result = run_config(config, args.output_dir, args.threads)
+        with open(args.result_json, 'w') as f:
+            json.dump(result, f, indent=2)
+        return
+
+    resolutions = [tuple(int(size) for size in resolution.split('x')) for resolution in args.resolutions]
+    configs = get_configs(args.specs, args.samples, resolutions)
+    results = []
+    with tempfile.TemporaryDirectory(prefix='bench_') as temp_dir:
+        for i_config, config in enumerate(configs):
+            config_path = os.path.join(temp_dir, f'config_{i_config}.json')
+            result_path = os.path.join(temp_dir, f'result_{i_config}.json')
+            with open(config_path, 'w') as f:
+                json.dump(config, f)
+            if subprocess.run(get_config_command(config_path, result_path, args)).returncode != 0:
+                print('failed', config)
+                results.append({**config, 'failed': True})
+                continue
+            with open(result_path, 'r') as f:
+                result = json.load(f)
+            print(f'{result["spec"]:<14} {result["samples"]:>5} samples {result["width"]}x{result["height"]}:',
+                  f'{result["scenes_per_second"]:.3f} scenes/s, peak rss {result["peak_rss"]}')
+            results.append(result)
+
+    commit = get_commit()
+    results_json = args.results_json or os.path.join('output', 'bench', f'{commit or "results"}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(results_json)), exist_ok=True)
+    with open(results_json, 'w') as f:
+        json.dump({'commit': commit, 'machine': platform.machine(), 'processor': platform.processor(),
+                   'cpu_count': os.cpu_count(), 'python': platform.python_version(), 'results': results}, f, indent=2)
+    print('wrote', results_json)
+
+
+if __name__ == '__main__':
+    main()
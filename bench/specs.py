@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import random
+import sys
+
+import numpy
+
+# the generators live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lib
+import lib.generate
+import make_caps
+import make_clevr
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SPEC_NAMES = ('clevr_single', 'caps_rig', 'clevr_dense')
+
+
+def get_args(properties_json, num_scenes, output_dir):
+    return argparse.Namespace(
+        base_scene_blendfile=None, properties_json=properties_json, shape_dir='data/shapes',
+        material_dir='data/materials', num_scenes=num_scenes, save_blend=False, output_dir=output_dir,
+        device_type='CPU', width=256, height=256, render_num_samples=64, render_min_bounces=8, render_max_bounces=8,
+        render_tile_size=256, modes=('rgba', 'nocs', 'depth'))
+
+
+def get_dense_render_data(args, num_objects):
+    render_data = lib.data.render_data.from_args('clevr_dense', args)
+    properties = lib.generate.load_properties(args.properties_json)
+    pose_range = numpy.array(properties['pose_range'])
+    objects = lib.generate.sample_objects(properties, args.shape_dir, args.num_scenes * num_objects, pose_range[:, 0],
+                                          pose_range[:, 1])
+    cameras_data = lib.generate.get_cameras_data(8, [(60, 0, 0)])
+    for scene_i in range(args.num_scenes):
+        scene_data = lib.generate.get_scene_data(f'{scene_i:06d}', args, properties, scene_i == 0,
+                                                 objects[num_objects * scene_i:num_objects * (scene_i + 1)],
+                                                 cameras_data)
+        render_data.scenes_data[scene_data.name] = scene_data
+    return render_data
+
+
+def get_spec(spec_name, output_dir, seed=0):
+    # every spec is generated from a fixed seed so results are comparable between commits
+    random.seed(seed)
+    numpy.random.seed(seed)
+    properties_json = os.path.join(BENCH_DIR, 'properties.json')
+    if spec_name == 'clevr_single':
+        render_data = make_clevr.get_render_data('clevr_single', get_args(properties_json, 8, output_dir))
+    elif spec_name == 'caps_rig':
+        # make_caps renders three stages of num_scenes scenes with 18 cameras each
+        render_data = make_caps.get_renders_data(['caps_rig'], get_args('data/properties/cap_properties.json', 1,
+                                                                        output_dir))[0]
+    elif spec_name == 'clevr_dense':
+        render_data = get_dense_render_data(get_args(properties_json, 4, output_dir), 12)
+    else:
+        raise Exception('unknown spec', spec_name)
+    return render_data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--specs', type=str, default=SPEC_NAMES, nargs='+', choices=SPEC_NAMES)
+    parser.add_argument('--specs_dir', type=str, default='output/bench/specs')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else None)
+
+    os.makedirs(args.specs_dir, exist_ok=True)
+    for spec_name in args.specs:
+        render_data = get_spec(spec_name, 'output/bench/renders', args.seed)
+        with open(os.path.join(args.specs_dir, f'{spec_name}.json'), 'w') as f:
+            json.dump(lib.data.render_data.to_object(render_data), f, indent=2)
+        print(spec_name, len(render_data.scenes_data), 'scenes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy
+
+import lib
+
+
+def get_study_render_data(render_data, num_scenes, num_cameras):
+    # a handful of cameras from the first scenes is enough to see where the error stops improving
+    study_render_data = lib.farm.get_shard_render_data(render_data, 0, num_scenes)
+    study_render_data.modes = ['rgba']
+    study_render_data.single_pass = False
+    study_render_data.adaptive_threshold = None
+    study_render_data.denoiser = None
+    study_render_data.frame_time_limit = None
+    study_render_data.render_time_budget = None
+    # trajectory shards are read only, the study scenes are expanded into a dict
+    scenes_data = {}
+    for scene_name, scene_data in study_render_data.scenes_data.items():
+        scene_data = copy.copy(scene_data)
+        camera_names = list(scene_data.cameras_data)
+        camera_names = [camera_names[i_camera] for i_camera in
+                        numpy.unique(numpy.linspace(0, len(camera_names) - 1, num_cameras).round().astype(int))]
+        scene_data.cameras_data = {camera_name: scene_data.cameras_data[camera_name] for camera_name in camera_names}
+        scenes_data[scene_name] = scene_data
+    study_render_data.scenes_data = scenes_data
+    return study_render_data
+
+
+def render(render_data, output_dir, n_samples, n_bounces):
+    render_data = copy.copy(render_data)
+    render_data.output_dir = output_dir
+    render_data.render_num_samples = n_samples
+    render_data.render_min_bounces = min(render_data.render_min_bounces, n_bounces)
+    render_data.render_max_bounces = n_bounces
+    start_time = time.time()
+    lib.blend.blend_render(render_data)
+    return render_data, time.time() - start_time
+
+
+def compare(reference_render_data, test_render_data):
+    psnrs = []
+    ssims = []
+    for scene_name, scene_data in reference_render_data.scenes_data.items():
+        for camera_name in scene_data.cameras_data:
+            filename = lib.manifest.get_output_file(reference_render_data, 'rgba', scene_name, camera_name)
+            reference = cv2.imread(os.path.join(reference_render_data.output_dir, reference_render_data.name,
+                                                filename), cv2.IMREAD_UNCHANGED)
+            test = cv2.imread(os.path.join(test_render_data.output_dir, test_render_data.name, filename),
+                              cv2.IMREAD_UNCHANGED)
+            psnrs.append(lib.quality.get_psnr(reference, test))
+            ssims.append(lib.quality.get_ssim(reference, test))
+    return float(numpy.mean(psnrs)), float(numpy.min(psnrs)), float(numpy.mean(ssims)), float(numpy.min(ssims))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--render_json', type=str, required=True)
+    parser.add_argument('--output_dir', type=str, default='./output/convergence/')
+    parser.add_argument('--num_scenes', type=int, default=1)
+    parser.add_argument('--num_cameras', type=int, default=3)
+    parser.add_argument('--samples', type=int, default=(16, 32, 64, 128, 256, 512), nargs='+')
+    parser.add_argument('--bounces', type=int, default=(2, 4, 8), nargs='+')
+    parser.add_argument('--reference_samples', type=int, default=4096)
+    parser.add_argument('--reference_bounces', type=int, default=16)
+    # a setting meets the target when the worst camera does
+    parser.add_argument('--target_psnr', type=float, default=40.0)
+    parser.add_argument('--target_ssim', type=float, default=0.98)
+    parser.add_argument('--device_type', type=str, default=None, choices=('CPU', 'CUDA', 'OPTIX'))
+    # blender passes the script arguments after '--'
+    args = parser.parse_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else None)
+
+    with open(args.render_json, 'r') as f:
+        render_data = lib.data.render_data.from_object(json.load(f), lib.data.render_data.RenderData)
+    if args.device_type is not None:
+        render_data.device_type = args.device_type
+    render_data = get_study_render_data(render_data, args.num_scenes, args.num_cameras)
+
+    reference_render_data, reference_time = render(render_data, os.path.join(args.output_dir, 'reference'),
+                                                   args.reference_samples, args.reference_bounces)
+    print(f'reference: {args.reference_samples} samples, {args.reference_bounces} bounces,',
+          f'{reference_time:.3f} seconds')
+
+    results = []
+    for n_bounces in args.bounces:
+        for n_samples in args.samples:
+            test_render_data, test_time = render(render_data, os.path.join(args.output_dir,
+                                                                           f'{n_samples}_{n_bounces}'),
+                                                 n_samples, n_bounces)
+            mean_psnr, min_psnr, mean_ssim, min_ssim = compare(reference_render_data, test_render_data)
+            results.append({'samples': n_samples, 'bounces': n_bounces, 'seconds': test_time,
+                            'mean_psnr': mean_psnr, 'min_psnr': min_psnr, 'mean_ssim': mean_ssim, 'min_ssim': min_ssim,
+                            'meets_target': min_psnr >= args.target_psnr and min_ssim >= args.target_ssim})
+            print(f'{n_samples:>6} samples {n_bounces:>3} bounces: {test_time:>9.3f} seconds,',
+                  f'psnr {mean_psnr:.2f} (min {min_psnr:.2f}), ssim {mean_ssim:.4f} (min {min_ssim:.4f})')
+
+    passing_results = [result for result in results if result['meets_target']]
+    recommendation = min(passing_results, key=lambda result: result['seconds']) \
+        if len(passing_results) > 0 else None
+    if recommendation is None:
+        print('no setting meets psnr', args.target_psnr, 'and ssim', args.target_ssim)
+    else:
+        print(f'recommended: --render_num_samples {recommendation["samples"]}',
+              f'--render_max_bounces {recommendation["bounces"]} ({recommendation["seconds"]:.3f} seconds)')
+
+    with open(os.path.join(args.output_dir, f'{render_data.name}_convergence.json'), 'w') as f:
+        json.dump({'reference_samples': args.reference_samples, 'reference_bounces': args.reference_bounces,
+                   'reference_time': reference_time, 'target_psnr': args.target_psnr, 'target_ssim': args.target_ssim,
+                   'results': results, 'recommendation': recommendation}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import json
+import os
+
+import lib
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--renders_dir', type=str, default='output/caps_bc_2step')
+    parser.add_argument('--render_json', type=str, default=None)
+    parser.add_argument('--cost_model', type=str, default=None)
+    parser.add_argument('--num_workers', type=int, default=1)
+    # fits a cost model to the profiles of already rendered specs and writes it to this path
+    parser.add_argument('--calibrate', type=str, default=None)
+    # the overrides render.py gets, for estimates and for calibrating on renders that ran with them
+    lib.data.render_data.add_override_arguments(parser, {'depth_format': lib.depth.DEPTH_FORMATS,
+                                                         'segmentation_format': lib.segmentation.SEGMENTATION_FORMATS})
+    args = parser.parse_args()
+    overrides = lib.data.render_data.get_overrides(args)
+
+    if args.render_json is not None:
+        render_paths = [args.render_json]
+    else:
+        render_paths = sorted([dir_entry.path for dir_entry in os.scandir(args.renders_dir)
+                               if dir_entry.name.endswith('.json')])
+
+    if args.calibrate is not None:
+        cost_model = lib.cost.calibrate(render_paths, overrides)
+        with open(args.calibrate, 'w') as f:
+            json.dump(cost_model, f, indent=2)
+        print('calibrated on', cost_model['n_scenes'], 'scenes and', cost_model['n_cameras'], 'cameras:',
+              json.dumps(cost_model['modes']))
+        return
+
+    cost_model = lib.cost.load_cost_model(args.cost_model)
+    render_costs = []
+    for render_path in render_paths:
+        with open(render_path, 'r') as f:
+            render_data = lib.data.render_data.from_object(json.load(f), lib.data.render_data.RenderData)
+        lib.data.render_data.set_overrides(render_data, overrides)
+        scene_costs = lib.cost.get_scene_costs(render_data, cost_model)
+        render_costs.append(sum(scene_costs))
+        print(f'{render_data.name}: {len(scene_costs)} scenes, {sum(scene_costs):.1f} seconds')
+    print(f'total {sum(render_costs):.1f} seconds,',
+          f'{lib.cost.get_makespan(sorted(render_costs, reverse=True), args.num_workers):.1f} seconds on',
+          args.num_workers, 'workers')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import os
+
+import numpy
+
+try:
+    import bpy
+except ImportError as e:
+    print(e)
+
+
+def export_mesh(shape_dir, shape_name, meshes_dir):
+    bpy.ops.wm.append(filename=os.path.join(shape_dir, f'{shape_name}.blend', 'Object', shape_name))
+    obj = bpy.data.objects[shape_name]
+
+    mesh = obj.data
+    mesh.calc_loop_triangles()
+    vertices = numpy.zeros(len(mesh.vertices) * 3, dtype=numpy.float32)
+    mesh.vertices.foreach_get('co', vertices)
+    triangles = numpy.zeros(len(mesh.loop_triangles) * 3, dtype=numpy.int32)
+    mesh.loop_triangles.foreach_get('vertices', triangles)
+
+    numpy.savez(os.path.join(meshes_dir, f'{shape_name}.npz'), vertices=vertices.reshape(-1, 3),
+                triangles=triangles.reshape(-1, 3), scale=numpy.array(obj.scale))
+    bpy.data.objects.remove(obj)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shape_dir', default='data/shapes')
+    parser.add_argument('--meshes_dir', default='data/meshes')
+    args = parser.parse_args()
+
+    os.makedirs(args.meshes_dir, exist_ok=True)
+    bpy.ops.wm.read_factory_settings()
+    for dir_entry in os.scandir(args.shape_dir):
+        if dir_entry.name.endswith('.blend'):
+            export_mesh(args.shape_dir, os.path.splitext(dir_entry.name)[0], args.meshes_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
 import lib.data
 import lib.blend
+import lib.farm
 import lib.dataset
\ No newline at end of file
@@ -0,0 +1,69 @@
+import os
+
+try:
+    import bpy
+except ImportError as e:
+    print(e)
+
+
+TEMPLATE_PREFIX = 'asset.'
+
+# datablock names of everything loaded once per worker, validated against bpy.data on every lookup
+shapes = {}
+node_groups = {}
+counters = {'shape_hits': 0, 'shape_misses': 0, 'node_group_hits': 0, 'node_group_misses': 0}
+
+
+def is_template(obj):
+    return obj.name.startswith(TEMPLATE_PREFIX)
+
+
+def load_shape(shape_path):
+    template_name = shapes.get(shape_path)
+    if template_name is not None and template_name in bpy.data.objects:
+        counters['shape_hits'] += 1
+        return bpy.data.objects[template_name]
+    counters['shape_misses'] += 1
+
+    # shape paths look like <shape_dir>/<shape>.blend/Object/<shape>
+    blend_path = os.path.dirname(os.path.dirname(shape_path))
+    object_name = os.path.basename(shape_path)
+    with bpy.data.libraries.load(blend_path, link=False) as (data_from, data_to):
+        data_to.objects = [object_name]
+    template = data_to.objects[0]
+    template.name = f'{TEMPLATE_PREFIX}{object_name}'
+    template.use_fake_user = True
+    template.data.use_fake_user = True
+
+    shapes[shape_path] = template.name
+    return template
+
+
+def load_node_group(material_path):
+    node_group_name = node_groups.get(material_path)
+    if node_group_name is not None and node_group_name in bpy.data.node_groups:
+        counters['node_group_hits'] += 1
+        return bpy.data.node_groups[node_group_name]
+    counters['node_group_misses'] += 1
+
+    # material paths look like <material_dir>/<material>.blend/NodeTree/<material>
+    blend_path = os.path.dirname(os.path.dirname(material_path))
+    node_group_name = os.path.basename(material_path)
+    with bpy.data.libraries.load(blend_path, link=False) as (data_from, data_to):
+        data_to.node_groups = [node_group_name]
+    node_group = data_to.node_groups[0]
+    node_group.use_fake_user = True
+
+    node_groups[material_path] = node_group.name
+    return node_group
+
+
+def instantiate_shape(shape_path, name):
+    template = load_shape(shape_path)
+    obj = template.copy()
+    obj.data = template.data.copy()
+    obj.use_fake_user = False
+    obj.data.use_fake_user = False
+    obj.name = name
+    bpy.context.scene.collection.objects.link(obj)
+    return obj
@@ -1,14 +1,26 @@
+import functools
+import json
 import shutil
+import time
 
 import numpy
 
 import lib.data
+import lib.assets
 import lib.blend_nocs
+import lib.blend_passes
 import lib.blend_segmentation
+import lib.depth
+import lib.manifest
+import lib.memory
+import lib.profile
+import lib.quality
+import lib.render_cache
+import lib.segmentation
+import lib.writer
 import os
 import numpy as np
 import cv2
-import OpenEXR
 
 try:
     import bpy
@@ -17,80 +29,433 @@ except ImportError as e:
     print(e)
 
 
-def blend_render(render_data: lib.data.render_data.RenderData):
+is_factory_reset = False
+# the scene data currently in bpy.data, which the next scene is diffed against
+blended_scene_data = None
+device_types = set()
+
+
+def clean_render_dir(render_data: lib.data.render_data.RenderData):
     output_dir = os.path.abspath(render_data.output_dir)
     os.makedirs(f'{output_dir}/{render_data.name}', exist_ok=True)
     shutil.rmtree(f'{output_dir}/{render_data.name}')
     os.makedirs(f'{output_dir}/{render_data.name}', exist_ok=True)
-    for mode in render_data.modes:
-        is_mode_setup = False
-        for scene_name, scene_data in render_data.scenes_data.items():
-            blend_scene(scene_data)
-
-            bpy.context.scene.render.engine = "CYCLES"
-            bpy.context.scene.render.resolution_x = render_data.width
-            bpy.context.scene.render.resolution_y = render_data.height
-            bpy.context.scene.render.resolution_percentage = 100
-            bpy.context.scene.render.tile_x = render_data.render_tile_size
-            bpy.context.scene.render.tile_y = render_data.render_tile_size
-
-            if render_data.device_type == 'CPU':
-                bpy.context.scene.cycles.device = 'CPU'
-            elif render_data.device_type == 'CUDA':
-                bpy.context.preferences.addons['cycles'].preferences.get_devices()
-                bpy.context.preferences.addons['cycles'].preferences.compute_device_type = 'CUDA'
-                bpy.context.scene.cycles.device = 'GPU'
-            elif render_data.device_type == 'OPTIX':
-                bpy.context.preferences.addons['cycles'].preferences.get_devices()
-                bpy.context.preferences.addons['cycles'].preferences.compute_device_type = 'OPTIX'
-                bpy.context.scene.cycles.device = 'GPU'
-
-            bpy.data.worlds['World'].cycles.sample_as_light = True
-            bpy.context.scene.cycles.blur_glossy = 2.0
-            bpy.context.scene.cycles.transparent_min_bounces = render_data.render_min_bounces
-            bpy.context.scene.cycles.transparent_max_bounces = render_data.render_max_bounces
-
-            if not is_mode_setup:
-                is_mode_setup = True
+
+
+def get_materials():
+    return {obj.name: list(obj.data.materials) for obj in bpy.data.objects
+            if obj.type == 'MESH' and not lib.assets.is_template(obj)}
+
+
+def set_materials(objects_materials):
+    for object_name, materials in objects_materials.items():
+        obj = bpy.data.objects[object_name]
+        obj.data.materials.clear()
+        for material in materials:
+            obj.data.materials.append(material)
+        if len(materials) > 0:
+            obj.active_material = materials[0]
+
+
+def blend_engine(render_data: lib.data.render_data.RenderData, mode):
+    engine = render_data.mode_engines.get(mode, 'CYCLES')
+    bpy.context.scene.render.engine = engine
+    if engine == 'BLENDER_EEVEE':
+        bpy.context.scene.eevee.taa_render_samples = render_data.render_num_samples if mode == 'rgba' else 1
+        bpy.context.scene.eevee.use_bloom = False
+        bpy.context.scene.eevee.use_gtao = False
+        bpy.context.scene.eevee.use_ssr = False
+    elif engine == 'BLENDER_WORKBENCH':
+        # flat, unlit colours: material colours for segmentation and the active vertex colours for nocs
+        bpy.context.scene.display.render_aa = 'OFF'
+        bpy.context.scene.display.shading.light = 'FLAT'
+        bpy.context.scene.display.shading.color_type = 'VERTEX' if mode == 'nocs' else 'MATERIAL'
+        bpy.context.scene.display.shading.show_object_outline = False
+        bpy.context.scene.display.shading.show_cavity = False
+        bpy.context.scene.display.shading.show_specular_highlight = False
+        bpy.context.scene.display.shading.show_shadows = False
+
+
+def check_engines(render_data: lib.data.render_data.RenderData):
+    # object indices only reach the IndexOB pass under cycles, and single pass reads every pass from the rgba render
+    if 'segmentation' in render_data.modes and render_data.segmentation_format == 'id' and \
+            render_data.mode_engines.get('segmentation', 'CYCLES') != 'CYCLES':
+        raise Exception('id segmentation needs the CYCLES engine', render_data.mode_engines['segmentation'])
+    if render_data.single_pass and render_data.mode_engines.get('rgba', 'CYCLES') != 'CYCLES':
+        raise Exception('single pass needs the CYCLES engine', render_data.mode_engines['rgba'])
+
+
+STANDARD_VIEW_SETTINGS = {'view_transform': 'Standard', 'look': 'None', 'exposure': 0.0, 'gamma': 1.0}
+
+
+def blend_view_settings(mode):
+    # nocs and segmentation pngs get the plain srgb curve, which single pass and the rasterizer apply with
+    # lib.color.linear_to_srgb. rgba keeps the view settings of the scene, stored on it before they first change
+    scene = bpy.context.scene
+    if 'rgba_view_settings' not in scene:
+        scene['rgba_view_settings'] = {name: getattr(scene.view_settings, name) for name in STANDARD_VIEW_SETTINGS}
+    view_settings = scene['rgba_view_settings'] if mode == 'rgba' else STANDARD_VIEW_SETTINGS
+    for name in STANDARD_VIEW_SETTINGS:
+        setattr(scene.view_settings, name, view_settings[name])
+
+
+# modes read from the compositor viewer instead of written by blender
+def is_viewer_mode(render_data: lib.data.render_data.RenderData, mode):
+    return mode == 'depth' or (mode == 'segmentation' and render_data.segmentation_format == 'id')
+
+
+def blend_mode(render_data: lib.data.render_data.RenderData, scene_data: lib.data.scene_data.SceneData, mode,
+               mode_materials):
+    blend_engine(render_data, mode)
+    blend_view_settings(mode)
+    if mode == 'rgba':
+        bpy.context.scene.cycles.samples = render_data.render_num_samples
+        bpy.context.scene.render.image_settings.file_format = 'PNG'
+    elif is_viewer_mode(render_data, mode):
+        bpy.context.scene.cycles.samples = 1
+        lib.blend_passes.blend_viewer('Depth' if mode == 'depth' else 'IndexOB')
+    elif mode in ('nocs', 'segmentation'):
+        bpy.context.scene.cycles.samples = 1
+        bpy.context.scene.render.image_settings.file_format = 'PNG'
+
+    # adaptive sampling and denoising only make sense for the path traced colours
+    bpy.context.scene.cycles.use_adaptive_sampling = mode == 'rgba' and render_data.adaptive_threshold is not None
+    if bpy.context.scene.cycles.use_adaptive_sampling:
+        bpy.context.scene.cycles.adaptive_threshold = render_data.adaptive_threshold
+        bpy.context.scene.cycles.adaptive_min_samples = render_data.adaptive_min_samples
+    bpy.context.scene.cycles.use_denoising = mode == 'rgba' and render_data.denoiser is not None
+    if bpy.context.scene.cycles.use_denoising:
+        bpy.context.scene.cycles.denoiser = render_data.denoiser
+    if mode != 'rgba' and hasattr(bpy.context.scene.cycles, 'time_limit'):
+        bpy.context.scene.cycles.time_limit = 0
+
+    # mode materials only replace the material slots, so every mode can be restored without rebuilding the scene
+    if mode in mode_materials:
+        with lib.profile.stage('material', mode=mode, scene=scene_data.name):
+            set_materials(mode_materials[mode])
+    elif mode == 'nocs':
+        with lib.profile.stage('nocs', mode=mode, scene=scene_data.name):
+            lib.blend_nocs.blend_nocs({object_name: object_data.shape_pair[0]
+                                       for object_name, object_data in scene_data.objects_data.items()})
+            mode_materials[mode] = get_materials()
+    elif mode == 'segmentation' and render_data.segmentation_format == 'rgba':
+        with lib.profile.stage('material', mode=mode, scene=scene_data.name):
+            lib.blend_segmentation.blend_segmentation()
+            mode_materials[mode] = get_materials()
+    else:
+        with lib.profile.stage('material', mode=mode, scene=scene_data.name):
+            set_materials(mode_materials['rgba'])
+
+
+def get_time_limit(render_data: lib.data.render_data.RenderData, rgba_seconds, n_rgba_frames_left):
+    time_limits = []
+    if render_data.frame_time_limit is not None:
+        time_limits.append(render_data.frame_time_limit)
+    if render_data.render_time_budget is not None:
+        # the remaining budget is spread evenly over the frames that are left
+        time_limits.append(max(render_data.render_time_budget - rgba_seconds, 0.0) / max(n_rgba_frames_left, 1))
+    return min(time_limits) if len(time_limits) > 0 else None
+
+
+def blend_time_limit(render_data: lib.data.render_data.RenderData, time_limit, seconds_per_sample):
+    if hasattr(bpy.context.scene.cycles, 'time_limit'):
+        bpy.context.scene.cycles.time_limit = 0 if time_limit is None else max(time_limit, 1e-3)
+        return
+
+    # cycles without a time limit gets as many samples as the last frames suggest fit in the limit
+    if time_limit is None or seconds_per_sample is None:
+        bpy.context.scene.cycles.samples = render_data.render_num_samples
+    else:
+        bpy.context.scene.cycles.samples = int(numpy.clip(time_limit / seconds_per_sample,
+                                                          max(render_data.adaptive_min_samples, 1),
+                                                          render_data.render_num_samples))
+
+
+def get_rgba_metadata(start_time):
+    return {'samples': lib.profile.render_times.get('samples', bpy.context.scene.cycles.samples),
+            'seconds': time.time() - start_time}
+
+
+def write_rgba_metadata(filepath, metadata):
+    metadata['noise'] = lib.quality.estimate_noise(cv2.imread(f'{filepath}.png', cv2.IMREAD_UNCHANGED))
+
+
+def write_passes(render_data: lib.data.render_data.RenderData, passes_file, filepaths):
+    passes = lib.blend_passes.read_passes(passes_file, render_data.height, render_data.width)
+    os.remove(passes_file)
+    for mode, filepath in filepaths.items():
+        if mode == 'depth':
+            lib.depth.write_depth(filepath, passes[mode], render_data.depth_format)
+        elif mode == 'segmentation' and render_data.segmentation_format == 'id':
+            lib.segmentation.write_segmentation_ids(filepath, passes['segmentation_ids'])
+        elif mode != 'rgba':
+            cv2.imwrite(f'{filepath}.png', cv2.cvtColor(passes[mode], cv2.COLOR_RGBA2BGRA))
+
+
+# the segmentation id table goes along as an hdf5 attribute, so readers need no manifest
+def get_h5_outputs(render_data: lib.data.render_data.RenderData, scene_name, camera_name, modes, metadata=None):
+    output_dir = os.path.abspath(render_data.output_dir)
+    return [(f'{render_data.name}/{scene_name}/{camera_name}/{mode}',
+             os.path.join(output_dir, render_data.name,
+                          lib.manifest.get_output_file(render_data, mode, scene_name, camera_name)),
+             {'ids': json.dumps(metadata[mode]['ids'])} if 'ids' in (metadata or {}).get(mode, {}) else {})
+            for mode in modes]
+
+
+def set_outputs(render_data: lib.data.render_data.RenderData, scene_name, scene_manifest, camera_name, modes,
+                output_hashes, on_camera=None, metadata=None):
+    for mode in modes:
+        output_file = lib.manifest.get_output_file(render_data, mode, scene_name, camera_name)
+        output_metadata = (metadata or {}).get(mode, {})
+        scene_manifest[lib.manifest.get_output_key(mode, scene_name, camera_name)] = {
+            'hash': output_hashes[(mode, camera_name)],
+            'file': output_file,
+            **output_metadata,
+        }
+        lib.render_cache.store(output_hashes[(mode, camera_name)],
+                               os.path.join(os.path.abspath(render_data.output_dir), render_data.name, output_file),
+                               output_metadata)
+    lib.manifest.write_scene_manifest(render_data, scene_name, scene_manifest)
+    if on_camera is not None:
+        on_camera(scene_name, camera_name, modes)
+
+
+def blend_device(device_type):
+    if device_type == 'CPU':
+        bpy.context.scene.cycles.device = 'CPU'
+        return
+
+    # enumerating devices takes seconds, so it only happens once per process and device type
+    if device_type not in device_types:
+        bpy.context.preferences.addons['cycles'].preferences.get_devices()
+        device_types.add(device_type)
+    bpy.context.preferences.addons['cycles'].preferences.compute_device_type = device_type
+    bpy.context.scene.cycles.device = 'GPU'
+
+
+# on_camera(scene_name, camera_name, modes) is called once the outputs of a camera are written. past max_rss
+# megabytes, blend_render stops between scenes with every finished output in the manifest and raises
+# lib.memory.MemoryCeilingExceeded, so a fresh process can carry on with resume
+def blend_render(render_data: lib.data.render_data.RenderData, clean=True, threads=None, resume=False,
+                 writer_pool=None, on_camera=None, max_rss=None):
+    check_engines(render_data)
+    output_dir = os.path.abspath(render_data.output_dir)
+    if clean and not resume:
+        clean_render_dir(render_data)
+    else:
+        os.makedirs(f'{output_dir}/{render_data.name}', exist_ok=True)
+
+    is_writer_pool_owned = writer_pool is None
+    if is_writer_pool_owned:
+        writer_pool = lib.writer.WriterPool(0)
+    writer_pool.add_render(render_data)
+
+    mode_materials = {}
+    is_passes_setup = False
+    # sample counts are read from the render stats, the time budget is tracked over all rgba frames
+    lib.profile.register_handlers()
+    rgba_seconds = 0.0
+    n_rgba_frames_left = sum([len(scene_data.cameras_data) for scene_data in render_data.scenes_data.values()]) \
+        if 'rgba' in render_data.modes else 0
+    seconds_per_sample = None
+    n_blended_scenes = 0
+    for scene_name, scene_data in render_data.scenes_data.items():
+        scene_manifest = lib.manifest.load_scene_manifest(render_data, scene_name)
+        output_hashes = {}
+        for mode in render_data.modes:
+            for camera_name in scene_data.cameras_data:
+                output_key = lib.manifest.get_output_key(mode, scene_name, camera_name)
+                output_hash = lib.manifest.get_output_hash(render_data, scene_data, camera_name, mode)
+                if not resume or not lib.manifest.is_output_valid(render_data, scene_manifest, output_key, output_hash):
+                    output_hashes[(mode, camera_name)] = output_hash
+
+        # frames rendered before under the same hash are linked from the render cache instead
+        with lib.profile.stage('cache', scene=scene_name):
+            cached_hashes = {}
+            for (mode, camera_name), output_hash in output_hashes.items():
+                output_path = os.path.join(output_dir, render_data.name,
+                                           lib.manifest.get_output_file(render_data, mode, scene_name, camera_name))
+                cached_metadata = lib.render_cache.fetch(output_hash, output_path)
+                if cached_metadata is None:
+                    lib.render_cache.release(output_path)
+                    continue
+                cached_hashes[(mode, camera_name)] = output_hash
+                metadata = {mode: {**cached_metadata, 'cached': True}}
+                on_done = functools.partial(set_outputs, render_data, scene_name, scene_manifest, camera_name,
+                                            (mode,), cached_hashes, on_camera, metadata)
+                writer_pool.submit(None, outputs=get_h5_outputs(render_data, scene_name, camera_name, (mode,),
+                                                                metadata),
+                                   on_done=on_done)
                 if mode == 'rgba':
-                    bpy.context.scene.cycles.samples = render_data.render_num_samples
-                    bpy.context.scene.render.image_settings.file_format = 'PNG'
-                elif mode == 'nocs':
-                    bpy.context.scene.cycles.samples = 1
-                    bpy.context.scene.render.image_settings.file_format = 'PNG'
-                    lib.blend_nocs.blend_nocs()
-                elif mode == 'segmentation':
-                    bpy.context.scene.cycles.samples = 1
-                    bpy.context.scene.render.image_settings.file_format = 'PNG'
-                    lib.blend_segmentation.blend_segmentation()
-                elif mode == 'depth':
-                    bpy.context.scene.cycles.samples = 1
-                    bpy.context.scene.render.image_settings.file_format = 'OPEN_EXR'
-                    bpy.context.scene.render.image_settings.use_zbuffer = True
-
-            if render_data.save_blend:
-                bpy.ops.wm.save_as_mainfile(filepath=f'{output_dir}/{render_data.name}/{scene_name}.blend')
+                    n_rgba_frames_left -= 1
+            for output_key in cached_hashes:
+                del output_hashes[output_key]
+
+        if len(output_hashes) == 0:
+            # blend_scene diffs against the last blended scene, so skipped scenes need no bookkeeping
+            continue
+
+        # unchanged objects keep their materials through the diff, so they have to be the rgba ones
+        if 'rgba' in mode_materials:
+            set_materials(mode_materials['rgba'])
+        # a process that has not rendered anything yet cannot get any smaller by restarting
+        if n_blended_scenes > 0 and lib.memory.is_over(max_rss):
+            writer_pool.poll(True)
+            mode_materials = {}
+            remove_orphans()
+            if lib.memory.is_over(max_rss):
+                raise lib.memory.MemoryCeilingExceeded(f'{lib.memory.get_rss():.0f} MB over {max_rss} MB')
+        with lib.profile.stage('scene', scene=scene_name):
+            is_changed = blend_scene(scene_data)
+        n_blended_scenes += 1
+        if is_changed or 'rgba' not in mode_materials:
+            # the previous mode materials are only referenced by mode_materials, so they are freed with it
+            mode_materials = {'rgba': get_materials()}
+            with lib.profile.stage('purge', scene=scene_name):
+                remove_orphans()
+
+        bpy.context.scene.render.resolution_x = render_data.width
+        bpy.context.scene.render.resolution_y = render_data.height
+        bpy.context.scene.render.resolution_percentage = 100
+        bpy.context.scene.render.tile_x = render_data.render_tile_size
+        bpy.context.scene.render.tile_y = render_data.render_tile_size
+        if threads is not None:
+            bpy.context.scene.render.threads_mode = 'FIXED'
+            bpy.context.scene.render.threads = threads
+
+        blend_device(render_data.device_type)
+
+        bpy.data.worlds['World'].cycles.sample_as_light = True
+        bpy.context.scene.cycles.blur_glossy = 2.0
+        bpy.context.scene.cycles.transparent_min_bounces = render_data.render_min_bounces
+        bpy.context.scene.cycles.transparent_max_bounces = render_data.render_max_bounces
+        # render_max_bounces bounds the light paths as a whole and every kind of bounce in them
+        bpy.context.scene.cycles.max_bounces = render_data.render_max_bounces
+        bpy.context.scene.cycles.diffuse_bounces = render_data.render_max_bounces
+        bpy.context.scene.cycles.glossy_bounces = render_data.render_max_bounces
+        bpy.context.scene.cycles.transmission_bounces = render_data.render_max_bounces
+
+        if render_data.save_blend:
+            set_materials(mode_materials['rgba'])
+            blend_view_settings('rgba')
+            bpy.ops.wm.save_as_mainfile(filepath=f'{output_dir}/{render_data.name}/{scene_name}.blend')
+
+        if render_data.single_pass:
+            if is_changed or not is_passes_setup:
+                with lib.profile.stage('nocs', scene=scene_name):
+                    lib.blend_passes.blend_passes()
+                is_passes_setup = True
+            blend_mode(render_data, scene_data, 'rgba', mode_materials)
+            ids_table = lib.blend_passes.set_pass_indices()
+
+            for ob in bpy.context.scene.objects:
+                camera_modes = [mode for mode in render_data.modes if (mode, ob.name) in output_hashes]
+                if ob.type == "CAMERA" and len(camera_modes) > 0:
+                    bpy.context.scene.camera = ob
+                    bpy.context.scene.render.filepath = f'{output_dir}/{render_data.name}/rgba_{scene_name}_{ob.name}'
+                    passes_path = f'{output_dir}/{render_data.name}/passes_{scene_name}_{ob.name}_'
+                    lib.blend_passes.set_passes_path(passes_path)
+                    if 'rgba' in camera_modes:
+                        blend_time_limit(render_data, get_time_limit(render_data, rgba_seconds, n_rgba_frames_left),
+                                         seconds_per_sample)
+                    start_time = time.time()
+                    with lib.profile.render(mode='passes', scene=scene_name, camera=ob.name):
+                        bpy.ops.render.render(write_still='rgba' in camera_modes, use_viewport=True)
+
+                    metadata = {}
+                    if 'rgba' in camera_modes:
+                        metadata['rgba'] = get_rgba_metadata(start_time)
+                        rgba_seconds += metadata['rgba']['seconds']
+                        n_rgba_frames_left -= 1
+                        seconds_per_sample = metadata['rgba']['seconds'] / max(metadata['rgba']['samples'], 1)
+                        writer_pool.submit(write_rgba_metadata, bpy.context.scene.render.filepath,
+                                           metadata['rgba'])
+                    if 'segmentation' in camera_modes:
+                        metadata['segmentation'] = {'ids': ids_table}
+
+                    # the passes file has a per camera name, so it is decoded while the next camera renders
+                    filepaths = {mode: f'{output_dir}/{render_data.name}/{mode}_{scene_name}_{ob.name}'
+                                 for mode in camera_modes}
+                    outputs = get_h5_outputs(render_data, scene_name, ob.name, camera_modes, metadata)
+                    on_done = functools.partial(set_outputs, render_data, scene_name, scene_manifest, ob.name,
+                                                camera_modes, output_hashes, on_camera, metadata)
+                    writer_pool.submit(lib.profile.wrap(write_passes, 'write', mode='passes', scene=scene_name,
+                                                        camera=ob.name),
+                                       render_data, lib.blend_passes.get_passes_file(passes_path), filepaths,
+                                       outputs=outputs, on_done=on_done)
+            continue
+
+        for mode in render_data.modes:
+            if not any([output_mode == mode for output_mode, _ in output_hashes]):
+                continue
+            blend_mode(render_data, scene_data, mode, mode_materials)
+            # segmentation ids and colours both follow the pass indices, the table maps them to object names
+            ids_table = lib.blend_passes.set_pass_indices() if mode == 'segmentation' else None
 
             for ob in bpy.context.scene.objects:
-                if ob.type == "CAMERA":
+                if ob.type == "CAMERA" and (mode, ob.name) in output_hashes:
                     bpy.context.scene.camera = ob
-                    os.makedirs(output_dir, exist_ok=True)
                     bpy.context.scene.render.filepath = f'{output_dir}/{render_data.name}/{mode}_{scene_name}_{ob.name}'
-                    bpy.ops.render.render(write_still=True, use_viewport=True)
+                    if mode == 'rgba':
+                        blend_time_limit(render_data, get_time_limit(render_data, rgba_seconds, n_rgba_frames_left),
+                                         seconds_per_sample)
+                    start_time = time.time()
+                    with lib.profile.render(mode=mode, scene=scene_name, camera=ob.name):
+                        bpy.ops.render.render(write_still=not is_viewer_mode(render_data, mode), use_viewport=True)
+
+                    # blender has already written colour modes, only viewer modes are encoded by the writer pool
+                    metadata = {'segmentation': {'ids': ids_table}} if mode == 'segmentation' else {}
+                    outputs = get_h5_outputs(render_data, scene_name, ob.name, (mode,), metadata)
+                    on_done = functools.partial(set_outputs, render_data, scene_name, scene_manifest, ob.name,
+                                                (mode,), output_hashes, on_camera, metadata)
+                    if mode == 'rgba':
+                        metadata['rgba'] = get_rgba_metadata(start_time)
+                        rgba_seconds += metadata['rgba']['seconds']
+                        n_rgba_frames_left -= 1
+                        seconds_per_sample = metadata['rgba']['seconds'] / max(metadata['rgba']['samples'], 1)
+                        writer_pool.submit(write_rgba_metadata, bpy.context.scene.render.filepath, metadata['rgba'],
+                                           outputs=outputs, on_done=on_done)
+                    elif mode == 'depth':
+                        zs = lib.blend_passes.read_viewer(render_data.height, render_data.width)
+                        writer_pool.submit(lib.profile.wrap(lib.depth.write_depth, 'write', mode=mode,
+                                                            scene=scene_name, camera=ob.name),
+                                           bpy.context.scene.render.filepath, zs, render_data.depth_format,
+                                           outputs=outputs, on_done=on_done)
+                    elif is_viewer_mode(render_data, mode):
+                        ids = lib.blend_passes.read_viewer(render_data.height, render_data.width)
+                        writer_pool.submit(lib.profile.wrap(lib.segmentation.write_segmentation_ids, 'write', mode=mode,
+                                                            scene=scene_name, camera=ob.name),
+                                           bpy.context.scene.render.filepath, ids, outputs=outputs, on_done=on_done)
+                    else:
+                        writer_pool.submit(None, outputs=outputs, on_done=on_done)
+
+    if 'rgba' in mode_materials:
+        set_materials(mode_materials['rgba'])
+        blend_view_settings('rgba')
+    remove_orphans()
 
-                    if mode == 'depth':
-                        f = OpenEXR.InputFile(bpy.context.scene.render.filepath + '.exr')
-                        zs = np.frombuffer(f.channel('Z'), np.float32).reshape(render_data.height, render_data.width)
-                        f.close()
-                        os.remove(bpy.context.scene.render.filepath + '.exr')
+    writer_pool.poll(True)
+    if is_writer_pool_owned:
+        writer_pool.close()
 
-                        r = np.ceil(np.log2(zs))
-                        g = zs / np.power(2, r)
-                        b = g * 256 - np.trunc(g * 256)
-                        a = b * 256 - np.trunc(b * 256)
-                        rgba = np.stack([r + 128, g * 256, b * 256, a * 256], axis=-1).astype(np.uint8)
 
-                        cv2.imwrite(bpy.context.scene.render.filepath + '.png', rgba)
+def set_object_material(obj, object_data: lib.data.object_data.ObjectData):
+    material_name = f'{object_data.material_pair[1]}_{object_data.color_pair[0]}'
+    if material_name not in bpy.data.materials:
+        if material_name.startswith('solid'):
+            material = bpy.data.materials.new(material_name)
+            material.use_nodes = True
+        else:
+            material = bpy.data.materials.new(material_name)
+            material.use_nodes = True
+            group_node = material.node_tree.nodes.new('ShaderNodeGroup')
+            group_node.node_tree = bpy.data.node_groups[object_data.material_pair[1]]
+            group_node.inputs['Color'].default_value = object_data.color_pair[1]
+            material.node_tree.links.new(group_node.outputs['Shader'],
+                                         material.node_tree.nodes['Material Output'].inputs['Surface'])
+
+    obj.data.materials.clear()
+    obj.data.materials.append(bpy.data.materials[material_name])
 
 
 def blend_object(object_data: lib.data.object_data.ObjectData, create):
@@ -99,27 +464,13 @@ def blend_object(object_data: lib.data.object_data.ObjectData, create):
             bpy.ops.mesh.primitive_plane_add(size=1000.0)
             bpy.data.objects['Plane'].name = object_data.name
         else:
-            bpy.ops.wm.append(filename=object_data.shape_pair[1])
-            bpy.data.objects[object_data.shape_pair[0]].name = object_data.name
+            with lib.profile.stage('asset', object=object_data.name):
+                lib.assets.instantiate_shape(object_data.shape_pair[1], object_data.name)
         obj = bpy.data.objects[object_data.name]
 
         if object_data.material_pair is not None:
-            material_name = f'{object_data.material_pair[1]}_{object_data.color_pair[0]}'
-            if material_name not in bpy.data.materials:
-                if material_name.startswith('solid'):
-                    material = bpy.data.materials.new(material_name)
-                    material.use_nodes = True
-                else:
-                    material = bpy.data.materials.new(material_name)
-                    material.use_nodes = True
-                    group_node = material.node_tree.nodes.new('ShaderNodeGroup')
-                    group_node.node_tree = bpy.data.node_groups[object_data.material_pair[1]]
-                    group_node.inputs['Color'].default_value = object_data.color_pair[1]
-                    material.node_tree.links.new(group_node.outputs['Shader'],
-                                                 material.node_tree.nodes['Material Output'].inputs['Surface'])
-
-            obj.data.materials.clear()
-            obj.data.materials.append(bpy.data.materials[material_name])
+            with lib.profile.stage('material', object=object_data.name):
+                set_object_material(obj, object_data)
 
         obj.scale = np.array(obj.scale) * object_data.scale_pair[1]
 
@@ -129,37 +480,111 @@ def blend_object(object_data: lib.data.object_data.ObjectData, create):
     obj.rotation_euler = numpy.radians(object_data.pose[3:])
 
 
-def blend_camera(camera_data: lib.data.camera_data.CameraData):
-    camera = bpy.data.cameras.new(camera_data.name)
-    object = bpy.data.objects.new(camera_data.name, camera)
+def update_object(previous_object_data: lib.data.object_data.ObjectData,
+                  object_data: lib.data.object_data.ObjectData):
+    obj = bpy.data.objects[object_data.name]
+    if not is_equal(previous_object_data.material_pair, object_data.material_pair) or \
+            not is_equal(previous_object_data.color_pair, object_data.color_pair):
+        if object_data.material_pair is None:
+            obj.data.materials.clear()
+        else:
+            set_object_material(obj, object_data)
+    if not is_equal(previous_object_data.scale_pair, object_data.scale_pair):
+        obj.scale = np.array(obj.scale) / previous_object_data.scale_pair[1] * object_data.scale_pair[1]
+
+
+def blend_camera(camera_data: lib.data.camera_data.CameraData, create=True):
+    if create:
+        camera = bpy.data.cameras.new(camera_data.name)
+        object = bpy.data.objects.new(camera_data.name, camera)
+        bpy.context.scene.collection.objects.link(object)
+    object = bpy.data.objects[camera_data.name]
     object.location = camera_data.pose[:3]
     object.rotation_euler = numpy.radians(camera_data.pose[3:])
-    bpy.context.scene.collection.objects.link(object)
 
 
-def blend_light(light_data: lib.data.light_data.LightData):
-    light = bpy.data.lights.new(light_data.name, light_data.type)
-    light.energy = light_data.energy
-    object = bpy.data.objects.new(light_data.name, light)
+def blend_light(light_data: lib.data.light_data.LightData, create=True):
+    if create:
+        light = bpy.data.lights.new(light_data.name, light_data.type)
+        object = bpy.data.objects.new(light_data.name, light)
+        bpy.context.scene.collection.objects.link(object)
+    object = bpy.data.objects[light_data.name]
+    object.data.energy = light_data.energy
     object.location = light_data.pose[:3]
     object.rotation_euler = numpy.radians(light_data.pose[3:])
-    bpy.context.scene.collection.objects.link(object)
 
 
+# frees datablocks nothing uses anymore, such as the meshes of removed objects and the materials left behind by
+# previous modes. asset templates and material node groups keep a fake user and stay
+def remove_orphans():
+    for datablocks in (bpy.data.meshes, bpy.data.materials, bpy.data.cameras, bpy.data.lights, bpy.data.node_groups,
+                       bpy.data.textures):
+        for datablock in list(datablocks):
+            if datablock.users == 0:
+                datablocks.remove(datablock)
+    for image in list(bpy.data.images):
+        if image.users == 0 and image.type not in ('RENDER_RESULT', 'COMPOSITING'):
+            bpy.data.images.remove(image)
+
+
+def clear_scene():
+    # removes everything but the cached assets, which is what a factory reset would do after the first one
+    for obj in list(bpy.data.objects):
+        if not lib.assets.is_template(obj):
+            bpy.data.objects.remove(obj)
+    remove_orphans()
+    bpy.context.scene.use_nodes = False
+
+
+def is_equal(a, b):
+    return lib.data.render_data.to_object(a) == lib.data.render_data.to_object(b)
+
+
+# returns, per kind of data, the names to remove, create and update in place; poses are set on every scene anyway
+def get_scene_diff(previous_scene_data: lib.data.scene_data.SceneData, scene_data: lib.data.scene_data.SceneData):
+    scene_diff = {}
+    for data_name, recreate_names, update_names in (
+            ('objects_data', ('shape_pair',), ('material_pair', 'color_pair', 'scale_pair')),
+            ('cameras_data', (), ()),
+            ('lights_data', ('type',), ())):
+        previous_datas = getattr(previous_scene_data, data_name)
+        datas = getattr(scene_data, data_name)
+        removed = [name for name in previous_datas if name not in datas]
+        created = [name for name in datas if name not in previous_datas]
+        updated = []
+        for name in datas:
+            if name not in previous_datas:
+                continue
+            if any([not is_equal(getattr(previous_datas[name], attr_name), getattr(datas[name], attr_name))
+                    for attr_name in recreate_names]):
+                removed.append(name)
+                created.append(name)
+            elif any([not is_equal(getattr(previous_datas[name], attr_name), getattr(datas[name], attr_name))
+                      for attr_name in update_names]):
+                updated.append(name)
+        scene_diff[data_name] = (removed, created, updated)
+    return scene_diff
+
+
+# returns whether any object, camera or light was added, removed or had its materials changed, in which case
+# per-object state such as mode materials has to be rebuilt
 def blend_scene(scene_data: lib.data.scene_data.SceneData):
-    if scene_data.reset_scene:
-        if scene_data.base_scene_blendfile is None:
-            bpy.ops.wm.read_factory_settings()
-            # bpy.data.objects.clear()
-            for object_name, object_value in bpy.data.objects.items():
-                bpy.data.objects.remove(object_value)
-        else:
-            bpy.ops.wm.open_mainfile(filepath=scene_data.base_scene_blendfile)
+    global is_factory_reset, blended_scene_data
+    if blended_scene_data is None or blended_scene_data.base_scene_blendfile != scene_data.base_scene_blendfile:
+        with lib.profile.stage('reset', scene=scene_data.name):
+            if scene_data.base_scene_blendfile is None:
+                if not is_factory_reset:
+                    bpy.ops.wm.read_factory_settings()
+                    is_factory_reset = True
+                clear_scene()
+            else:
+                bpy.ops.wm.open_mainfile(filepath=scene_data.base_scene_blendfile)
+                is_factory_reset = False
 
         for dir_entry in os.scandir(scene_data.material_dir):
             if dir_entry.name.endswith('.blend'):
                 material_path = os.path.join(dir_entry.path, 'NodeTree', os.path.splitext(dir_entry.name)[0])
-                bpy.ops.wm.append(filename=material_path)
+                lib.assets.load_node_group(material_path)
 
         for object_name, object_data in scene_data.objects_data.items():
             blend_object(object_data, True)
@@ -169,6 +594,39 @@ def blend_scene(scene_data: lib.data.scene_data.SceneData):
 
         for light_name, light_data in scene_data.lights_data.items():
             blend_light(light_data)
-    else:
-        for object_name, object_data in scene_data.objects_data.items():
-            blend_object(object_data, False)
+
+        blended_scene_data = scene_data
+        return True
+
+    # consecutive scenes only differ in a few objects, so only those are removed, created or updated
+    if blended_scene_data.material_dir != scene_data.material_dir:
+        for dir_entry in os.scandir(scene_data.material_dir):
+            if dir_entry.name.endswith('.blend'):
+                material_path = os.path.join(dir_entry.path, 'NodeTree', os.path.splitext(dir_entry.name)[0])
+                lib.assets.load_node_group(material_path)
+
+    scene_diff = get_scene_diff(blended_scene_data, scene_data)
+    is_changed = False
+    for data_name, (removed, created, updated) in scene_diff.items():
+        for name in removed:
+            bpy.data.objects.remove(bpy.data.objects[name])
+        is_changed = is_changed or len(removed) > 0 or len(created) > 0 or len(updated) > 0
+    if any([len(removed) > 0 for removed, _, _ in scene_diff.values()]):
+        remove_orphans()
+
+    _, created, updated = scene_diff['objects_data']
+    for object_name in updated:
+        update_object(blended_scene_data.objects_data[object_name], scene_data.objects_data[object_name])
+    for object_name, object_data in scene_data.objects_data.items():
+        blend_object(object_data, object_name in created)
+
+    _, created, _ = scene_diff['cameras_data']
+    for camera_name, camera_data in scene_data.cameras_data.items():
+        blend_camera(camera_data, camera_name in created)
+
+    _, created, _ = scene_diff['lights_data']
+    for light_name, light_data in scene_data.lights_data.items():
+        blend_light(light_data, light_name in created)
+
+    blended_scene_data = scene_data
+    return is_changed
@@ -1,5 +1,11 @@
+import hashlib
+import os
+
 import numpy
 
+import lib.assets
+import lib.registry
+
 try:
     import bpy
     import bpy_extras
@@ -8,34 +14,66 @@ except ImportError as e:
     print(e)
 
 
-def get_vertex_color_layer(obj):
-    vertex_color_layer = obj.data.vertex_colors.new()
-    if vertex_color_layer is None:
-        print(obj.name)
+NOCS_LAYER_NAME = 'nocs'
 
-    min_coord = numpy.zeros(3)
-    max_coord = numpy.zeros(3)
-    for loop_index, loop in enumerate(obj.data.loops):
-        vertex_coord = obj.data.vertices[loop.vertex_index].co
-        max_coord = numpy.maximum(max_coord, vertex_coord)
-        min_coord = numpy.minimum(min_coord, vertex_coord)
+# loop colours per (shape, mesh hash), None for flat meshes, optionally mirrored as .npy files in cache_dir
+nocs_colors = {}
+nocs_materials = {}
+cache_dir = None
 
-    if numpy.sum(max_coord - min_coord == 0) > 0:
-        return None
 
-    for loop_index, loop in enumerate(obj.data.loops):
-        loop_vert_index = loop.vertex_index
+def get_nocs_colors(obj, shape_name=None):
+    vertex_coords = numpy.zeros(len(obj.data.vertices) * 3, dtype=numpy.float32)
+    obj.data.vertices.foreach_get('co', vertex_coords)
+    loop_vertex_indices = numpy.zeros(len(obj.data.loops), dtype=numpy.int32)
+    obj.data.loops.foreach_get('vertex_index', loop_vertex_indices)
+
+    mesh_hash = hashlib.sha1(vertex_coords.tobytes() + loop_vertex_indices.tobytes()).hexdigest()
+    key = (obj.data.name if shape_name is None else shape_name, mesh_hash)
+    if key in nocs_colors:
+        return nocs_colors[key]
+
+    cache_path = None if cache_dir is None else os.path.join(cache_dir, f'{key[0]}_{key[1]}.npy')
+    if cache_path is not None and os.path.exists(cache_path):
+        colors = numpy.load(cache_path)
+        nocs_colors[key] = colors if len(colors) > 0 else None
+        return nocs_colors[key]
+
+    colors = None
+    if len(loop_vertex_indices) > 0:
+        loop_coords = vertex_coords.reshape(-1, 3)[loop_vertex_indices]
+        min_coord = numpy.min(loop_coords, axis=0)
+        max_coord = numpy.max(loop_coords, axis=0)
+        if numpy.sum(max_coord - min_coord == 0) == 0:
+            colors = numpy.ones((len(loop_vertex_indices), 4), dtype=numpy.float32)
+            colors[:, :3] = (loop_coords - min_coord) / (max_coord - min_coord)
+
+    nocs_colors[key] = colors
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        numpy.save(cache_path, numpy.zeros((0, 4), dtype=numpy.float32) if colors is None else colors)
+    return colors
 
-        color = (numpy.array(obj.data.vertices[loop_vert_index].co) - min_coord) / (max_coord - min_coord)
-        vertex_color_layer.data[loop_index].color[:3] = color
-        vertex_color_layer.data[loop_index].color[3] = 1
+
+def get_vertex_color_layer(obj, name='Col', shape_name=None):
+    if name in obj.data.vertex_colors:
+        return obj.data.vertex_colors[name]
+
+    colors = get_nocs_colors(obj, shape_name)
+    if colors is None:
+        return None
+
+    vertex_color_layer = obj.data.vertex_colors.new(name=name)
+    if vertex_color_layer is None:
+        print(obj.name)
+        return None
+    vertex_color_layer.data.foreach_set('color', colors.ravel())
 
     return vertex_color_layer
 
 
 def get_emission_material():
-    emission_count = sum([1 for material_name in bpy.data.materials.keys() if material_name.startswith('emission_material')])
-    emission_material = bpy.data.materials.new(f'emission_material_{emission_count}')
+    emission_material = bpy.data.materials.new(lib.registry.get_material_name('emission_material'))
     emission_material.use_nodes = True
 
     shader_node_emission = emission_material.node_tree.nodes.new('ShaderNodeEmission')
@@ -46,8 +84,7 @@ def get_emission_material():
 
 
 def get_nocs_material(vertex_color_layer_name):
-    nocs_count = sum([1 for material_name in bpy.data.materials.keys() if material_name.startswith('nocs_material')])
-    nocs_material = bpy.data.materials.new(f'nocs_material_{nocs_count}')
+    nocs_material = bpy.data.materials.new(lib.registry.get_material_name('nocs_material'))
     nocs_material.use_nodes = True
 
     shader_node_vertex_color = nocs_material.node_tree.nodes.new('ShaderNodeVertexColor')
@@ -62,17 +99,26 @@ def get_nocs_material(vertex_color_layer_name):
     return nocs_material
 
 
-def blend_nocs():
+def blend_nocs(shape_names=None):
+    # every layer has the same name, so a single nocs material and a single emission material serve all meshes
+    if 'nocs' not in nocs_materials or nocs_materials['nocs'] not in bpy.data.materials:
+        nocs_materials['nocs'] = get_nocs_material(NOCS_LAYER_NAME).name
+    if 'emission' not in nocs_materials or nocs_materials['emission'] not in bpy.data.materials:
+        nocs_materials['emission'] = get_emission_material().name
+
     for obj in bpy.data.objects:
-        if obj.type == 'MESH':
+        if obj.type == 'MESH' and not lib.assets.is_template(obj):
             obj.data.materials.clear()
 
-            vertex_color_layer = get_vertex_color_layer(obj)
+            shape_name = None if shape_names is None else shape_names.get(obj.name)
+            vertex_color_layer = get_vertex_color_layer(obj, NOCS_LAYER_NAME, shape_name)
             if vertex_color_layer is None:
-                emission_material = get_emission_material()
+                emission_material = bpy.data.materials[nocs_materials['emission']]
                 obj.data.materials.append(emission_material)
                 obj.active_material = emission_material
             else:
-                nocs_material = get_nocs_material(vertex_color_layer.name)
+                obj.data.vertex_colors.active = vertex_color_layer
+                vertex_color_layer.active_render = True
+                nocs_material = bpy.data.materials[nocs_materials['nocs']]
                 obj.data.materials.append(nocs_material)
                 obj.active_material = nocs_material
@@ -0,0 +1,146 @@
+import numpy
+import OpenEXR
+
+import lib.assets
+import lib.blend_nocs
+import lib.color
+import lib.segmentation
+
+try:
+    import bpy
+except ImportError as e:
+    print(e)
+
+
+NOCS_NAME = lib.blend_nocs.NOCS_LAYER_NAME
+CHANNEL_ORDER = ('R', 'G', 'B', 'A', 'V', 'X', 'Y', 'Z')
+VIEWER_NAME = 'viewer'
+
+
+def add_nocs_aov(material):
+    if material is None or not material.use_nodes or NOCS_NAME in material.node_tree.nodes:
+        return
+
+    shader_node_vertex_color = material.node_tree.nodes.new('ShaderNodeVertexColor')
+    shader_node_vertex_color.layer_name = NOCS_NAME
+    shader_node_output_aov = material.node_tree.nodes.new('ShaderNodeOutputAOV')
+    shader_node_output_aov.name = NOCS_NAME
+    shader_node_output_aov.aov_name = NOCS_NAME
+
+    material.node_tree.links.new(shader_node_vertex_color.outputs['Color'], shader_node_output_aov.inputs['Color'])
+
+
+def get_white_layer(obj):
+    # flat meshes have no nocs colours and are white in the nocs mode, a white layer gives their aov the same
+    vertex_color_layer = obj.data.vertex_colors.new(name=NOCS_NAME)
+    if vertex_color_layer is None:
+        return None
+    vertex_color_layer.data.foreach_set('color', numpy.ones(len(obj.data.loops) * 4, numpy.float32))
+    return vertex_color_layer
+
+
+def set_pass_indices():
+    # object indices follow the palette order of lib.blend_segmentation, 0 is the background. returns the id table
+    # of the meshes, keyed by strings as it is stored in json
+    ids_table = {}
+    objects = [obj for obj in bpy.data.objects if not lib.assets.is_template(obj)]
+    for i_obj, obj in enumerate(objects):
+        if obj.type == 'MESH':
+            obj.pass_index = i_obj + 1
+            ids_table[str(i_obj + 1)] = obj.name
+    return ids_table
+
+
+def blend_passes():
+    view_layer = bpy.context.view_layer
+    view_layer.use_pass_z = True
+    view_layer.use_pass_object_index = True
+    if NOCS_NAME not in view_layer.aovs:
+        aov = view_layer.aovs.add()
+        aov.name = NOCS_NAME
+        aov.type = 'COLOR'
+
+    for object_name in set_pass_indices().values():
+        obj = bpy.data.objects[object_name]
+        if lib.blend_nocs.get_vertex_color_layer(obj, NOCS_NAME) is None:
+            get_white_layer(obj)
+        for material in obj.data.materials:
+            add_nocs_aov(material)
+
+    bpy.context.scene.use_nodes = True
+    node_tree = bpy.context.scene.node_tree
+    render_layers = node_tree.nodes.get('Render Layers')
+    if render_layers is None:
+        render_layers = node_tree.nodes.new('CompositorNodeRLayers')
+    file_output = node_tree.nodes.get(NOCS_NAME)
+    if file_output is None:
+        file_output = node_tree.nodes.new('CompositorNodeOutputFile')
+        file_output.name = NOCS_NAME
+        file_output.format.file_format = 'OPEN_EXR_MULTILAYER'
+        file_output.format.color_depth = '32'
+        file_output.layer_slots.clear()
+        for pass_name in ('Depth', 'IndexOB', NOCS_NAME):
+            file_output.layer_slots.new(pass_name)
+    for pass_name in ('Depth', 'IndexOB', NOCS_NAME):
+        node_tree.links.new(render_layers.outputs[pass_name], file_output.inputs[pass_name])
+
+
+def blend_viewer(pass_name):
+    # the viewer image keeps a float pass in memory, so depth and id segmentation need no exr file
+    if pass_name == 'Depth':
+        bpy.context.view_layer.use_pass_z = True
+    elif pass_name == 'IndexOB':
+        bpy.context.view_layer.use_pass_object_index = True
+    bpy.context.scene.use_nodes = True
+    node_tree = bpy.context.scene.node_tree
+    render_layers = node_tree.nodes.get('Render Layers')
+    if render_layers is None:
+        render_layers = node_tree.nodes.new('CompositorNodeRLayers')
+    viewer = node_tree.nodes.get(VIEWER_NAME)
+    if viewer is None:
+        viewer = node_tree.nodes.new('CompositorNodeViewer')
+        viewer.name = VIEWER_NAME
+        viewer.use_alpha = False
+    node_tree.links.new(render_layers.outputs[pass_name], viewer.inputs['Image'])
+    node_tree.nodes.active = viewer
+
+
+def read_viewer(height, width):
+    pixels = numpy.empty(height * width * 4, numpy.float32)
+    bpy.data.images['Viewer Node'].pixels.foreach_get(pixels)
+    # blender images start at the bottom row
+    return numpy.flipud(pixels.reshape(height, width, 4)[:, :, 0])
+
+
+def set_passes_path(passes_path):
+    bpy.context.scene.node_tree.nodes[NOCS_NAME].base_path = passes_path
+
+
+def get_passes_file(passes_path):
+    return f'{passes_path}{bpy.context.scene.frame_current:04d}.exr'
+
+
+def read_layer(exr_file, layer_name, height, width):
+    channel_names = [channel_name for channel_name in exr_file.header()['channels']
+                     if channel_name.startswith(f'{layer_name}.')]
+    channel_names = sorted(channel_names, key=lambda channel_name: CHANNEL_ORDER.index(channel_name.split('.')[-1]))
+    channels = [numpy.frombuffer(exr_file.channel(channel_name), numpy.float32).reshape(height, width)
+                for channel_name in channel_names]
+    return numpy.stack(channels, axis=-1)
+
+
+def read_passes(passes_file, height, width):
+    exr_file = OpenEXR.InputFile(passes_file)
+    zs = read_layer(exr_file, 'Depth', height, width)[:, :, 0]
+    indices = numpy.rint(read_layer(exr_file, 'IndexOB', height, width)[:, :, 0]).astype(int)
+    nocs = read_layer(exr_file, NOCS_NAME, height, width)[:, :, :3]
+    exr_file.close()
+
+    is_object = indices > 0
+    nocs_rgba = numpy.zeros((height, width, 4), numpy.uint8)
+    nocs_rgba[:, :, :3] = numpy.rint(lib.color.linear_to_srgb(nocs) * 255)
+    nocs_rgba[:, :, 3] = 255
+    nocs_rgba[~is_object] = 0
+
+    return {'depth': zs, 'nocs': nocs_rgba, 'segmentation': lib.segmentation.get_segmentation_rgba(indices),
+            'segmentation_ids': indices}
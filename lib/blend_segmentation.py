@@ -1,6 +1,8 @@
-import matplotlib
 import numpy
 
+import lib.assets
+import lib.registry
+
 try:
     import bpy
     import bpy_extras
@@ -10,9 +12,9 @@ except ImportError as e:
 
 
 def get_emission_material(color=(0, 0, 0)):
-    emission_count = sum([1 for material_name in bpy.data.materials.keys() if material_name.startswith('emission_material')])
-    emission_material = bpy.data.materials.new(f'emission_material_{emission_count}')
+    emission_material = bpy.data.materials.new(lib.registry.get_material_name('emission_material'))
     emission_material.use_nodes = True
+    emission_material.diffuse_color = color
 
     shader_node_emission = emission_material.node_tree.nodes.new('ShaderNodeEmission')
     shader_node_emission.inputs['Color'].default_value = color
@@ -22,14 +24,20 @@ def get_emission_material(color=(0, 0, 0)):
     return emission_material
 
 
-def blend_segmentation():
-    colors = matplotlib.colors.to_rgba_array(matplotlib.colors.TABLEAU_COLORS)
-    print(colors)
+def get_segmentation_material(segmentation_id):
+    # one material per segmentation id, its colour never changes, so every scene of the session reuses it
+    material_name = f'segmentation_material_{segmentation_id}'
+    if material_name not in bpy.data.materials:
+        get_emission_material(lib.registry.get_segmentation_color(segmentation_id)).name = material_name
+    return bpy.data.materials[material_name]
 
-    for i_obj, obj in enumerate(bpy.data.objects):
+
+def blend_segmentation():
+    objects = [obj for obj in bpy.data.objects if not lib.assets.is_template(obj)]
+    for i_obj, obj in enumerate(objects):
         if obj.type == 'MESH':
             obj.data.materials.clear()
 
-            emission_material = get_emission_material(colors[i_obj])
+            emission_material = get_segmentation_material(i_obj)
             obj.data.materials.append(emission_material)
             obj.active_material = emission_material
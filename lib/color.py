@@ -0,0 +1,13 @@
+import numpy
+
+
+# blender's standard view transform, the srgb curve pngs of nocs and segmentation are encoded with
+def linear_to_srgb(color):
+    color = numpy.clip(color, 0, 1)
+    return numpy.where(color <= 0.0031308, color * 12.92, 1.055 * numpy.power(color, 1 / 2.4) - 0.055)
+
+
+# blender reads byte vertex colours, which nocs layers are, as srgb encoded and shades with their linear values
+def srgb_to_linear(color):
+    color = numpy.clip(color, 0, 1)
+    return numpy.where(color <= 0.04045, color / 12.92, numpy.power((color + 0.055) / 1.055, 2.4))
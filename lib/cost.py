@@ -0,0 +1,215 @@
+import glob
+import heapq
+import json
+import os
+
+import numpy
+
+import lib.data
+import lib.profile
+
+
+# seconds to reset blender for a scene built from scratch, per scene update and per object it creates, and per camera
+# and mode: fixed seconds plus seconds per pixel-sample and per pixel-sample-bounce. the defaults are rough cpu
+# numbers, calibrate() fits them to profiles of real renders
+DEFAULT_COST_MODEL = {
+    'reset_seconds': 1.0,
+    'scene_seconds': 0.5,
+    'object_seconds': 0.05,
+    'modes': {
+        'rgba': [0.5, 5e-7, 6.25e-8],
+        'nocs': [0.3, 1e-6, 0.0],
+        'segmentation': [0.3, 1e-6, 0.0],
+        'depth': [0.3, 1e-6, 0.0],
+        'passes': [0.5, 5e-7, 6.25e-8],
+    },
+}
+
+
+def load_cost_model(cost_model_path=None):
+    if cost_model_path is None:
+        return DEFAULT_COST_MODEL
+    with open(cost_model_path, 'r') as f:
+        return json.load(f)
+
+
+def get_render_modes(render_data: lib.data.render_data.RenderData):
+    # single pass renders every camera once with all passes, which the profile records as mode 'passes'
+    return ['passes'] if render_data.single_pass else list(render_data.modes)
+
+
+def is_path_traced(mode):
+    return mode in ('rgba', 'passes')
+
+
+def get_pixel_samples(render_data: lib.data.render_data.RenderData, mode):
+    n_samples = render_data.render_num_samples if is_path_traced(mode) else 1
+    return render_data.width * render_data.height * n_samples
+
+
+def get_camera_features(render_data: lib.data.render_data.RenderData, mode):
+    # what the coefficients of a mode multiply: 1, pixel-samples and pixel-sample-bounces
+    pixel_samples = get_pixel_samples(render_data, mode)
+    n_bounces = render_data.render_max_bounces if is_path_traced(mode) else 0
+    return [1.0, pixel_samples, pixel_samples * n_bounces]
+
+
+def get_mode_coefficients(mode, cost_model):
+    # cost models from before bounces were modelled have no per pixel-sample-bounce seconds
+    coefficients = list(cost_model['modes'].get(mode, DEFAULT_COST_MODEL['modes']['rgba']))
+    return coefficients + [0.0] * (3 - len(coefficients))
+
+
+def get_camera_cost(render_data: lib.data.render_data.RenderData, mode, cost_model):
+    coefficients = get_mode_coefficients(mode, cost_model)
+    features = get_camera_features(render_data, mode)
+    sampling_seconds = coefficients[1] * features[1] + coefficients[2] * features[2]
+    if is_path_traced(mode) and render_data.frame_time_limit is not None:
+        sampling_seconds = min(sampling_seconds, render_data.frame_time_limit)
+    return coefficients[0] + sampling_seconds
+
+
+def is_reset(previous_scene_data, scene_data):
+    # blend_scene starts from scratch in a fresh process and whenever the base scene blendfile changes
+    return previous_scene_data is None or \
+        previous_scene_data.base_scene_blendfile != scene_data.base_scene_blendfile
+
+
+def get_n_created_objects(previous_scene_data, scene_data):
+    # a diffed scene only creates new objects and the ones whose shape changed, the others are moved in place
+    if is_reset(previous_scene_data, scene_data):
+        return len(scene_data.objects_data)
+    return sum([1 for object_name, object_data in scene_data.objects_data.items()
+                if object_name not in previous_scene_data.objects_data or
+                list(previous_scene_data.objects_data[object_name].shape_pair) != list(object_data.shape_pair)])
+
+
+def get_setup_cost(previous_scene_data, scene_data, cost_model):
+    reset_seconds = cost_model.get('reset_seconds', 0.0) if is_reset(previous_scene_data, scene_data) else 0.0
+    return reset_seconds + cost_model['scene_seconds'] + \
+        cost_model['object_seconds'] * get_n_created_objects(previous_scene_data, scene_data)
+
+
+def get_scene_costs(render_data: lib.data.render_data.RenderData, cost_model):
+    # every scene is diffed against the one before it, as a worker rendering them in order does
+    camera_costs = sum([get_camera_cost(render_data, mode, cost_model) for mode in get_render_modes(render_data)])
+    scene_costs = []
+    previous_scene_data = None
+    for scene_data in render_data.scenes_data.values():
+        scene_costs.append(get_setup_cost(previous_scene_data, scene_data, cost_model) +
+                           camera_costs * len(scene_data.cameras_data))
+        previous_scene_data = scene_data
+    return scene_costs
+
+
+def get_reset_costs(render_data: lib.data.render_data.RenderData, cost_model):
+    # what a shard starting at each scene pays on top of its scene cost to build it from scratch
+    reset_costs = []
+    previous_scene_data = None
+    for scene_data in render_data.scenes_data.values():
+        reset_costs.append(get_setup_cost(None, scene_data, cost_model) -
+                           get_setup_cost(previous_scene_data, scene_data, cost_model))
+        previous_scene_data = scene_data
+    return reset_costs
+
+
+def get_range_cost(scene_costs, reset_costs, scene_start, scene_end):
+    reset_cost = 0.0 if reset_costs is None or scene_start >= len(reset_costs) else reset_costs[scene_start]
+    return reset_cost + sum(scene_costs[scene_start:scene_end])
+
+
+def get_cost_scene_ranges(scene_costs, target_cost, reset_costs=None):
+    # contiguous ranges, so consecutive scenes keep being diffed against each other inside a shard, every range but
+    # the first pays for building its first scene from scratch
+    scene_ranges = []
+    scene_start = 0
+    range_cost = get_range_cost(scene_costs, reset_costs, 0, 0)
+    for i_scene, scene_cost in enumerate(scene_costs):
+        range_cost += scene_cost
+        if range_cost >= target_cost:
+            scene_ranges.append((scene_start, i_scene + 1))
+            scene_start = i_scene + 1
+            range_cost = get_range_cost(scene_costs, reset_costs, scene_start, scene_start)
+    if scene_start < len(scene_costs):
+        scene_ranges.append((scene_start, len(scene_costs)))
+    return scene_ranges
+
+
+def get_makespan(costs, num_workers):
+    # every free worker takes the next job, which is what the farm's executor does
+    worker_ends = [0.0] * max(num_workers, 1)
+    for cost in costs:
+        heapq.heappush(worker_ends, heapq.heappop(worker_ends) + cost)
+    return max(worker_ends)
+
+
+def fit_mode_coefficients(mode, rows):
+    # rows of camera features and seconds. settings that never vary in the profiles cannot be told apart, so their
+    # coefficients keep the ratios of the default model
+    default_coefficients = get_mode_coefficients(mode, DEFAULT_COST_MODEL)
+    features = numpy.array([row[0] for row in rows], dtype=float)
+    seconds = numpy.array([row[1] for row in rows], dtype=float)
+    if numpy.linalg.matrix_rank(features) == 3:
+        coefficients = numpy.linalg.lstsq(features, seconds, rcond=None)[0]
+        return [float(max(c, 0.0)) for c in coefficients]
+    sampling_features = features[:, 1:] @ default_coefficients[1:]
+    if len(numpy.unique(sampling_features)) > 1:
+        fixed_seconds, scale = numpy.linalg.lstsq(numpy.stack([numpy.ones(len(rows)), sampling_features], axis=1),
+                                                  seconds, rcond=None)[0]
+        return [float(max(fixed_seconds, 0.0))] + [float(max(scale, 0.0) * c) for c in default_coefficients[1:]]
+    # a single resolution, sample and bounce count only pins down the mean, so the default model is scaled to it
+    scale = numpy.mean(seconds) / (default_coefficients[0] + sampling_features[0])
+    return [float(c * scale) for c in default_coefficients]
+
+
+def calibrate(render_paths, overrides=None):
+    # fits the cost model to profile_*.json files written by render.py --profile next to each render's outputs. the
+    # overrides are the ones the profiled renders ran with
+    camera_rows = {}
+    scene_rows = []
+    reset_seconds = []
+    for render_path in render_paths:
+        with open(render_path, 'r') as f:
+            render_data = lib.data.render_data.from_object(json.load(f), lib.data.render_data.RenderData)
+        lib.data.render_data.set_overrides(render_data, overrides or {})
+        profile_pattern = os.path.join(os.path.abspath(render_data.output_dir), render_data.name, 'profile_*.json')
+        for profile_path in glob.glob(profile_pattern):
+            with open(profile_path, 'r') as f:
+                events = json.load(f)['events']
+
+            camera_seconds = {}
+            scene_events = []
+            scene_reset_seconds = {}
+            for event in events:
+                if event['stage'] in lib.profile.RENDER_STAGES and 'camera' in event:
+                    key = (event['mode'], event['scene'], event['camera'])
+                    camera_seconds[key] = camera_seconds.get(key, 0.0) + event['duration']
+                elif event['stage'] == 'scene' and event['scene'] in render_data.scenes_data:
+                    scene_events.append(event)
+                elif event['stage'] == 'reset':
+                    scene_reset_seconds[event['scene']] = event['duration']
+                    reset_seconds.append(event['duration'])
+            for (mode, scene_name, camera_name), seconds in camera_seconds.items():
+                camera_rows.setdefault(mode, []).append((get_camera_features(render_data, mode), seconds))
+
+            # a profile covers one process, whose first scene is built from scratch and the others diffed
+            previous_scene_data = None
+            for event in sorted(scene_events, key=lambda event: event['start']):
+                scene_data = render_data.scenes_data[event['scene']]
+                scene_rows.append((get_n_created_objects(previous_scene_data, scene_data),
+                                   event['duration'] - scene_reset_seconds.get(event['scene'], 0.0)))
+                previous_scene_data = scene_data
+
+    cost_model = json.loads(json.dumps(DEFAULT_COST_MODEL))
+    if len(reset_seconds) > 0:
+        cost_model['reset_seconds'] = float(numpy.mean(reset_seconds))
+    if len(scene_rows) > 1:
+        scene_rows = numpy.array(scene_rows, dtype=float)
+        coefficients = numpy.linalg.lstsq(numpy.stack([numpy.ones(len(scene_rows)), scene_rows[:, 0]], axis=1),
+                                          scene_rows[:, 1], rcond=None)[0]
+        cost_model['scene_seconds'], cost_model['object_seconds'] = [float(max(c, 0.0)) for c in coefficients]
+    for mode, rows in camera_rows.items():
+        cost_model['modes'][mode] = fit_mode_coefficients(mode, rows)
+    cost_model['n_scenes'] = len(scene_rows)
+    cost_model['n_cameras'] = {mode: len(rows) for mode, rows in camera_rows.items()}
+    return cost_model
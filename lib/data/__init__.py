@@ -2,4 +2,5 @@ import lib.data.camera_data
 import lib.data.object_data
 import lib.data.light_data
 import lib.data.scene_data
+import lib.data.trajectory_data
 import lib.data.render_data
@@ -4,6 +4,7 @@ import os
 import numpy
 
 import lib.data.scene_data
+import lib.data.trajectory_data
 
 
 def empty():
@@ -15,6 +16,42 @@ def from_args(name, args):
                       args.render_num_samples, args.render_min_bounces, args.render_max_bounces, args.modes)
 
 
+def add_override_arguments(parser, choices):
+    # settings render.py and estimate_cost.py change on every spec they read, choices of the formats by argument name
+    parser.add_argument('--single_pass', action='store_true', default=None)
+    # per-mode render engines, e.g. --mode_engines nocs=BLENDER_WORKBENCH depth=BLENDER_EEVEE
+    parser.add_argument('--mode_engines', type=str, default=None, nargs='+')
+    parser.add_argument('--depth_format', type=str, default=None, choices=choices['depth_format'])
+    parser.add_argument('--segmentation_format', type=str, default=None, choices=choices['segmentation_format'])
+    # quality targeted rgba: noise threshold with render_num_samples as maximum, denoiser and time limits in seconds
+    parser.add_argument('--adaptive_threshold', type=float, default=None)
+    parser.add_argument('--adaptive_min_samples', type=int, default=None)
+    parser.add_argument('--denoiser', type=str, default=None, choices=('OPENIMAGEDENOISE', 'NLM'))
+    parser.add_argument('--frame_time_limit', type=float, default=None)
+    parser.add_argument('--render_time_budget', type=float, default=None)
+
+
+def get_overrides(args):
+    return {
+        'single_pass': args.single_pass,
+        'mode_engines': None if args.mode_engines is None else dict([mode_engine.split('=')
+                                                                    for mode_engine in args.mode_engines]),
+        'depth_format': args.depth_format,
+        'segmentation_format': args.segmentation_format,
+        'adaptive_threshold': args.adaptive_threshold,
+        'adaptive_min_samples': args.adaptive_min_samples,
+        'denoiser': args.denoiser,
+        'frame_time_limit': args.frame_time_limit,
+        'render_time_budget': args.render_time_budget,
+    }
+
+
+def set_overrides(render_data, overrides):
+    for name, value in overrides.items():
+        if value is not None:
+            render_data.__setattr__(name, value)
+
+
 class RenderData:
     def __init__(self, name, output_dir, save_blend, width, height, render_tile_size, device_type, render_num_samples,
                  render_min_bounces, render_max_bounces, modes):
@@ -30,6 +67,17 @@ class RenderData:
         self.render_min_bounces = render_min_bounces
         self.render_max_bounces = render_max_bounces
         self.modes = modes
+        self.single_pass = False
+        self.mode_engines = {}
+        self.depth_format = 'png'
+        self.segmentation_format = 'rgba'
+        # rgba stops sampling a pixel once its noise is below adaptive_threshold, render_num_samples is the maximum
+        self.adaptive_threshold = None
+        self.adaptive_min_samples = 0
+        self.denoiser = None
+        # seconds per rgba frame and for all rgba frames of the render
+        self.frame_time_limit = None
+        self.render_time_budget = None
 
         self.scenes_data = {}
 
@@ -56,6 +104,10 @@ def to_object(input):
     if isinstance(input, numpy.ndarray):
         return input.tolist()
 
+    if isinstance(input, lib.data.trajectory_data.TrajectoryData):
+        return to_object({'scenes_data': input.scenes_data, 'scene_names': input.scene_names,
+                          'key_names': input.key_names, 'poses': input.poses})
+
     if isinstance(input, (lib.data.render_data.RenderData, lib.data.scene_data.SceneData,
                           lib.data.camera_data.CameraData, lib.data.object_data.ObjectData,
                           lib.data.light_data.LightData)):
@@ -68,7 +120,9 @@ def from_object(input, type):
     if type == RenderData:
         output = lib.data.render_data.empty()
         for name, value in input.items():
-            if name == 'scenes_data':
+            if name == 'scenes_data' and lib.data.trajectory_data.is_trajectory_object(value):
+                output.__setattr__(name, from_object(value, lib.data.trajectory_data.TrajectoryData))
+            elif name == 'scenes_data':
                 output.__setattr__(name, {key: from_object(v, lib.data.scene_data.SceneData)
                                           for key, v in value.items()})
             else:
@@ -89,6 +143,10 @@ def from_object(input, type):
             else:
                 output.__setattr__(name, value)
         return output
+    elif type == lib.data.trajectory_data.TrajectoryData:
+        output = lib.data.trajectory_data.from_scenes(
+            [from_object(v, lib.data.scene_data.SceneData) for v in input['scenes_data'].values()],
+            input['scene_names'], input['key_names'], input['poses'])
     elif type == lib.data.object_data.ObjectData:
         output = lib.data.object_data.empty()
         for name, value in input.items():
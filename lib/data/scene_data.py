@@ -6,9 +6,11 @@ def empty():
     return SceneData(None, None, None, None, None, None)
 
 
-def from_args(name, args, reset_scene):
-    with open(args.properties_json, 'r') as f:
-        properties = json.load(f)
+def from_args(name, args, reset_scene, properties=None):
+    # properties can be passed in, so generating many scenes reads properties_json once
+    if properties is None:
+        with open(args.properties_json, 'r') as f:
+            properties = json.load(f)
     if args.base_scene_blendfile is None:
         base_blend_scene_blendfile = None
     else:
@@ -0,0 +1,71 @@
+import collections.abc
+import copy
+
+import numpy
+
+
+def is_trajectory_object(input):
+    # scenes_data of a render json is either scene name to scene, or a trajectory with a list of scene names
+    return isinstance(input, dict) and isinstance(input.get('scene_names'), list)
+
+
+# scenes of a trajectory, read like a dict of scene name to scene data. key scenes are stored whole, every other
+# scene is its key scene with the poses of the moving objects swapped in, built only when it is asked for
+class TrajectoryData(collections.abc.Mapping):
+    def __init__(self, scenes_data, scene_names, key_names, poses):
+        # key scenes by name, for every scene the name of its key scene, for every moving object a (n_scenes, 6) pose
+        # array
+        self.scenes_data = scenes_data
+        self.scene_names = scene_names
+        self.key_names = key_names
+        self.poses = poses
+        self.scene_indices = {scene_name: i_scene for i_scene, scene_name in enumerate(scene_names)}
+
+    def __getitem__(self, scene_name):
+        i_scene = self.scene_indices[scene_name]
+        key_scene_data = self.scenes_data[self.key_names[i_scene]]
+        if scene_name == self.key_names[i_scene]:
+            return key_scene_data
+
+        scene_data = copy.copy(key_scene_data)
+        scene_data.name = scene_name
+        scene_data.reset_scene = False
+        scene_data.objects_data = dict(key_scene_data.objects_data)
+        for object_name, poses in self.poses.items():
+            if object_name in scene_data.objects_data:
+                object_data = copy.copy(scene_data.objects_data[object_name])
+                object_data.pose = poses[i_scene].copy()
+                scene_data.objects_data[object_name] = object_data
+        return scene_data
+
+    def __contains__(self, scene_name):
+        return scene_name in self.scene_indices
+
+    def __iter__(self):
+        return iter(self.scene_names)
+
+    def __len__(self):
+        return len(self.scene_names)
+
+    def get_slice(self, scene_start, scene_end):
+        # the first scene of the slice becomes a key scene that builds everything, later key scenes are kept
+        scene_names = self.scene_names[scene_start:scene_end]
+        if len(scene_names) == 0:
+            return TrajectoryData({}, [], [], {object_name: poses[:0] for object_name, poses in self.poses.items()})
+        first_scene_data = copy.copy(self[scene_names[0]])
+        first_scene_data.reset_scene = True
+        key_names = [key_name if self.scene_indices[key_name] > scene_start else scene_names[0]
+                     for key_name in self.key_names[scene_start:scene_end]]
+        scenes_data = {scene_names[0]: first_scene_data}
+        for key_name in key_names:
+            if key_name not in scenes_data:
+                scenes_data[key_name] = self.scenes_data[key_name]
+        return TrajectoryData(scenes_data, scene_names, key_names,
+                              {object_name: poses[scene_start:scene_end] for object_name, poses in self.poses.items()})
+
+
+def from_scenes(key_scenes_data, scene_names, key_names, poses):
+    poses = {object_name: numpy.array(object_poses, dtype=float).reshape(len(scene_names), 6)
+             for object_name, object_poses in poses.items()}
+    return TrajectoryData({scene_data.name: scene_data for scene_data in key_scenes_data}, list(scene_names),
+                          list(key_names), poses)
@@ -3,43 +3,45 @@ import json
 import random
 import h5py
 import numpy
-import pytorch3d.transforms
 import torch
 import torchvision.transforms
 from PIL import Image
-import numpy as np
 
+import lib.data
+import lib.pose
+import lib.segmentation
 
-def pose_quat_to_T(pose_euler):
-    t = pose_euler[:3, None]
-    R = pytorch3d.transforms.quaternion_to_matrix(pose_euler[3:])
-    T = torch.cat((R, t), dim=1)
-    T = torch.cat((T, torch.from_numpy(np.array([[0., 0., 0., 1.]]))), dim=0)
-    return T
 
+# labels compose rotations as pytorch3d's 'XYZ' does and read the euler degrees of poses as radians, the trained
+# models depend on both so they are kept
+def get_euler_transform(pose_euler):
+    pose_euler = numpy.asarray(pose_euler, dtype=float)
+    return lib.pose.get_transform(pose_euler[..., :3], lib.pose.intrinsic_euler_to_matrix(pose_euler[..., 3:]))
 
-def pose_quat_to_invT(pose_euler):
-    t = pose_euler[:3, None]
-    R = pytorch3d.transforms.quaternion_to_matrix(pose_euler[3:])
-    T = torch.cat((torch.permute(R, (1, 0)), -torch.permute(R, (1, 0)) @ t), dim=1)
-    T = torch.cat((T, torch.from_numpy(np.array([[0., 0., 0., 1.]]))), dim=0)
-    return T
+
+def pose_quat_to_T(pose_quat):
+    pose_quat = numpy.asarray(pose_quat, dtype=float)
+    return torch.from_numpy(lib.pose.get_transform(pose_quat[:3], lib.pose.quaternion_to_matrix(pose_quat[3:])))
+
+
+def pose_quat_to_invT(pose_quat):
+    return torch.from_numpy(lib.pose.invert_transform(pose_quat_to_T(pose_quat).numpy()))
 
 
 def pose_euler_to_T(pose_euler):
-    t = pose_euler[:3, None]
-    R = pytorch3d.transforms.euler_angles_to_matrix(pose_euler[3:], 'XYZ')
-    T = torch.cat((R, t), dim=1)
-    T = torch.cat((T, torch.from_numpy(np.array([[0., 0., 0., 1.]]))), dim=0)
-    return T
+    return torch.from_numpy(get_euler_transform(pose_euler))
 
 
 def pose_euler_to_invT(pose_euler):
-    t = pose_euler[:3, None]
-    R = pytorch3d.transforms.euler_angles_to_matrix(pose_euler[3:], 'XYZ')
-    T = torch.cat((torch.permute(R, (1, 0)), -torch.permute(R, (1, 0)) @ t), dim=1)
-    T = torch.cat((T, torch.from_numpy(np.array([[0., 0., 0., 1.]]))), dim=0)
-    return T
+    return torch.from_numpy(lib.pose.invert_transform(get_euler_transform(pose_euler)))
+
+
+def load_segmentation(segmentation_dataset):
+    # a segmentation dataset of an hdf5 render, as uint16 ids with segmentation_format 'id' or as rgba palette
+    # colours, and the table from ids to object names
+    segmentation = numpy.array(Image.open(io.BytesIO(segmentation_dataset[()])))
+    ids_table = json.loads(segmentation_dataset.attrs['ids']) if 'ids' in segmentation_dataset.attrs else {}
+    return segmentation, lib.segmentation.get_id_names(ids_table)
 
 
 class BCData(torch.utils.data.Dataset):
@@ -51,13 +53,13 @@ class BCData(torch.utils.data.Dataset):
         self.renders_data = {}
         with h5py.File(path, 'r') as renders_h5_file:
             for render_name, render in renders_h5_file.items():
-                self.renders_data[render_name] = json.loads(render['render_data'][()])
+                self.renders_data[render_name] = lib.data.render_data.from_object(
+                    json.loads(render['render_data'][()]), lib.data.render_data.RenderData)
         self.keys = []
         for render_name, render_data in self.renders_data.items():
-            for i_scene, (scene_name, scene_data) in enumerate(render_data['scenes_data'].items()):
-                if i_scene == len(list(render_data['scenes_data'].items())) - 1:
-                    break
-                for i_camera, camera_name in enumerate(scene_data['cameras_data'].keys()):
+            # every scene but the last has a next scene
+            for scene_name in list(render_data.scenes_data)[:-1]:
+                for camera_name in render_data.scenes_data[scene_name].cameras_data:
                     self.keys.append((render_name, scene_name, camera_name))
 
         self.indices = indices
@@ -75,33 +77,33 @@ class BCData(torch.utils.data.Dataset):
 
         curr_image = self.transform(Image.open(io.BytesIO(self.h5f[render_name][scene_name][camera_name]['rgba'][()])).convert('RGB'))
         next_image = self.transform(Image.open(io.BytesIO(self.h5f[render_name][next_scene_name][camera_name]['rgba'][()])).convert('RGB'))
-        data = json.loads(self.h5f[render_name]['render_data'][()])['scenes_data']
+        scenes_data = self.renders_data[render_name].scenes_data
+        scene_data = scenes_data[scene_name]
+        next_scene_data = scenes_data[next_scene_name]
 
         subgoal = torch.tensor((int(scene_name) + 1) // 10)
 
-        camera_pose = torch.from_numpy(numpy.array(data[scene_name]['cameras_data'][camera_name]['pose']))
-        cameraTworld = pose_euler_to_invT(camera_pose)
-        action = []
-        curr_poses = []
-        next_poses = []
-        for object_name in ['swell_cap_0', 'swell_bottle_0']:
-            curr_pose = torch.from_numpy(numpy.array(data[scene_name]['objects_data'][object_name]['pose']))
-            next_pose = torch.from_numpy(numpy.array(data[f'{int(scene_name) + 1:06d}']['objects_data'][object_name]['pose']))
-            currTworld = pose_euler_to_invT(curr_pose)
-            worldTcurr = pose_euler_to_T(curr_pose)
-            worldTnext = pose_euler_to_T(next_pose)
-
-            cameraTcurr = cameraTworld @ worldTcurr
-            cameraTnext = cameraTworld @ worldTnext
-            currTnext = currTworld @ worldTnext
-            t = cameraTnext[:3, 3] - cameraTcurr[:3, 3]
-            q = pytorch3d.transforms.matrix_to_quaternion(currTnext[:3, :3])
-            q[1:] = cameraTcurr[:3, :3] @ q[1:]
-            action.append(torch.concat((t, q)))
-            curr_poses.append(curr_pose)
-            next_poses.append(next_pose)
-        action = torch.concat(action)
-        curr_pose = torch.concat(curr_poses)
-        next_pose = torch.concat(next_poses)
+        camera_pose = numpy.array(scene_data.cameras_data[camera_name].pose, dtype=float)
+        object_names = ['swell_cap_0', 'swell_bottle_0']
+        curr_poses = numpy.array([scene_data.objects_data[object_name].pose for object_name in object_names],
+                                 dtype=float)
+        next_poses = numpy.array([next_scene_data.objects_data[object_name].pose for object_name in object_names],
+                                 dtype=float)
+
+        # both objects at once, each action is the camera frame translation and the rotation quaternion from the
+        # current to the next pose with its vector part in the camera frame
+        cameraTworld = lib.pose.invert_transform(get_euler_transform(camera_pose))
+        worldTcurr = get_euler_transform(curr_poses)
+        worldTnext = get_euler_transform(next_poses)
+        cameraTcurr = cameraTworld @ worldTcurr
+        cameraTnext = cameraTworld @ worldTnext
+        currTnext = lib.pose.invert_transform(worldTcurr) @ worldTnext
+        t = cameraTnext[:, :3, 3] - cameraTcurr[:, :3, 3]
+        q = lib.pose.matrix_to_quaternion(currTnext[:, :3, :3])
+        q[:, 1:] = (cameraTcurr[:, :3, :3] @ q[:, 1:, None])[..., 0]
+        action = torch.from_numpy(numpy.concatenate((t, q), axis=1).reshape(-1))
+        curr_pose = torch.from_numpy(curr_poses.reshape(-1))
+        next_pose = torch.from_numpy(next_poses.reshape(-1))
+        camera_pose = torch.from_numpy(camera_pose)
 
         return curr_image, next_image, subgoal, action, curr_pose, next_pose, camera_pose
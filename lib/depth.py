@@ -0,0 +1,44 @@
+import os
+
+import cv2
+import numpy
+
+
+DEPTH_FORMATS = ('png', 'float32', 'float16')
+
+
+def get_depth_extension(depth_format):
+    return '.png' if depth_format == 'png' else '.npy'
+
+
+def encode_depth(zs):
+    # packs every depth into an exponent channel and three 8 bit mantissa channels. frexp keeps the mantissa below 1,
+    # so at powers of two no channel reaches 256 and wraps to 0
+    g, r = numpy.frexp(zs)
+    b = g * 256 - numpy.trunc(g * 256)
+    a = b * 256 - numpy.trunc(b * 256)
+    return numpy.stack([r + 128, g * 256, b * 256, a * 256], axis=-1).astype(numpy.uint8)
+
+
+def decode_depth(rgba):
+    rgba = rgba.astype(float)
+    return 2.0 ** (rgba[:, :, 0] - 128) * (rgba[:, :, 1] / 256 + rgba[:, :, 2] / 256 ** 2 + rgba[:, :, 3] / 256 ** 3)
+
+
+def read_depth(filepath, depth_format=None):
+    if depth_format is None:
+        depth_format = 'png' if os.path.exists(filepath + '.png') else 'float32'
+    if depth_format == 'png':
+        return decode_depth(cv2.imread(filepath + '.png', cv2.IMREAD_UNCHANGED))
+    return numpy.load(filepath + '.npy').astype(float)
+
+
+def write_depth(filepath, zs, depth_format='png'):
+    if depth_format == 'png':
+        cv2.imwrite(filepath + '.png', encode_depth(zs))
+    elif depth_format in ('float32', 'float16'):
+        # the 1e10 background depth does not fit in float16 and is stored as inf
+        with numpy.errstate(over='ignore'):
+            numpy.save(filepath + '.npy', zs.astype(depth_format))
+    else:
+        raise Exception('unknown depth format', depth_format)
@@ -0,0 +1,127 @@
+import concurrent.futures
+import copy
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import lib.data
+import lib.blend
+import lib.cost
+
+
+def get_scene_ranges(n_scenes, scenes_per_shard):
+    if scenes_per_shard is None or scenes_per_shard <= 0:
+        scenes_per_shard = n_scenes
+    return [(scene_start, min(scene_start + scenes_per_shard, n_scenes))
+            for scene_start in range(0, n_scenes, scenes_per_shard)]
+
+
+def get_shard_render_data(render_data: lib.data.render_data.RenderData, scene_start, scene_end):
+    shard_render_data = copy.copy(render_data)
+    shard_render_data.scenes_data = {}
+    if render_data.render_time_budget is not None:
+        shard_render_data.render_time_budget = render_data.render_time_budget * (scene_end - scene_start) / \
+            max(len(render_data.scenes_data), 1)
+    if isinstance(render_data.scenes_data, lib.data.trajectory_data.TrajectoryData):
+        # trajectory shards stay trajectories, so their jsons keep only the moving poses
+        shard_render_data.scenes_data = render_data.scenes_data.get_slice(scene_start, scene_end)
+        return shard_render_data
+    for i_scene, (scene_name, scene_data) in enumerate(render_data.scenes_data.items()):
+        if scene_start <= i_scene < scene_end:
+            if i_scene == scene_start and not scene_data.reset_scene:
+                # a worker starts from an empty blender session, so its first scene has to build everything
+                scene_data = copy.copy(scene_data)
+                scene_data.reset_scene = True
+            shard_render_data.scenes_data[scene_name] = scene_data
+    return shard_render_data
+
+
+def get_blender(blender=None):
+    # workers import bpy, so render.py runs inside blender, the one on the path unless another is given
+    blender_path = shutil.which('blender' if blender is None else blender)
+    if blender_path is None:
+        raise Exception('no blender executable for the farm workers, pass --blender', blender)
+    return blender_path
+
+
+def get_worker_command(shard_path, worker_args, blender):
+    render_script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'render.py')
+    render_args = ['--render_json', shard_path, '--no_clean'] + list(worker_args)
+    return [blender, '--background', '--factory-startup', '--python', render_script, '--'] + render_args
+
+
+# with a cost_model_path and no scenes_per_shard, renders are cut into shards of about equal predicted cost.
+# shards always start longest first, which keeps a long shard from being the last one to run
+def render_farm(render_paths, num_workers, scenes_per_shard=None, resume=False, blender=None, overrides=None,
+                worker_args=(), cost_model_path=None):
+    start_time = time.time()
+    blender = get_blender(blender)
+    shard_dir = tempfile.mkdtemp(prefix='render_farm_')
+    try:
+        cost_model = lib.cost.load_cost_model(cost_model_path)
+        renders = []
+        for render_path in render_paths:
+            with open(render_path, 'r') as f:
+                render_data = lib.data.render_data.from_object(json.load(f), lib.data.render_data.RenderData)
+            lib.data.render_data.set_overrides(render_data, overrides or {})
+            lib.blend.check_engines(render_data)
+            if not resume:
+                lib.blend.clean_render_dir(render_data)
+            renders.append((render_data, lib.cost.get_scene_costs(render_data, cost_model),
+                            lib.cost.get_reset_costs(render_data, cost_model)))
+        # a few shards per worker leave room to balance the tail
+        target_cost = sum([sum(scene_costs) for _, scene_costs, _ in renders]) / max(4 * num_workers, 1)
+
+        shards = []
+        for render_data, scene_costs, reset_costs in renders:
+            if cost_model_path is not None and scenes_per_shard is None:
+                scene_ranges = lib.cost.get_cost_scene_ranges(scene_costs, target_cost, reset_costs)
+            else:
+                scene_ranges = get_scene_ranges(len(render_data.scenes_data), scenes_per_shard)
+            for scene_start, scene_end in scene_ranges:
+                shard_render_data = get_shard_render_data(render_data, scene_start, scene_end)
+                shard_path = os.path.join(shard_dir, f'{len(shards):06d}.json')
+                with open(shard_path, 'w') as f:
+                    json.dump(lib.data.render_data.to_object(shard_render_data), f)
+                shards.append((shard_path, render_data.name, scene_start, scene_end,
+                               lib.cost.get_range_cost(scene_costs, reset_costs, scene_start, scene_end)))
+        shards = sorted(shards, key=lambda shard: -shard[4])
+
+        n_total_scenes = sum([shard[3] - shard[2] for shard in shards])
+        total_cost = sum([shard[4] for shard in shards])
+        print('rendering', len(render_paths), 'renders with', n_total_scenes, 'scenes in', len(shards), 'shards on',
+              num_workers, 'workers,',
+              f'predicted {lib.cost.get_makespan([shard[4] for shard in shards], num_workers):.0f} seconds')
+
+        n_scenes = 0
+        failed_shards = []
+        with concurrent.futures.ThreadPoolExecutor(num_workers) as executor:
+            shard_futures = {executor.submit(subprocess.run,
+                                             get_worker_command(shard[0], worker_args, blender)): shard
+                             for shard in shards}
+            done_cost = 0.0
+            for future in concurrent.futures.as_completed(shard_futures):
+                shard_path, render_name, scene_start, scene_end, shard_cost = shard_futures[future]
+                if future.result().returncode != 0:
+                    failed_shards.append(shard_futures[future])
+                    print('failed shard', render_name, f'scenes [{scene_start}, {scene_end})')
+                    continue
+
+                n_scenes += scene_end - scene_start
+                done_cost += shard_cost
+                elapsed_time = time.time() - start_time
+                # the eta rescales the predicted cost that is left by how fast predicted cost got done so far
+                eta = (total_cost - done_cost) * elapsed_time / max(done_cost, 1e-9)
+                print(f'finished shard {render_name} scenes [{scene_start}, {scene_end}),',
+                      f'{n_scenes}/{n_total_scenes} scenes, {n_scenes / elapsed_time:.3f} scenes/sec,',
+                      f'eta {eta:.0f} seconds')
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+    elapsed_time = time.time() - start_time
+    print('finished rendering', n_scenes, f'scenes in {elapsed_time:.3f} seconds',
+          f'({n_scenes / elapsed_time:.3f} scenes/sec),', len(failed_shards), 'failed shards')
+    return failed_shards
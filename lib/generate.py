@@ -0,0 +1,115 @@
+import json
+import os
+
+import numpy
+
+import lib.data
+import lib.pose
+import lib.registry
+
+
+# the make_* scripts only differ in what they sample and how scenes follow each other, everything they share is
+# here. properties are sampled for all scenes at once with numpy.random, so seeding numpy.random reproduces a spec
+
+
+def load_properties(properties_json):
+    with open(properties_json, 'r') as f:
+        return json.load(f)
+
+
+def get_ground_object_data():
+    shape_pair = ('plane', 'plane')
+    color_pair = ('white', numpy.array([1.0, 1.0, 1.0, 1.0], dtype=float))
+    material_pair = ('solid', 'solid')
+    scale_pair = ('1', numpy.array((1, 1, 1), dtype=float))
+    pose = numpy.array([0, 0, 0, 0, 0, 0], dtype=float)
+    return lib.data.object_data.ObjectData('ground', shape_pair, material_pair, color_pair, scale_pair, pose)
+
+
+# camera eulers in degrees, cameras are named cam00, cam01, ... in order
+def get_cameras_data(d, camera_eulers):
+    poses = lib.pose.get_orbit_poses(d, numpy.array(camera_eulers, dtype=float).reshape(-1, 3))
+    return {f'cam{i_camera:02d}': lib.data.camera_data.CameraData(f'cam{i_camera:02d}', pose)
+            for i_camera, pose in enumerate(poses)}
+
+
+# the rig of the cap scenes: three elevations from r_xs times six azimuths
+def get_rig_cameras_data(d, r_xs):
+    return get_cameras_data(d, [(r_x, 0, r_z) for r_x in r_xs for r_z in numpy.linspace(0, 300, 6)])
+
+
+def get_light_data():
+    return lib.data.light_data.LightData('light_0', 'POINT', 1000.0, lib.pose.get_orbit_poses(10, (45, 0, 45)))
+
+
+def sample_pairs(properties, key, n_samples):
+    pairs = list(properties[key].items())
+    return [pairs[i_pair] for i_pair in numpy.random.randint(len(pairs), size=n_samples)]
+
+
+# returns n_samples (shape_pair, material_pair, color_pair, scale_pair, pose) tuples. shape_name, scale_pair and
+# material_pair fix what is otherwise sampled from properties, poses are uniform between pose_low and pose_high,
+# which are (6,) or per sample (n_samples, 6)
+def sample_objects(properties, shape_dir, n_samples, pose_low, pose_high, shape_name=None, scale_pair=None,
+                   material_pair=False):
+    if shape_name is None:
+        shape_names = [shape_name for shape_name, _ in sample_pairs(properties, 'shapes', n_samples)]
+    else:
+        shape_names = [shape_name] * n_samples
+    shape_pairs = {shape_name: (shape_name, os.path.join(shape_dir, f'{shape_name}.blend', 'Object', shape_name))
+                   for shape_name in set(shape_names)}
+
+    color_pairs = sample_pairs(properties, 'colors', n_samples)
+    color_values = numpy.ones((n_samples, 4))
+    if n_samples > 0:
+        color_values[:, :3] = numpy.array([color_value for _, color_value in color_pairs], dtype=float) / 255
+
+    material_pairs = sample_pairs(properties, 'materials', n_samples) if material_pair is False \
+        else [material_pair] * n_samples
+    if scale_pair is None:
+        scale_pairs = [(scale_name, numpy.array(scale_value, dtype=float))
+                       for scale_name, scale_value in sample_pairs(properties, 'sizes', n_samples)]
+    else:
+        scale_pairs = [scale_pair] * n_samples
+    poses = numpy.random.uniform(pose_low, pose_high, (n_samples, 6))
+
+    return [(shape_pairs[shape_names[i_sample]], material_pairs[i_sample],
+             (color_pairs[i_sample][0], color_values[i_sample]), scale_pairs[i_sample], poses[i_sample])
+            for i_sample in range(n_samples)]
+
+
+def get_scene_data(name, args, properties, reset_scene, objects, cameras_data) -> lib.data.scene_data.SceneData:
+    scene_data = lib.data.scene_data.from_args(name, args, reset_scene, properties)
+
+    ground_object_data = get_ground_object_data()
+    scene_data.objects_data[ground_object_data.name] = ground_object_data
+
+    for shape_pair, material_pair, color_pair, scale_pair, pose in objects:
+        object_name = lib.registry.get_object_name(scene_data, shape_pair[0])
+        scene_data.objects_data[object_name] = lib.data.object_data.ObjectData(
+            object_name, shape_pair, material_pair, color_pair, scale_pair, pose.copy())
+
+    for camera_name, camera_data in cameras_data.items():
+        scene_data.cameras_data[camera_name] = lib.data.camera_data.CameraData(camera_name, camera_data.pose.copy())
+
+    light_data = get_light_data()
+    scene_data.lights_data[light_data.name] = light_data
+    return scene_data
+
+
+def get_interpolated_poses(pose, goal_pose, n_steps):
+    # n_steps poses moving from pose to goal_pose in equal steps, the last one at goal_pose
+    return pose + (goal_pose - pose) * (numpy.arange(1, n_steps + 1) / max(n_steps, 1))[:, None]
+
+
+def get_twisted_poses(pose, angle, n_steps):
+    # n_steps poses turned about their own z by angle degrees more every step. each step's euler is the one closest to
+    # the twist, as mathutils' Euler.rotate picks them, and is found from the last one since near gimbal lock the pick
+    # depends on it
+    twist = numpy.radians([0, 0, angle])
+    twist_matrix = lib.pose.euler_to_matrix(twist)
+    poses = numpy.tile(pose, (n_steps, 1))
+    for i_step in range(n_steps):
+        rotation = lib.pose.euler_to_matrix(numpy.radians(poses[i_step - 1, 3:] if i_step else pose[3:])) @ twist_matrix
+        poses[i_step, 3:] = numpy.degrees(lib.pose.matrix_to_compatible_euler(rotation, twist))
+    return poses
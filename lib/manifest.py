@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+
+import lib.data
+import lib.depth
+
+
+def get_manifest_dir(render_data: lib.data.render_data.RenderData):
+    return os.path.join(os.path.abspath(render_data.output_dir), render_data.name, 'manifest')
+
+
+def get_output_key(mode, scene_name, camera_name):
+    return f'{mode}_{scene_name}_{camera_name}'
+
+
+def get_output_file(render_data: lib.data.render_data.RenderData, mode, scene_name, camera_name):
+    extension = lib.depth.get_depth_extension(render_data.depth_format) if mode == 'depth' else '.png'
+    return f'{get_output_key(mode, scene_name, camera_name)}{extension}'
+
+
+def get_state_json(state):
+    return json.dumps(lib.data.render_data.to_object(state), sort_keys=True)
+
+
+def get_scene_spec(scene_data: lib.data.scene_data.SceneData, camera_name, mode):
+    # only what a mode can see is hashed, without names or order, so identical frames of different scenes and
+    # renders share a hash. segmentation colours follow the sorted names of everything in the scene
+    object_fields = ('shape_pair', 'material_pair', 'color_pair', 'scale_pair', 'pose') if mode == 'rgba' \
+        else ('shape_pair', 'scale_pair', 'pose')
+    spec = {
+        'base_scene_blendfile': scene_data.base_scene_blendfile,
+        'objects': sorted([get_state_json({field: getattr(object_data, field) for field in object_fields})
+                           for object_data in scene_data.objects_data.values()]),
+        'camera_pose': scene_data.cameras_data[camera_name].pose,
+    }
+    if mode == 'rgba':
+        spec['lights'] = sorted([get_state_json({'type': light_data.type, 'energy': light_data.energy,
+                                                 'pose': light_data.pose})
+                                 for light_data in scene_data.lights_data.values()])
+    if mode == 'segmentation':
+        spec['names'] = sorted(list(scene_data.objects_data) + list(scene_data.cameras_data) +
+                               list(scene_data.lights_data))
+    return spec
+
+
+def get_output_hash(render_data: lib.data.render_data.RenderData, scene_data: lib.data.scene_data.SceneData,
+                    camera_name, mode):
+    spec = {
+        'mode': mode,
+        'width': render_data.width,
+        'height': render_data.height,
+        'single_pass': render_data.single_pass,
+        'engine': render_data.mode_engines.get(mode, 'CYCLES'),
+        **get_scene_spec(scene_data, camera_name, mode),
+    }
+    # nocs, segmentation and depth render with a single sample unless they come out of the rgba pass
+    if mode == 'rgba' or render_data.single_pass:
+        spec['render_num_samples'] = render_data.render_num_samples
+        spec['render_min_bounces'] = render_data.render_min_bounces
+        spec['render_max_bounces'] = render_data.render_max_bounces
+        # outputs from when render_max_bounces only bounded transparent bounces are rendered again
+        spec['light_bounces'] = render_data.render_max_bounces
+    if mode == 'depth':
+        spec['depth_format'] = render_data.depth_format
+    if mode == 'segmentation':
+        spec['segmentation_format'] = render_data.segmentation_format
+    if mode in ('nocs', 'segmentation'):
+        # outputs from before the standard view transform was forced have other colours
+        spec['view_transform'] = 'Standard'
+    if mode == 'rgba':
+        spec['adaptive_threshold'] = render_data.adaptive_threshold
+        spec['adaptive_min_samples'] = render_data.adaptive_min_samples
+        spec['denoiser'] = render_data.denoiser
+        # the render time budget is left out, farm shards each get a share of it
+        spec['frame_time_limit'] = render_data.frame_time_limit
+    return hashlib.sha1(get_state_json(spec).encode()).hexdigest()
+
+
+def load_scene_manifest(render_data: lib.data.render_data.RenderData, scene_name):
+    manifest_path = os.path.join(get_manifest_dir(render_data), f'{scene_name}.json')
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def write_scene_manifest(render_data: lib.data.render_data.RenderData, scene_name, scene_manifest):
+    manifest_dir = get_manifest_dir(render_data)
+    os.makedirs(manifest_dir, exist_ok=True)
+    manifest_path = os.path.join(manifest_dir, f'{scene_name}.json')
+    with open(f'{manifest_path}.tmp', 'w') as f:
+        json.dump(scene_manifest, f, indent=2)
+    os.replace(f'{manifest_path}.tmp', manifest_path)
+
+
+def is_output_valid(render_data: lib.data.render_data.RenderData, scene_manifest, output_key, output_hash):
+    if output_key not in scene_manifest or scene_manifest[output_key]['hash'] != output_hash:
+        return False
+    output_path = os.path.join(os.path.abspath(render_data.output_dir), render_data.name,
+                               scene_manifest[output_key]['file'])
+    return os.path.isfile(output_path) and os.path.getsize(output_path) > 0
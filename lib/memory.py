@@ -0,0 +1,37 @@
+import os
+import resource
+import sys
+
+try:
+    import bpy
+except ImportError as e:
+    print(e)
+
+
+class MemoryCeilingExceeded(Exception):
+    pass
+
+
+def get_rss():
+    # resident set size in megabytes, /proc has the current one, elsewhere only the peak is available
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss / 2 ** 20 if sys.platform == 'darwin' else max_rss / 2 ** 10
+
+
+def is_over(max_rss):
+    return max_rss is not None and get_rss() > max_rss
+
+
+def restart(extra_args=()):
+    # replaces this process with a fresh one running the same command line, inside blender the script arguments
+    # come last after '--', so appended arguments reach the script either way
+    argv = list(sys.argv) + [arg for arg in extra_args if arg not in sys.argv]
+    sys.stdout.flush()
+    sys.stderr.flush()
+    if '--python' in argv:
+        os.execv(bpy.app.binary_path, [bpy.app.binary_path] + argv[1:])
+    os.execv(sys.executable, [sys.executable] + argv)
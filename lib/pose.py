@@ -0,0 +1,177 @@
+import numpy
+
+
+# poses are (..., 6) arrays of a location and a blender XYZ euler in degrees, as stored in object, camera and light
+# data. eulers passed to the functions here are in radians, rotations are (..., 3, 3) matrices and quaternions are
+# (..., 4) arrays with the real part first, as in pytorch3d. everything works on any number of leading batch
+# dimensions, so whole specs or datasets are converted in one call
+
+
+def get_axis_matrix(angles, axis):
+    angles = numpy.asarray(angles, dtype=float)
+    cos, sin = numpy.cos(angles), numpy.sin(angles)
+    i, j = ((1, 2), (2, 0), (0, 1))[axis]
+    matrix = numpy.zeros((*angles.shape, 3, 3))
+    matrix[..., axis, axis] = 1
+    matrix[..., i, i] = cos
+    matrix[..., j, j] = cos
+    matrix[..., i, j] = -sin
+    matrix[..., j, i] = sin
+    return matrix
+
+
+def euler_to_matrix(euler):
+    # blender XYZ eulers rotate about x, then y, then z
+    euler = numpy.asarray(euler, dtype=float)
+    return get_axis_matrix(euler[..., 2], 2) @ get_axis_matrix(euler[..., 1], 1) @ get_axis_matrix(euler[..., 0], 0)
+
+
+def intrinsic_euler_to_matrix(euler):
+    # pytorch3d's 'XYZ' convention composes the other way round, which lib.dataset labels were computed with
+    euler = numpy.asarray(euler, dtype=float)
+    return get_axis_matrix(euler[..., 0], 0) @ get_axis_matrix(euler[..., 1], 1) @ get_axis_matrix(euler[..., 2], 2)
+
+
+def get_euler_solutions(matrix):
+    # the two blender XYZ eulers of a rotation, the same one twice in gimbal lock, like mat3_normalized_to_eulO2
+    matrix = numpy.asarray(matrix, dtype=float)
+    cos_y = numpy.hypot(matrix[..., 0, 0], matrix[..., 1, 0])
+    is_locked = cos_y <= 16 * numpy.finfo(numpy.float32).eps
+    euler = numpy.stack((numpy.where(is_locked, numpy.arctan2(-matrix[..., 1, 2], matrix[..., 1, 1]),
+                                     numpy.arctan2(matrix[..., 2, 1], matrix[..., 2, 2])),
+                         numpy.arctan2(-matrix[..., 2, 0], cos_y),
+                         numpy.where(is_locked, 0.0, numpy.arctan2(matrix[..., 1, 0], matrix[..., 0, 0]))), axis=-1)
+    flipped_euler = numpy.stack((numpy.arctan2(-matrix[..., 2, 1], -matrix[..., 2, 2]),
+                                 numpy.arctan2(-matrix[..., 2, 0], -cos_y),
+                                 numpy.arctan2(-matrix[..., 1, 0], -matrix[..., 0, 0])), axis=-1)
+    return euler, numpy.where(is_locked[..., None], euler, flipped_euler)
+
+
+def matrix_to_euler(matrix):
+    return get_euler_solutions(matrix)[0]
+
+
+def get_compatible_euler(euler, reference):
+    # every angle wrapped by whole turns to within half a turn of the reference
+    return euler - numpy.round((euler - reference) / (2 * numpy.pi)) * 2 * numpy.pi
+
+
+def matrix_to_compatible_euler(matrix, reference):
+    # the euler closest to reference, like mathutils' to_euler(order, compatible) and Euler.rotate, so
+    # interpolated rotations do not jump between equivalent eulers
+    reference = numpy.asarray(reference, dtype=float)
+    euler, flipped_euler = [get_compatible_euler(solution, reference) for solution in get_euler_solutions(matrix)]
+    is_flipped = (numpy.sum(numpy.abs(flipped_euler - reference), axis=-1)
+                  < numpy.sum(numpy.abs(euler - reference), axis=-1))
+    return numpy.where(is_flipped[..., None], flipped_euler, euler)
+
+
+def matrix_to_intrinsic_euler(matrix):
+    matrix = numpy.asarray(matrix, dtype=float)
+    return numpy.stack((numpy.arctan2(-matrix[..., 1, 2], matrix[..., 2, 2]),
+                        numpy.arcsin(numpy.clip(matrix[..., 0, 2], -1, 1)),
+                        numpy.arctan2(-matrix[..., 0, 1], matrix[..., 0, 0])), axis=-1)
+
+
+def quaternion_to_matrix(quaternion):
+    w, x, y, z = numpy.moveaxis(numpy.asarray(quaternion, dtype=float), -1, 0)
+    scale = 2 / (w * w + x * x + y * y + z * z)
+    return numpy.stack((1 - scale * (y * y + z * z), scale * (x * y - z * w), scale * (x * z + y * w),
+                        scale * (x * y + z * w), 1 - scale * (x * x + z * z), scale * (y * z - x * w),
+                        scale * (x * z - y * w), scale * (y * z + x * w), 1 - scale * (x * x + y * y)),
+                       axis=-1).reshape((*w.shape, 3, 3))
+
+
+def matrix_to_quaternion(matrix):
+    # each candidate is well conditioned when its own component is the largest, the result has a non negative
+    # real part
+    m = numpy.asarray(matrix, dtype=float)
+    q_abs = numpy.sqrt(numpy.maximum(0, 1 + numpy.stack((m[..., 0, 0] + m[..., 1, 1] + m[..., 2, 2],
+                                                         m[..., 0, 0] - m[..., 1, 1] - m[..., 2, 2],
+                                                         -m[..., 0, 0] + m[..., 1, 1] - m[..., 2, 2],
+                                                         -m[..., 0, 0] - m[..., 1, 1] + m[..., 2, 2]), axis=-1)))
+    candidates = numpy.stack((
+        numpy.stack((q_abs[..., 0] ** 2, m[..., 2, 1] - m[..., 1, 2], m[..., 0, 2] - m[..., 2, 0],
+                     m[..., 1, 0] - m[..., 0, 1]), axis=-1),
+        numpy.stack((m[..., 2, 1] - m[..., 1, 2], q_abs[..., 1] ** 2, m[..., 1, 0] + m[..., 0, 1],
+                     m[..., 0, 2] + m[..., 2, 0]), axis=-1),
+        numpy.stack((m[..., 0, 2] - m[..., 2, 0], m[..., 1, 0] + m[..., 0, 1], q_abs[..., 2] ** 2,
+                     m[..., 1, 2] + m[..., 2, 1]), axis=-1),
+        numpy.stack((m[..., 1, 0] - m[..., 0, 1], m[..., 2, 0] + m[..., 0, 2], m[..., 2, 1] + m[..., 1, 2],
+                     q_abs[..., 3] ** 2), axis=-1)), axis=-2) / (2 * numpy.maximum(q_abs[..., None], 0.1))
+    quaternion = numpy.take_along_axis(candidates, numpy.argmax(q_abs, axis=-1)[..., None, None], axis=-2)[..., 0, :]
+    return numpy.where(quaternion[..., :1] < 0, -quaternion, quaternion)
+
+
+def quaternion_multiply(quaternion_0, quaternion_1):
+    w_0, x_0, y_0, z_0 = numpy.moveaxis(numpy.asarray(quaternion_0, dtype=float), -1, 0)
+    w_1, x_1, y_1, z_1 = numpy.moveaxis(numpy.asarray(quaternion_1, dtype=float), -1, 0)
+    return numpy.stack((w_0 * w_1 - x_0 * x_1 - y_0 * y_1 - z_0 * z_1,
+                        w_0 * x_1 + x_0 * w_1 + y_0 * z_1 - z_0 * y_1,
+                        w_0 * y_1 - x_0 * z_1 + y_0 * w_1 + z_0 * x_1,
+                        w_0 * z_1 + x_0 * y_1 - y_0 * x_1 + z_0 * w_1), axis=-1)
+
+
+def slerp(quaternion_0, quaternion_1, t):
+    # along the shorter arc, nearly equal rotations are interpolated linearly
+    quaternion_0 = numpy.asarray(quaternion_0, dtype=float)
+    quaternion_1 = numpy.asarray(quaternion_1, dtype=float)
+    t = numpy.asarray(t, dtype=float)[..., None]
+    dot = numpy.sum(quaternion_0 * quaternion_1, axis=-1, keepdims=True)
+    quaternion_1 = numpy.where(dot < 0, -quaternion_1, quaternion_1)
+    angle = numpy.arccos(numpy.clip(numpy.abs(dot), 0, 1))
+    sin = numpy.sin(angle)
+    is_close = sin < 1e-6
+    sin = numpy.where(is_close, 1, sin)
+    weight_0 = numpy.where(is_close, 1 - t, numpy.sin((1 - t) * angle) / sin)
+    weight_1 = numpy.where(is_close, t, numpy.sin(t * angle) / sin)
+    quaternion = weight_0 * quaternion_0 + weight_1 * quaternion_1
+    return quaternion / numpy.linalg.norm(quaternion, axis=-1, keepdims=True)
+
+
+def get_transform(location, rotation):
+    location = numpy.asarray(location, dtype=float)
+    rotation = numpy.asarray(rotation, dtype=float)
+    transform = numpy.zeros((*numpy.broadcast_shapes(location.shape[:-1], rotation.shape[:-2]), 4, 4))
+    transform[..., :3, :3] = rotation
+    transform[..., :3, 3] = location
+    transform[..., 3, 3] = 1
+    return transform
+
+
+def invert_transform(transform):
+    transform = numpy.asarray(transform, dtype=float)
+    rotation = numpy.swapaxes(transform[..., :3, :3], -1, -2)
+    return get_transform(-(rotation @ transform[..., :3, 3, None])[..., 0], rotation)
+
+
+def pose_to_transform(pose):
+    pose = numpy.asarray(pose, dtype=float)
+    return get_transform(pose[..., :3], euler_to_matrix(numpy.radians(pose[..., 3:])))
+
+
+def transform_to_pose(transform):
+    transform = numpy.asarray(transform, dtype=float)
+    return numpy.concatenate((transform[..., :3, 3], numpy.degrees(matrix_to_euler(transform[..., :3, :3]))), axis=-1)
+
+
+def get_orbit_poses(distance, eulers):
+    # eulers in degrees rotate a point distance above the origin, which then looks back at the origin, as blender
+    # cameras and lights look down their -z
+    eulers = numpy.asarray(eulers, dtype=float)
+    locations = euler_to_matrix(numpy.radians(eulers))[..., 2] * distance
+    return numpy.concatenate((locations, eulers), axis=-1)
+
+
+def get_look_at_poses(locations, target=(0, 0, 0), up=(0, 0, 1)):
+    # poses at locations whose -z looks at target and whose y points up as far as possible
+    locations = numpy.asarray(locations, dtype=float)
+    z_axes = locations - numpy.asarray(target, dtype=float)
+    z_axes /= numpy.linalg.norm(z_axes, axis=-1, keepdims=True)
+    x_axes = numpy.cross(numpy.asarray(up, dtype=float), z_axes)
+    # looking straight along up, y points along y instead
+    is_along_up = numpy.linalg.norm(x_axes, axis=-1, keepdims=True) < 1e-9
+    x_axes = numpy.where(is_along_up, numpy.cross(numpy.array([0.0, 1.0, 0.0]), z_axes), x_axes)
+    x_axes /= numpy.linalg.norm(x_axes, axis=-1, keepdims=True)
+    rotations = numpy.stack((x_axes, numpy.cross(z_axes, x_axes), z_axes), axis=-1)
+    return numpy.concatenate((locations, numpy.degrees(matrix_to_euler(rotations))), axis=-1)
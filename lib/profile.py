@@ -0,0 +1,152 @@
+import contextlib
+import csv
+import json
+import os
+import re
+import threading
+import time
+
+import lib.data
+
+try:
+    import bpy
+except ImportError as e:
+    print(e)
+
+
+# stages spent on a single camera, everything else belongs to a scene or object
+RENDER_STAGES = ('sync', 'path_tracing', 'render', 'render_write', 'write')
+
+# every event is {'stage', 'start', 'duration', 'thread'} plus the mode/scene/camera it belongs to
+enabled = False
+events = []
+origin = time.perf_counter()
+render_times = {}
+
+
+def on_render_pre(*args):
+    render_times.clear()
+    render_times['pre'] = time.perf_counter()
+
+
+def on_render_stats(*args):
+    # cycles reports 'Synchronizing object' while building the scene and 'Sample n/m' once path tracing started
+    for arg in args:
+        if not isinstance(arg, str):
+            continue
+        if 'pre' in render_times and 'sync' not in render_times and ('Sample' in arg or 'Path Tracing' in arg):
+            render_times['sync'] = time.perf_counter()
+        # with adaptive sampling the last reported sample is the most any pixel needed
+        sample_match = re.search(r'Sample (\d+)/\d+', arg)
+        if sample_match is not None:
+            render_times['samples'] = max(render_times.get('samples', 0), int(sample_match.group(1)))
+
+
+def on_render_post(*args):
+    render_times['post'] = time.perf_counter()
+
+
+def register_handlers():
+    for handlers, handler in ((bpy.app.handlers.render_pre, on_render_pre),
+                              (bpy.app.handlers.render_stats, on_render_stats),
+                              (bpy.app.handlers.render_post, on_render_post)):
+        if handler not in handlers:
+            handlers.append(bpy.app.handlers.persistent(handler))
+
+
+def enable():
+    global enabled
+    enabled = True
+    register_handlers()
+
+
+def add_event(stage_name, start, end, **args):
+    events.append({'stage': stage_name, 'start': start - origin, 'duration': end - start,
+                   'thread': threading.current_thread().name, **args})
+
+
+@contextlib.contextmanager
+def stage(stage_name, **args):
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_event(stage_name, start, time.perf_counter(), **args)
+
+
+@contextlib.contextmanager
+def render(**args):
+    # splits a bpy.ops.render.render call into sync, path tracing and blender's own file write
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        pre = render_times.get('pre', start)
+        post = render_times.get('post', end)
+        sync = render_times.get('sync')
+        if sync is None:
+            add_event('render', pre, post, **args)
+        else:
+            add_event('sync', pre, sync, **args)
+            add_event('path_tracing', sync, post, **args)
+        add_event('render_write', post, end, **args)
+
+
+def wrap(fn, stage_name, **args):
+    def wrapped(*fn_args):
+        with stage(stage_name, **args):
+            return fn(*fn_args)
+    return wrapped
+
+
+def get_summary():
+    summary = {}
+    for event in events:
+        if event['stage'] not in summary:
+            summary[event['stage']] = {'count': 0, 'seconds': 0.0}
+        summary[event['stage']]['count'] += 1
+        summary[event['stage']]['seconds'] += event['duration']
+    return summary
+
+
+def get_profile_path(render_data: lib.data.render_data.RenderData):
+    # farm shards share the render directory, so every profile is named after its first scene
+    first_scene_name = next(iter(render_data.scenes_data), 'empty')
+    return os.path.join(os.path.abspath(render_data.output_dir), render_data.name, f'profile_{first_scene_name}')
+
+
+def write(profile_path, chrome_trace=False):
+    with open(f'{profile_path}.json', 'w') as f:
+        json.dump({'summary': get_summary(), 'events': events}, f, indent=2)
+
+    fieldnames = ['stage', 'mode', 'scene', 'camera', 'object', 'start', 'duration', 'thread']
+    with open(f'{profile_path}.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(events)
+
+    if chrome_trace:
+        # chrome://tracing and perfetto read complete events with microsecond timestamps
+        thread_ids = {}
+        trace_events = []
+        for event in events:
+            thread_id = thread_ids.setdefault(event['thread'], len(thread_ids))
+            trace_events.append({
+                'name': event['stage'], 'ph': 'X', 'pid': os.getpid(), 'tid': thread_id,
+                'ts': event['start'] * 1e6, 'dur': event['duration'] * 1e6,
+                'args': {name: value for name, value in event.items()
+                         if name not in ('stage', 'start', 'duration', 'thread')},
+            })
+        with open(f'{profile_path}.trace.json', 'w') as f:
+            json.dump({'traceEvents': trace_events}, f)
+
+
+def clear():
+    events.clear()
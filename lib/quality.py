@@ -0,0 +1,46 @@
+import math
+
+import cv2
+import numpy
+
+
+NOISE_KERNEL = numpy.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=float)
+
+
+def estimate_noise(bgra):
+    # immerkaer's fast noise estimate: the laplacian difference kernel cancels smooth image content,
+    # what is left is the standard deviation of the noise in 8 bit units
+    gray = cv2.cvtColor(bgra[:, :, :3].astype(numpy.float32), cv2.COLOR_BGR2GRAY).astype(float)
+    height, width = gray.shape
+    if height < 3 or width < 3:
+        return 0.0
+    response = cv2.filter2D(gray, -1, NOISE_KERNEL, borderType=cv2.BORDER_ISOLATED)[1:-1, 1:-1]
+    return float(math.sqrt(math.pi / 2) * numpy.sum(numpy.abs(response)) / (6 * (width - 2) * (height - 2)))
+
+
+def get_psnr(reference, test, max_value=255.0):
+    mse = numpy.mean((reference.astype(float) - test.astype(float)) ** 2)
+    if mse == 0:
+        return float('inf')
+    return float(10 * numpy.log10(max_value ** 2 / mse))
+
+
+def get_ssim(reference, test, max_value=255.0):
+    # mean ssim over channels with the usual 11x11 gaussian window of sigma 1.5
+    c_1 = (0.01 * max_value) ** 2
+    c_2 = (0.03 * max_value) ** 2
+    reference = reference.astype(float).reshape(reference.shape[0], reference.shape[1], -1)
+    test = test.astype(float).reshape(test.shape[0], test.shape[1], -1)
+    ssims = []
+    for i_channel in range(reference.shape[2]):
+        x = reference[:, :, i_channel]
+        y = test[:, :, i_channel]
+        mu_x = cv2.GaussianBlur(x, (11, 11), 1.5)
+        mu_y = cv2.GaussianBlur(y, (11, 11), 1.5)
+        sigma_xx = cv2.GaussianBlur(x * x, (11, 11), 1.5) - mu_x ** 2
+        sigma_yy = cv2.GaussianBlur(y * y, (11, 11), 1.5) - mu_y ** 2
+        sigma_xy = cv2.GaussianBlur(x * y, (11, 11), 1.5) - mu_x * mu_y
+        ssim_map = (2 * mu_x * mu_y + c_1) * (2 * sigma_xy + c_2) / \
+            ((mu_x ** 2 + mu_y ** 2 + c_1) * (sigma_xx + sigma_yy + c_2))
+        ssims.append(numpy.mean(ssim_map))
+    return float(numpy.mean(ssims))
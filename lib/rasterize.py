@@ -0,0 +1,208 @@
+import concurrent.futures
+import os
+
+import cv2
+import numpy
+
+import lib.color
+import lib.data
+import lib.depth
+import lib.pose
+import lib.segmentation
+
+
+CAMERA_LENS = 50.0
+CAMERA_SENSOR_WIDTH = 36.0
+CAMERA_CLIP_START = 0.1
+BACKGROUND_DEPTH = 1e10
+PLANE_SIZE = 1000.0
+MAX_CANDIDATES = 1 << 22
+
+meshes = {}
+
+
+def get_plane_mesh():
+    vertices = PLANE_SIZE / 2 * numpy.array([[-1, -1, 0], [1, -1, 0], [1, 1, 0], [-1, 1, 0]], dtype=float)
+    triangles = numpy.array([[0, 1, 2], [0, 2, 3]])
+    return {'vertices': vertices, 'triangles': triangles, 'scale': numpy.ones(3)}
+
+
+def load_mesh(meshes_dir, shape_name):
+    if shape_name not in meshes:
+        if shape_name == 'plane':
+            meshes[shape_name] = get_plane_mesh()
+        else:
+            with numpy.load(os.path.join(meshes_dir, f'{shape_name}.npz')) as mesh_file:
+                meshes[shape_name] = {name: mesh_file[name] for name in mesh_file.files}
+    return meshes[shape_name]
+
+
+def get_nocs_colors(vertices):
+    # same normalisation as lib.blend_nocs.get_vertex_color_layer, flat meshes get its white emission material
+    min_coord = numpy.min(vertices, axis=0)
+    max_coord = numpy.max(vertices, axis=0)
+    if numpy.any(max_coord - min_coord == 0):
+        return numpy.ones_like(vertices)
+    return (vertices - min_coord) / (max_coord - min_coord)
+
+
+def get_segmentation_indices(scene_data: lib.data.scene_data.SceneData):
+    # lib.blend_segmentation colours objects by their position in the name-sorted bpy.data.objects, which only holds
+    # the objects of the scene data when there is no base scene blendfile
+    object_names = sorted([*scene_data.objects_data, *scene_data.cameras_data, *scene_data.lights_data])
+    return {object_name: i_obj for i_obj, object_name in enumerate(object_names)}
+
+
+def clip_near(vertices, colors):
+    # vertices (n, 3, 3) in camera space looking down -z, triangles crossing the near plane are split
+    is_behind = vertices[:, :, 2] > -CAMERA_CLIP_START
+    n_behind = numpy.sum(is_behind, axis=1)
+    clipped_vertices = [vertices[n_behind == 0]]
+    clipped_colors = [colors[n_behind == 0]]
+
+    for n_clipped in (1, 2):
+        tri_vertices = vertices[n_behind == n_clipped]
+        tri_colors = colors[n_behind == n_clipped]
+        tri_behind = is_behind[n_behind == n_clipped]
+        # rotate every triangle so that its odd vertex (the only one behind or the only one in front) comes first
+        odd_index = numpy.argmax(tri_behind if n_clipped == 1 else ~tri_behind, axis=1)
+        order = (odd_index[:, None] + numpy.arange(3)[None, :]) % 3
+        tri_vertices = numpy.take_along_axis(tri_vertices, order[:, :, None], axis=1)
+        tri_colors = numpy.take_along_axis(tri_colors, order[:, :, None], axis=1)
+
+        t_1 = (-CAMERA_CLIP_START - tri_vertices[:, 0, 2]) / (tri_vertices[:, 1, 2] - tri_vertices[:, 0, 2])
+        t_2 = (-CAMERA_CLIP_START - tri_vertices[:, 0, 2]) / (tri_vertices[:, 2, 2] - tri_vertices[:, 0, 2])
+        v_1 = tri_vertices[:, 0] + t_1[:, None] * (tri_vertices[:, 1] - tri_vertices[:, 0])
+        v_2 = tri_vertices[:, 0] + t_2[:, None] * (tri_vertices[:, 2] - tri_vertices[:, 0])
+        c_1 = tri_colors[:, 0] + t_1[:, None] * (tri_colors[:, 1] - tri_colors[:, 0])
+        c_2 = tri_colors[:, 0] + t_2[:, None] * (tri_colors[:, 2] - tri_colors[:, 0])
+
+        if n_clipped == 2:
+            clipped_vertices.append(numpy.stack((tri_vertices[:, 0], v_1, v_2), axis=1))
+            clipped_colors.append(numpy.stack((tri_colors[:, 0], c_1, c_2), axis=1))
+        else:
+            clipped_vertices.append(numpy.stack((v_1, tri_vertices[:, 1], tri_vertices[:, 2]), axis=1))
+            clipped_vertices.append(numpy.stack((v_1, tri_vertices[:, 2], v_2), axis=1))
+            clipped_colors.append(numpy.stack((c_1, tri_colors[:, 1], tri_colors[:, 2]), axis=1))
+            clipped_colors.append(numpy.stack((c_1, tri_colors[:, 2], c_2), axis=1))
+
+    return numpy.concatenate(clipped_vertices), numpy.concatenate(clipped_colors)
+
+
+def rasterize_triangles(vertices, colors, ids, width, height, zbuffer):
+    focal = CAMERA_LENS / CAMERA_SENSOR_WIDTH * max(width, height)
+    depths = -vertices[:, :, 2]
+    xs = focal * vertices[:, :, 0] / depths + width / 2
+    ys = height / 2 - focal * vertices[:, :, 1] / depths
+
+    x_min = numpy.clip(numpy.floor(numpy.min(xs, axis=1) - 0.5), 0, width).astype(numpy.int64)
+    x_max = numpy.clip(numpy.ceil(numpy.max(xs, axis=1) - 0.5) + 1, 0, width).astype(numpy.int64)
+    y_min = numpy.clip(numpy.floor(numpy.min(ys, axis=1) - 0.5), 0, height).astype(numpy.int64)
+    y_max = numpy.clip(numpy.ceil(numpy.max(ys, axis=1) - 0.5) + 1, 0, height).astype(numpy.int64)
+    box_widths = x_max - x_min
+    counts = box_widths * (y_max - y_min)
+    area = (xs[:, 1] - xs[:, 0]) * (ys[:, 2] - ys[:, 0]) - (xs[:, 2] - xs[:, 0]) * (ys[:, 1] - ys[:, 0])
+    is_visible = (counts > 0) & (area != 0)
+
+    triangle_indices = numpy.nonzero(is_visible)[0]
+    cumulative_counts = numpy.cumsum(counts[triangle_indices])
+    chunk_start = 0
+    while chunk_start < len(triangle_indices):
+        chunk_offset = cumulative_counts[chunk_start] - counts[triangle_indices[chunk_start]]
+        chunk_end = max(numpy.searchsorted(cumulative_counts, chunk_offset + MAX_CANDIDATES, side='right'),
+                        chunk_start + 1)
+        chunk = triangle_indices[chunk_start:chunk_end]
+        chunk_start = chunk_end
+
+        # one candidate per pixel in each triangle's bounding box
+        tri = numpy.repeat(chunk, counts[chunk])
+        offsets = numpy.arange(len(tri)) - numpy.repeat(numpy.cumsum(counts[chunk]) - counts[chunk], counts[chunk])
+        px = x_min[tri] + offsets % box_widths[tri]
+        py = y_min[tri] + offsets // box_widths[tri]
+        cx = px + 0.5
+        cy = py + 0.5
+
+        w_0 = (xs[tri, 1] - cx) * (ys[tri, 2] - cy) - (xs[tri, 2] - cx) * (ys[tri, 1] - cy)
+        w_1 = (xs[tri, 2] - cx) * (ys[tri, 0] - cy) - (xs[tri, 0] - cx) * (ys[tri, 2] - cy)
+        w_2 = area[tri] - w_0 - w_1
+        is_inside = (w_0 * area[tri] >= 0) & (w_1 * area[tri] >= 0) & (w_2 * area[tri] >= 0)
+        tri, px, py = tri[is_inside], px[is_inside], py[is_inside]
+        w_0, w_1, w_2 = w_0[is_inside] / area[tri], w_1[is_inside] / area[tri], w_2[is_inside] / area[tri]
+
+        # perspective correct depth, the closest candidate of every pixel wins
+        inv_depth = w_0 / depths[tri, 0] + w_1 / depths[tri, 1] + w_2 / depths[tri, 2]
+        depth = 1 / inv_depth
+        pixel = py * width + px
+        order = numpy.lexsort((depth, pixel))
+        is_first = numpy.ones(len(order), dtype=bool)
+        is_first[1:] = pixel[order[1:]] != pixel[order[:-1]]
+        winners = order[is_first]
+        winners = winners[depth[winners] < zbuffer['depth'][pixel[winners]]]
+
+        tri, pixel, depth = tri[winners], pixel[winners], depth[winners]
+        weights = numpy.stack((w_0[winners] / depths[tri, 0], w_1[winners] / depths[tri, 1],
+                               w_2[winners] / depths[tri, 2]), axis=1) * depth[:, None]
+        zbuffer['depth'][pixel] = depth
+        zbuffer['nocs'][pixel] = numpy.einsum('nk,nkc->nc', weights, colors[tri])
+        zbuffer['id'][pixel] = ids[tri]
+
+
+def rasterize_camera(scene_data: lib.data.scene_data.SceneData, camera_name, width, height, output_path, meshes_dir,
+                     modes, depth_format='png', segmentation_format='rgba'):
+    camera_data = scene_data.cameras_data[camera_name]
+    camera_rotation = lib.pose.euler_to_matrix(numpy.radians(camera_data.pose[3:]))
+    camera_location = numpy.array(camera_data.pose[:3])
+    if 'segmentation' in modes and scene_data.base_scene_blendfile is not None:
+        # the objects of the base scene blendfile shift blender's segmentation ids, and only blender can list them
+        raise Exception('cannot rasterize segmentation with a base scene blendfile', scene_data.base_scene_blendfile)
+    segmentation_indices = get_segmentation_indices(scene_data)
+
+    zbuffer = {
+        'depth': numpy.full(width * height, numpy.inf),
+        'nocs': numpy.zeros((width * height, 3)),
+        'id': numpy.full(width * height, -1),
+    }
+    for object_name, object_data in scene_data.objects_data.items():
+        mesh = load_mesh(meshes_dir, object_data.shape_pair[0])
+        vertices = mesh['vertices'] * mesh['scale'] * numpy.array(object_data.scale_pair[1])
+        vertices = vertices @ lib.pose.euler_to_matrix(numpy.radians(object_data.pose[3:])).T + object_data.pose[:3]
+        vertices = (vertices - camera_location) @ camera_rotation
+
+        # colours are interpolated linear, as blender shades vertex colours, and srgb encoded again when written
+        colors = lib.color.srgb_to_linear(get_nocs_colors(mesh['vertices']))
+        tri_vertices, tri_colors = clip_near(vertices[mesh['triangles']], colors[mesh['triangles']])
+        ids = numpy.full(len(tri_vertices), segmentation_indices[object_name])
+        rasterize_triangles(tri_vertices, tri_colors, ids, width, height, zbuffer)
+
+    is_object = zbuffer['id'] >= 0
+    for mode in modes:
+        filepath = os.path.join(output_path, f'{mode}_{scene_data.name}_{camera_name}')
+        if mode == 'depth':
+            depth = numpy.where(is_object, zbuffer['depth'], BACKGROUND_DEPTH).reshape(height, width)
+            lib.depth.write_depth(filepath, depth.astype(numpy.float32), depth_format)
+        elif mode == 'nocs':
+            rgba = numpy.zeros((width * height, 4), numpy.uint8)
+            rgba[is_object, :3] = numpy.rint(lib.color.linear_to_srgb(zbuffer['nocs'][is_object]) * 255)
+            rgba[is_object, 3] = 255
+            cv2.imwrite(filepath + '.png', cv2.cvtColor(rgba.reshape(height, width, 4), cv2.COLOR_RGBA2BGRA))
+        elif mode == 'segmentation' and segmentation_format == 'id':
+            # the same ids as blender's object index pass, 0 is the background
+            lib.segmentation.write_segmentation_ids(filepath, (zbuffer['id'] + 1).reshape(height, width))
+        elif mode == 'segmentation':
+            rgba = lib.segmentation.get_segmentation_rgba((zbuffer['id'] + 1).reshape(height, width))
+            cv2.imwrite(filepath + '.png', cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGRA))
+
+
+def rasterize_render(render_data: lib.data.render_data.RenderData, meshes_dir, modes, num_workers=0):
+    output_path = os.path.join(os.path.abspath(render_data.output_dir), render_data.name)
+    os.makedirs(output_path, exist_ok=True)
+    jobs = [(scene_data, camera_name, render_data.width, render_data.height, output_path, meshes_dir, modes,
+             render_data.depth_format, render_data.segmentation_format)
+            for scene_data in render_data.scenes_data.values()
+            for camera_name in scene_data.cameras_data]
+    if num_workers > 0:
+        with concurrent.futures.ProcessPoolExecutor(num_workers) as executor:
+            list(executor.map(rasterize_camera, *zip(*jobs)))
+    else:
+        for job in jobs:
+            rasterize_camera(*job)
@@ -0,0 +1,90 @@
+import colorsys
+import weakref
+
+import matplotlib
+import numpy
+
+try:
+    import bpy
+except ImportError as e:
+    print(e)
+
+
+# per scene data: object name counts, dropped together with the scene data
+scene_registries = weakref.WeakKeyDictionary()
+# per blender session: the next free number of every material name prefix
+material_counts = {}
+segmentation_colors = list(matplotlib.colors.to_rgba_array(matplotlib.colors.TABLEAU_COLORS))
+
+
+class SceneRegistry:
+    def __init__(self, objects_data=None):
+        self.objects_data = objects_data
+        self.n_names = 0
+        # objects whose name starts with the key, for every shape name asked for so far
+        self.prefix_counts = {}
+        self.names = []
+
+    def add(self, name):
+        self.names.append(name)
+        for i_char in range(1, len(name) + 1):
+            if name[:i_char] in self.prefix_counts:
+                self.prefix_counts[name[:i_char]] += 1
+
+    def sync(self, objects_data):
+        # make_* scripts add objects to objects_data themselves, only the ones added since the last call are new
+        if objects_data is not self.objects_data or len(objects_data) < self.n_names:
+            self.__init__(objects_data)
+        n_new = len(objects_data) - self.n_names
+        if n_new > 0:
+            new_names = []
+            for object_name in reversed(objects_data):
+                if len(new_names) == n_new:
+                    break
+                new_names.append(objects_data[object_name].name)
+            for name in reversed(new_names):
+                self.add(name)
+        self.n_names = len(objects_data)
+
+    def get_count(self, prefix):
+        if prefix not in self.prefix_counts:
+            self.prefix_counts[prefix] = sum([1 for name in self.names if name.startswith(prefix)])
+        return self.prefix_counts[prefix]
+
+
+def get_scene_registry(scene_data):
+    if scene_data not in scene_registries:
+        scene_registries[scene_data] = SceneRegistry()
+    scene_registry = scene_registries[scene_data]
+    scene_registry.sync(scene_data.objects_data)
+    return scene_registry
+
+
+def get_object_name(scene_data, shape_name):
+    # same names as counting every object whose name starts with shape_name, so cube_01 also counts cube_01_large
+    return f'{shape_name}_{get_scene_registry(scene_data).get_count(shape_name)}'
+
+
+def get_material_name(prefix):
+    # numbers only go up within a session, names of purged materials are not handed out again
+    material_count = material_counts.get(prefix, 0)
+    while f'{prefix}_{material_count}' in bpy.data.materials:
+        material_count += 1
+    material_counts[prefix] = material_count + 1
+    return f'{prefix}_{material_count}'
+
+
+def get_segmentation_color(segmentation_id):
+    # the tableau colours first, then hues spread by the golden ratio at alternating brightness, which stay apart
+    # for any number of objects
+    while segmentation_id >= len(segmentation_colors):
+        i_color = len(segmentation_colors)
+        hue = (i_color * 0.618033988749895) % 1.0
+        segmentation_colors.append(numpy.array([*colorsys.hsv_to_rgb(hue, 0.8, (0.95, 0.75, 0.55)[i_color % 3]), 1.0]))
+    return segmentation_colors[segmentation_id]
+
+
+def get_segmentation_colors(n_colors):
+    if n_colors > 0:
+        get_segmentation_color(n_colors - 1)
+    return numpy.array(segmentation_colors[:n_colors]).reshape(-1, 4)
@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+
+
+# outputs by lib.manifest output hash, shared between renders and datasets: <cache_dir>/<hash[:2]>/<hash><extension>
+# with the manifest entry metadata in <hash>.json, which is written last and marks the entry complete
+cache_dir = None
+counters = {'hits': 0, 'misses': 0, 'stores': 0}
+
+
+def get_cache_path(output_hash, extension):
+    return os.path.join(cache_dir, output_hash[:2], f'{output_hash}{extension}')
+
+
+def link(src_path, dst_path):
+    # hard links cost nothing but need both paths on one filesystem, copies work everywhere
+    tmp_path = f'{dst_path}.tmp'
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src_path, tmp_path)
+    except OSError:
+        shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, dst_path)
+
+
+def release(output_path):
+    # an output hard linked to a cache entry is unlinked before it is rendered again, so writers that truncate
+    # files in place never change the cached copy
+    if cache_dir is not None and os.path.lexists(output_path):
+        os.remove(output_path)
+
+
+def fetch(output_hash, output_path):
+    # links a cached output to output_path and returns its manifest metadata, or None on a miss
+    if cache_dir is None:
+        return None
+    cache_path = get_cache_path(output_hash, os.path.splitext(output_path)[1])
+    metadata_path = get_cache_path(output_hash, '.json')
+    if not os.path.isfile(metadata_path) or not os.path.isfile(cache_path):
+        counters['misses'] += 1
+        return None
+    with open(metadata_path, 'r') as f:
+        metadata = json.load(f)
+    link(cache_path, output_path)
+    counters['hits'] += 1
+    return metadata
+
+
+def store(output_hash, output_path, metadata):
+    if cache_dir is None or not os.path.isfile(output_path):
+        return
+    metadata_path = get_cache_path(output_hash, '.json')
+    if os.path.isfile(metadata_path):
+        return
+    os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
+    link(output_path, get_cache_path(output_hash, os.path.splitext(output_path)[1]))
+    with open(f'{metadata_path}.tmp', 'w') as f:
+        json.dump(metadata, f)
+    os.replace(f'{metadata_path}.tmp', metadata_path)
+    counters['stores'] += 1
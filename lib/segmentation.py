@@ -0,0 +1,34 @@
+import cv2
+import numpy
+
+import lib.color
+import lib.registry
+
+
+# rgba paints every object in a palette colour, id writes the object index pass as a single channel uint16 png
+SEGMENTATION_FORMATS = ('rgba', 'id')
+
+
+def write_segmentation_ids(filepath, ids):
+    # 0 is the background, every other value is an object's pass index
+    cv2.imwrite(f'{filepath}.png', numpy.rint(ids).astype(numpy.uint16))
+
+
+def read_segmentation_ids(filepath):
+    return cv2.imread(filepath, cv2.IMREAD_UNCHANGED)
+
+
+def get_id_names(ids_table):
+    # id tables are stored with string keys, as json objects have them
+    return {int(segmentation_id): object_name for segmentation_id, object_name in ids_table.items()}
+
+
+def get_segmentation_rgba(ids):
+    # palette colours as blender writes them: the emission colour is linear and the png is srgb encoded. 0 is the
+    # background, every other id is a pass index
+    is_object = ids > 0
+    colors = lib.registry.get_segmentation_colors(int(ids.max()))
+    rgba = numpy.zeros((*ids.shape, 4), numpy.uint8)
+    rgba[is_object, :3] = numpy.rint(lib.color.linear_to_srgb(colors[ids[is_object] - 1, :3]) * 255)
+    rgba[is_object, 3] = 255
+    return rgba
@@ -0,0 +1,87 @@
+import concurrent.futures
+import json
+import threading
+
+import h5py
+import numpy
+
+import lib.data
+
+
+# runs output writes on background threads so encoding overlaps with rendering the next camera. submit blocks once
+# max_pending writes are queued so rendered pixels cannot pile up in memory, and on_done callbacks run on the
+# submitting thread in submission order, which keeps manifests consistent. num_workers=0 writes synchronously.
+class WriterPool:
+    def __init__(self, num_workers=1, max_pending=4, h5_path=None):
+        self.executor = concurrent.futures.ThreadPoolExecutor(num_workers) if num_workers > 0 else None
+        self.semaphore = threading.BoundedSemaphore(max(max_pending, 1))
+        self.pending = []
+        self.h5_lock = threading.Lock()
+        self.h5f = None if h5_path is None else h5py.File(h5_path, 'a')
+
+    def add_render(self, render_data: lib.data.render_data.RenderData):
+        if self.h5f is None:
+            return
+        with self.h5_lock:
+            render_group = self.h5f.require_group(render_data.name)
+            if 'render_data' in render_group:
+                del render_group['render_data']
+            render_group.create_dataset('render_data', data=json.dumps(lib.data.render_data.to_object(render_data)))
+
+    def write_h5(self, h5_key, output_path, attrs=None):
+        # same layout as render_to_h5.py: png bytes for images and arrays for npy outputs, with attrs such as the
+        # segmentation id table on the dataset
+        if output_path.endswith('.npy'):
+            data = numpy.load(output_path)
+        else:
+            with open(output_path, 'rb') as f:
+                data = numpy.array(f.read())
+        with self.h5_lock:
+            if h5_key in self.h5f:
+                del self.h5f[h5_key]
+            dataset = self.h5f.create_dataset(h5_key, data=data)
+            for attr_name, attr_value in (attrs or {}).items():
+                dataset.attrs[attr_name] = attr_value
+
+    def run(self, fn, args, outputs):
+        try:
+            if fn is not None:
+                fn(*args)
+            if self.h5f is not None:
+                for h5_key, output_path, attrs in outputs:
+                    self.write_h5(h5_key, output_path, attrs)
+        finally:
+            self.semaphore.release()
+
+    # queues fn(*args), then copies every (h5_key, output_path, attrs) in outputs into the hdf5 file if there is one
+    def submit(self, fn, *args, outputs=(), on_done=None):
+        self.semaphore.acquire()
+        if self.executor is None:
+            self.run(fn, args, outputs)
+            future = concurrent.futures.Future()
+            future.set_result(None)
+        else:
+            future = self.executor.submit(self.run, fn, args, outputs)
+        self.pending.append((future, on_done))
+        self.poll()
+
+    def poll(self, wait=False):
+        while len(self.pending) > 0 and (wait or self.pending[0][0].done()):
+            future, on_done = self.pending.pop(0)
+            # raises the exception of a failed write
+            future.result()
+            if on_done is not None:
+                on_done()
+
+    # waits for queued writes but drops their callbacks, used when the render that queued them failed
+    def drain(self):
+        concurrent.futures.wait([future for future, on_done in self.pending])
+        self.pending = []
+
+    def close(self):
+        self.poll(True)
+        if self.executor is not None:
+            self.executor.shutdown()
+        if self.h5f is not None:
+            self.h5f.close()
+            self.h5f = None
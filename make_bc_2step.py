@@ -1,137 +1,58 @@
 import argparse
-import copy
 import json
-import math
 import os
-import random
-import numpy
-import lib
-
-try:
-    import mathutils
-except ImportError as e:
-    print(e)
-
-
-def get_ground_object_data(scene_data: lib.data.scene_data.SceneData):
-    shape_pair = ('plane', 'plane')
-    color_pair = ('white', numpy.array([1.0, 1.0, 1.0, 1.0], dtype=float))
-    material_pair = ('solid', 'solid')
-    scale_pair = ('1', numpy.array((1, 1, 1), dtype=float))
-    pose = numpy.array([0, 0, 0, 0, 0, 0], dtype=float)
-    name = f'ground'
-
-    object_data = lib.data.object_data.ObjectData(name, shape_pair, material_pair, color_pair, scale_pair, pose)
-    return object_data
-
-
-def get_object_data(shape_name, scene_data: lib.data.scene_data.SceneData):
-    shape_value = os.path.join(scene_data.shape_dir, f'{shape_name}.blend', 'Object', shape_name)
-    shape_pair = (shape_name, shape_value)
-
-    color_pair = random.choice([*scene_data.properties['colors'].items()])
-    color_pair = (color_pair[0], numpy.append(numpy.array(color_pair[1], dtype=float) / 255, 1.0))
-
-    material_pair = None
-
-    scale_pair = ('scale_down', numpy.array([0.10, 0.10, 0.10]))
-
-    x = random.uniform(-1.5, 1.5)
-    y = random.uniform(-1.5, 1.5)
-    z = 1.3085 * 0.5 if shape_name == 'swell_bottle' else random.uniform(0.2796 * 0.5, 0.2796 * 4.0)
-    r_x = 0
-    r_y = 0
-    r_z = 0
-    pose = numpy.array([x, y, z, r_x, r_y, r_z], dtype=float)
-
-    shape_count = sum([1 for object_name, object_data in scene_data.objects_data.items()
-                       if object_data.name.startswith(shape_name)])
-    name = f'{shape_name}_{shape_count}'
-
-    object_data = lib.data.object_data.ObjectData(name, shape_pair, material_pair, color_pair, scale_pair, pose)
-    return object_data
-
 
-def get_camera_data(d, r_x, r_y, r_z, scene_data: lib.data.scene_data.SceneData):
-    name = f'cam{len(scene_data.cameras_data):02d}'
-
-    euler = mathutils.Euler((math.radians(r_x), math.radians(r_y), math.radians(r_z)), 'XYZ')
-    pos = mathutils.Vector((0, 0, d))
-    pos.rotate(euler)
-    pose = numpy.array([pos[0], pos[1], pos[2], r_x, r_y, r_z], dtype=float)
-
-    camera_data = lib.data.camera_data.CameraData(name, pose)
-    return camera_data
-
-
-def get_light_data(scene_data: lib.data.scene_data.SceneData):
-    name = 'light_0'
-    type = 'POINT'
-    energy = 1000.0
-
-    d = 10
-    r_x = 45
-    r_y = 0
-    r_z = 45
-    euler = mathutils.Euler((math.radians(r_x), math.radians(r_y), math.radians(r_z)))
-    pos = mathutils.Vector((0, 0, d))
-    pos.rotate(euler)
-    pose = numpy.array([pos[0], pos[1], pos[2], r_x, r_y, r_z], dtype=float)
-
-    light_data = lib.data.light_data.LightData(name, type, energy, pose)
-    return light_data
-
-
-def get_scene_data(name, args, reset_scene) -> lib.data.scene_data.SceneData:
-    scene_data = lib.data.scene_data.from_args(name, args, reset_scene)
-
-    ground_object_data = get_ground_object_data(scene_data)
-    scene_data.objects_data[ground_object_data.name] = ground_object_data
-
-    cap_data = get_object_data('swell_cap', scene_data)
-    scene_data.objects_data[cap_data.name] = cap_data
-    bottle_data = get_object_data('swell_bottle', scene_data)
-    scene_data.objects_data[bottle_data.name] = bottle_data
+import numpy
 
-    for r_x in numpy.linspace(60, 0, 3):
-        for r_z in numpy.linspace(0, 300, 6):
-            camera_data = get_camera_data(10, r_x, 0, r_z, scene_data)
-            scene_data.cameras_data[camera_data.name] = camera_data
+import lib
+import lib.generate
 
-    light_data = get_light_data(scene_data)
-    scene_data.lights_data[light_data.name] = light_data
 
-    return scene_data
+def sample_objects(properties, args, n_samples):
+    # a bottle standing at a random place and a cap floating at a random height
+    objects = []
+    for shape_name, z_low, z_high in (('swell_cap', 0.2796 * 0.5, 0.2796 * 4.0),
+                                      ('swell_bottle', 1.3085 * 0.5, 1.3085 * 0.5)):
+        objects.append(lib.generate.sample_objects(properties, args.shape_dir, n_samples,
+                                                   (-1.5, -1.5, z_low, 0, 0, 0), (1.5, 1.5, z_high, 0, 0, 0),
+                                                   shape_name=shape_name,
+                                                   scale_pair=('scale_down', numpy.array([0.10, 0.10, 0.10])),
+                                                   material_pair=None))
+    return list(zip(*objects))
 
 
-def get_render_data(name, args) -> lib.data.render_data.RenderData:
+def get_render_data(name, args, properties, objects, align_scale) -> lib.data.render_data.RenderData:
+    # objects has the initial objects of every scene of the first stage
     render_data = lib.data.render_data.from_args(name, args)
-    for i_scene in range(3 * args.num_scenes):
-        i_stage = i_scene // args.num_scenes
-        if i_stage == 0:
-            scene_data = get_scene_data(f'{i_scene:06d}', args, True)
-            render_data.scenes_data[scene_data.name] = scene_data
-
-            bottle_pose = scene_data.objects_data['swell_bottle_0'].pose
-            cap_init_pose = scene_data.objects_data['swell_cap_0'].pose
-            cap_align_pose = numpy.array([bottle_pose[0], bottle_pose[1], (1.3085 * 1.0) * random.uniform(1.1, 1.5), 0, 0, 0])
-            cap_approach_pose = numpy.array([bottle_pose[0], bottle_pose[1], (1.3085 * 1.0), 0, 0, 0])
-        elif i_stage == 1:
-            scene_data = copy.deepcopy(scene_data)
-            scene_data.name = f'{i_scene:06d}'
-            scene_data.reset_scene = False
-            scene_data.objects_data['swell_cap_0'].pose = cap_align_pose
-            render_data.scenes_data[scene_data.name] = scene_data
-        elif i_stage == 2:
-            scene_data = copy.deepcopy(scene_data)
-            scene_data.name = f'{i_scene:06d}'
-            scene_data.reset_scene = False
-            scene_data.objects_data['swell_cap_0'].pose = cap_approach_pose
-            render_data.scenes_data[scene_data.name] = scene_data
+    cameras_data = lib.generate.get_rig_cameras_data(10, numpy.linspace(60, 0, 3))
+
+    # every first stage scene is stored whole, the two steps after them only as the pose of the cap
+    scene_names = [f'{i_scene:06d}' for i_scene in range(3 * args.num_scenes)]
+    key_scenes_data = [lib.generate.get_scene_data(scene_names[i_scene], args, properties, True, objects[i_scene],
+                                                   cameras_data) for i_scene in range(args.num_scenes)]
+    key_names = [scene_names[min(i_scene, args.num_scenes - 1)] for i_scene in range(len(scene_names))]
+    bottle_pose = key_scenes_data[-1].objects_data['swell_bottle_0'].pose
+    cap_align_pose = numpy.array([bottle_pose[0], bottle_pose[1], (1.3085 * 1.0) * align_scale, 0, 0, 0])
+    cap_approach_pose = numpy.array([bottle_pose[0], bottle_pose[1], (1.3085 * 1.0), 0, 0, 0])
+    cap_poses = numpy.concatenate((
+        [scene_data.objects_data['swell_cap_0'].pose for scene_data in key_scenes_data],
+        numpy.tile(cap_align_pose, (args.num_scenes, 1)), numpy.tile(cap_approach_pose, (args.num_scenes, 1))))
+    render_data.scenes_data = lib.data.trajectory_data.from_scenes(key_scenes_data, scene_names, key_names,
+                                                                  {'swell_cap_0': cap_poses})
 
     return render_data
 
 
+def get_renders_data(names, args):
+    # everything random about the renders is sampled up front
+    properties = lib.generate.load_properties(args.properties_json)
+    objects = sample_objects(properties, args, len(names) * args.num_scenes)
+    align_scales = numpy.random.uniform(1.1, 1.5, len(names))
+    n_scenes = args.num_scenes
+    return [get_render_data(name, args, properties, objects[n_scenes * i_render:n_scenes * (i_render + 1)],
+                            align_scales[i_render]) for i_render, name in enumerate(names)]
+
+
 def main():
     parser = argparse.ArgumentParser()
     # scene
@@ -159,9 +80,7 @@ def main():
     parser.add_argument('--render_tile_size', default=256, type=int)
     args = parser.parse_args()
 
-    for render_i in range(args.num_renders):
-        render_data = get_render_data(f'{render_i:06d}', args)
-
+    for render_data in get_renders_data([f'{render_i:06d}' for render_i in range(args.num_renders)], args):
         os.makedirs(os.path.join(args.output_dir), exist_ok=True)
         with open(os.path.join(render_data.output_dir, f'{render_data.name}.json'), 'w') as f:
             json.dump(lib.data.render_data.to_object(render_data), f, indent=2)
@@ -2,116 +2,18 @@ import argparse
 import collections
 
 import numpy as np
-import pytorch3d.transforms
 import torch
 import tqdm
 import json
-import math
 import os
-import random
 
 from matplotlib import pyplot as plt
 
 import lib
+import lib.pose
 import torchvision
 import cv2
 
-try:
-    import mathutils
-except ImportError as e:
-    print(e)
-
-
-def get_ground_object_data(scene_data: lib.data.scene_data.SceneData):
-    shape_pair = ('plane', 'plane')
-    color_pair = ('white', np.array([1.0, 1.0, 1.0, 1.0], dtype=float))
-    material_pair = ('solid', 'solid')
-    scale_pair = ('1', np.array((1, 1, 1), dtype=float))
-    pose = np.array([0, 0, 0, 0, 0, 0], dtype=float)
-    name = f'ground'
-
-    object_data = lib.data.object_data.ObjectData(name, shape_pair, material_pair, color_pair, scale_pair, pose)
-    return object_data
-
-
-def get_object_data(shape_name, scene_data: lib.data.scene_data.SceneData):
-    shape_value = os.path.join(scene_data.shape_dir, f'{shape_name}.blend', 'Object', shape_name)
-    shape_pair = (shape_name, shape_value)
-
-    color_pair = random.choice([*scene_data.properties['colors'].items()])
-    color_pair = (color_pair[0], np.append(np.array(color_pair[1], dtype=float) / 255, 1.0))
-
-    material_pair = None
-
-    scale_pair = ('scale_down', np.array([0.10, 0.10, 0.10]))
-
-    x = random.uniform(-1.5, 1.5)
-    y = random.uniform(-1,5, 1.5)
-    z = 1.3085 * 0.5 if shape_name == 'swell_bottle' else 0.2796 * 0.5
-    r_x = 0
-    r_y = 0
-    r_z = 0
-    pose = np.array([x, y, z, r_x, r_y, r_z], dtype=float)
-
-    shape_count = sum([1 for object_name, object_data in scene_data.objects_data.items()
-                       if object_data.name.startswith(shape_name)])
-    name = f'{shape_name}_{shape_count}'
-
-    object_data = lib.data.object_data.ObjectData(name, shape_pair, material_pair, color_pair, scale_pair, pose)
-    return object_data
-
-
-def get_camera_data(d, r_x, r_y, r_z, scene_data: lib.data.scene_data.SceneData):
-    name = f'cam{len(scene_data.cameras_data):02d}'
-
-    euler = mathutils.Euler((math.radians(r_x), math.radians(r_y), math.radians(r_z)), 'XYZ')
-    pos = mathutils.Vector((0, 0, d))
-    pos.rotate(euler)
-    pose = np.array([pos[0], pos[1], pos[2], r_x, r_y, r_z], dtype=float)
-
-    camera_data = lib.data.camera_data.CameraData(name, pose)
-    return camera_data
-
-
-def get_light_data(scene_data: lib.data.scene_data.SceneData):
-    name = 'light_0'
-    type = 'POINT'
-    energy = 1000.0
-
-    d = 10
-    r_x = 45
-    r_y = 0
-    r_z = 45
-    euler = mathutils.Euler((math.radians(r_x), math.radians(r_y), math.radians(r_z)))
-    pos = mathutils.Vector((0, 0, d))
-    pos.rotate(euler)
-    pose = np.array([pos[0], pos[1], pos[2], r_x, r_y, r_z], dtype=float)
-
-    light_data = lib.data.light_data.LightData(name, type, energy, pose)
-    return light_data
-
-
-def get_scene_data(name, args, reset_scene) -> lib.data.scene_data.SceneData:
-    scene_data = lib.data.scene_data.from_args(name, args, reset_scene)
-
-    ground_object_data = get_ground_object_data(scene_data)
-    scene_data.objects_data[ground_object_data.name] = ground_object_data
-
-    cap_data = get_object_data('swell_cap', scene_data)
-    scene_data.objects_data[cap_data.name] = cap_data
-    bottle_data = get_object_data('swell_bottle', scene_data)
-    scene_data.objects_data[bottle_data.name] = bottle_data
-
-    for r_x in np.linspace(60, 0, 3):
-        for r_z in np.linspace(0, 300, 6):
-            camera_data = get_camera_data(10, r_x, 0, r_z, scene_data)
-            scene_data.cameras_data[camera_data.name] = camera_data
-
-    light_data = get_light_data(scene_data)
-    scene_data.lights_data[light_data.name] = light_data
-
-    return scene_data
-
 
 def get_render_data(name, args) -> lib.data.render_data.RenderData:
 
@@ -146,9 +48,9 @@ def get_render_data(name, args) -> lib.data.render_data.RenderData:
         worldtnext = worldTcamera @ cameratnext
         currqnext = action[3:7]
         currqnext[1:] = torch.transpose(cameraTcurr[:3, :3], 1, 0) @ currqnext[1:]
-        currRnext = pytorch3d.transforms.quaternion_to_matrix(currqnext)
+        currRnext = torch.from_numpy(lib.pose.quaternion_to_matrix(currqnext.numpy()))
         worldRnext = worldTcurr[:3, :3] @ currRnext
-        next_inferred_pose = torch.concat([worldtnext[:3], pytorch3d.transforms.matrix_to_euler_angles(worldRnext, 'XYZ')], 0)
+        next_inferred_pose = torch.concat([worldtnext[:3], torch.from_numpy(lib.pose.matrix_to_intrinsic_euler(worldRnext.numpy()))], 0)
 
         subgoal_item = subgoal.item()
         action_list = action.tolist()
@@ -184,7 +86,7 @@ def get_render_data(name, args) -> lib.data.render_data.RenderData:
         cameraTnext = cameraTcurr @ currTnext
         cameratnext[:3] = torch.as_tensor(action_pred[:3]).double() + cameraTcurr[:3, 3]
         worldTnext = worldTcamera @ cameraTnext
-        next_inferred_pose = torch.concat([worldTnext[:3], pytorch3d.transforms.matrix_to_euler_angles(worldTnext[:3, :3], 'XYZ')], 0)
+        next_inferred_pose = torch.concat([worldTnext[:3], torch.from_numpy(lib.pose.matrix_to_intrinsic_euler(worldTnext[:3, :3].numpy()))], 0)
 
         next_inferred_pose = next_inferred_pose.tolist()
         next_inferred_pose = [round(a, 3) for a in next_inferred_pose]
@@ -0,0 +1,28 @@
+import argparse
+import json
+import os
+import time
+
+import lib.data
+import lib.rasterize
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--renders_dir', type=str, default='output/caps_bc_2step')
+    parser.add_argument('--meshes_dir', type=str, default='data/meshes')
+    parser.add_argument('--modes', type=str, default=('nocs', 'segmentation', 'depth'), nargs='+')
+    parser.add_argument('--num_workers', type=int, default=0)
+    args = parser.parse_args()
+
+    start_time = time.time()
+    n_renders = 0
+    n_scenes = 0
+    for dir_entry in sorted(os.scandir(args.renders_dir), key=lambda dir_entry: dir_entry.name):
+        if dir_entry.name.endswith('.json'):
+            with open(dir_entry.path, 'r') as f:
+                render_data = lib.data.render_data.from_object(json.load(f), lib.data.render_data.RenderData)
+            lib.rasterize.rasterize_render(render_data, args.meshes_dir, args.modes, args.num_workers)
+            n_renders += 1
+            n_scenes += len(render_data.scenes_data)
+
+    print('finished rasterizing', n_renders, 'renders with', n_scenes, f'scenes in {time.time() - start_time:.3f} seconds')
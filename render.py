@@ -1,6 +1,7 @@
 import argparse
 import json
 import os
+import sys
 import time
 
 import lib
@@ -8,17 +9,93 @@ import lib
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--renders_dir', type=str, default='output/caps_bc_2step')
-    args = parser.parse_args()
+    parser.add_argument('--render_json', type=str, default=None)
+    parser.add_argument('--num_workers', type=int, default=0)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--scenes_per_shard', type=int, default=None)
+    # cost model json from estimate_cost.py --calibrate, used to cut and order farm shards
+    parser.add_argument('--cost_model', type=str, default=None)
+    # blender executable of the farm workers, blender on the path by default
+    parser.add_argument('--blender', type=str, default=None)
+    parser.add_argument('--no_clean', action='store_true')
+    parser.add_argument('--resume', action='store_true')
+    parser.add_argument('--nocs_cache_dir', type=str, default=None)
+    # outputs by content hash, frames already rendered by any render sharing the directory are linked from it
+    parser.add_argument('--render_cache_dir', type=str, default=None)
+    lib.data.render_data.add_override_arguments(parser, {'depth_format': lib.depth.DEPTH_FORMATS,
+                                                         'segmentation_format': lib.segmentation.SEGMENTATION_FORMATS})
+    # background threads encoding outputs while the next camera renders, 0 writes synchronously
+    parser.add_argument('--num_writers', type=int, default=1)
+    parser.add_argument('--max_pending_writes', type=int, default=4)
+    parser.add_argument('--output_h5', type=str, default=None)
+    # writes profile_<first scene>.json/.csv with per stage timings next to the outputs
+    parser.add_argument('--profile', action='store_true')
+    parser.add_argument('--profile_chrome', action='store_true')
+    # past this resident memory in megabytes the process restarts itself between scenes and resumes
+    parser.add_argument('--max_rss', type=float, default=None)
+    # blender passes the script arguments after '--'
+    args = parser.parse_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else None)
+
+    if args.render_json is not None:
+        render_paths = [args.render_json]
+    else:
+        render_paths = sorted([dir_entry.path for dir_entry in os.scandir(args.renders_dir)
+                               if dir_entry.name.endswith('.json')])
+
+    overrides = lib.data.render_data.get_overrides(args)
+
+    if args.num_workers > 0:
+        if args.output_h5 is not None:
+            parser.error('--output_h5 needs a single process, use render_to_h5.py after a farm render')
+        worker_args = ['--num_writers', str(args.num_writers), '--max_pending_writes', str(args.max_pending_writes)]
+        if args.threads is not None:
+            worker_args += ['--threads', str(args.threads)]
+        if args.resume:
+            worker_args += ['--resume']
+        if args.nocs_cache_dir is not None:
+            worker_args += ['--nocs_cache_dir', args.nocs_cache_dir]
+        if args.render_cache_dir is not None:
+            worker_args += ['--render_cache_dir', args.render_cache_dir]
+        if args.profile:
+            worker_args += ['--profile']
+        if args.profile_chrome:
+            worker_args += ['--profile_chrome']
+        if args.max_rss is not None:
+            worker_args += ['--max_rss', str(args.max_rss)]
+        failed_shards = lib.farm.render_farm(render_paths, args.num_workers, args.scenes_per_shard, args.resume,
+                                             args.blender, overrides, worker_args, args.cost_model)
+        sys.exit(1 if len(failed_shards) > 0 else 0)
+
+    lib.blend_nocs.cache_dir = args.nocs_cache_dir
+    lib.render_cache.cache_dir = args.render_cache_dir
+    if args.profile or args.profile_chrome:
+        lib.profile.enable()
 
     start_time = time.time()
     n_renders = 0
     n_scenes = 0
-    for dir_entry in os.scandir(args.renders_dir):
-        if dir_entry.name.endswith('.json'):
-            with open(dir_entry.path, 'r') as f:
-                render_data = lib.data.render_data.from_object(json.load(f), lib.data.render_data.RenderData)
-                lib.blend.blend_render(render_data)
-                n_renders += 1
-                n_scenes += len(render_data.scenes_data)
+    writer_pool = lib.writer.WriterPool(args.num_writers, args.max_pending_writes, args.output_h5)
+    for render_path in render_paths:
+        with open(render_path, 'r') as f:
+            render_data = lib.data.render_data.from_object(json.load(f), lib.data.render_data.RenderData)
+            lib.data.render_data.set_overrides(render_data, overrides)
+            try:
+                lib.blend.blend_render(render_data, not args.no_clean, args.threads, args.resume, writer_pool,
+                                       max_rss=args.max_rss)
+            except lib.memory.MemoryCeilingExceeded as e:
+                # finished outputs are in the manifests, so the fresh process skips them with --resume
+                print('restarting at memory ceiling,', e)
+                writer_pool.close()
+                lib.memory.restart(['--resume'])
+            if lib.profile.enabled:
+                lib.profile.write(lib.profile.get_profile_path(render_data), args.profile_chrome)
+                print('profile', lib.profile.get_summary())
+                lib.profile.clear()
+            n_renders += 1
+            n_scenes += len(render_data.scenes_data)
+    writer_pool.close()
 
     print('finished rendering', n_renders, 'renders with', n_scenes, f'scenes in {time.time() - start_time:.3f} seconds')
+    print('asset cache', lib.assets.counters)
+    if lib.render_cache.cache_dir is not None:
+        print('render cache', lib.render_cache.counters)
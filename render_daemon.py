@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+import traceback
+
+import lib
+
+
+# a job is one json object: {"render_json": path} or {"render_data": {...}}, optionally with "overrides",
+# "resume" and "clean". every event sent back is one json line, the last one is either "done" or "error".
+def run_job(job, writer_pool, threads, emit):
+    start_time = time.time()
+    try:
+        if 'render_data' in job:
+            render_object = job['render_data']
+        else:
+            with open(job['render_json'], 'r') as f:
+                render_object = json.load(f)
+        render_data = lib.data.render_data.from_object(render_object, lib.data.render_data.RenderData)
+        lib.data.render_data.set_overrides(render_data, job.get('overrides', {}))
+        emit({'event': 'start', 'name': render_data.name, 'n_scenes': len(render_data.scenes_data)})
+
+        def on_camera(scene_name, camera_name, modes):
+            emit({'event': 'camera', 'scene': scene_name, 'camera': camera_name, 'modes': list(modes),
+                  'seconds': time.time() - start_time})
+
+        lib.blend.blend_render(render_data, job.get('clean', True), threads, job.get('resume', False), writer_pool,
+                               on_camera)
+        emit({'event': 'done', 'seconds': time.time() - start_time})
+    except Exception as e:
+        traceback.print_exc()
+        # the blender scene may be half built, so the next job starts from a full reset
+        writer_pool.drain()
+        lib.blend.blended_scene_data = None
+        emit({'event': 'error', 'message': repr(e), 'seconds': time.time() - start_time})
+
+
+def recycle(writer_pool, max_rss):
+    # blend_render frees orphan datablocks after every job, what still grows past max_rss is freed by restarting
+    # the daemon between jobs, where no job is half done
+    if lib.memory.is_over(max_rss):
+        print(f'restarting at {lib.memory.get_rss():.0f} MB, over the ceiling of {max_rss} MB')
+        writer_pool.close()
+        lib.memory.restart()
+
+
+def serve_socket(socket_path, writer_pool, threads, max_rss=None):
+    class JobHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if len(line.strip()) == 0:
+                    continue
+
+                def emit(event):
+                    self.wfile.write((json.dumps(event) + '\n').encode())
+                    self.wfile.flush()
+
+                run_job(json.loads(line), writer_pool, threads, emit)
+                recycle(writer_pool, max_rss)
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    # jobs are handled one at a time on the main thread, bpy is not thread safe
+    with socketserver.UnixStreamServer(socket_path, JobHandler) as server:
+        print('render daemon listening on', socket_path)
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(socket_path)
+
+
+def serve_queue(queue_dir, writer_pool, threads, poll_interval, max_rss=None):
+    done_dir = os.path.join(queue_dir, 'done')
+    os.makedirs(done_dir, exist_ok=True)
+    print('render daemon watching', queue_dir)
+    while True:
+        job_paths = sorted([dir_entry.path for dir_entry in os.scandir(queue_dir)
+                            if dir_entry.is_file() and dir_entry.name.endswith('.json')])
+        if len(job_paths) == 0:
+            time.sleep(poll_interval)
+            continue
+
+        job_path = job_paths[0]
+        with open(job_path, 'r') as f:
+            job = json.load(f)
+        # the job itself can be a render json, which is rendered as is
+        if 'render_json' not in job and 'render_data' not in job:
+            job = {'render_data': job}
+        events_path = os.path.join(done_dir, os.path.splitext(os.path.basename(job_path))[0] + '.events.jsonl')
+        with open(events_path, 'w') as events_file:
+            def emit(event):
+                events_file.write(json.dumps(event) + '\n')
+                events_file.flush()
+
+            run_job(job, writer_pool, threads, emit)
+        os.replace(job_path, os.path.join(done_dir, os.path.basename(job_path)))
+        recycle(writer_pool, max_rss)
+
+
+def submit(socket_path, job):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps(job) + '\n').encode())
+        client.shutdown(socket.SHUT_WR)
+        with client.makefile('r') as f:
+            for line in f:
+                event = json.loads(line)
+                print(json.dumps(event))
+                if event['event'] in ('done', 'error'):
+                    return event['event'] == 'done'
+    return False
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--socket', type=str, default=None)
+    parser.add_argument('--queue_dir', type=str, default=None)
+    parser.add_argument('--poll_interval', type=float, default=0.5)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--num_writers', type=int, default=1)
+    parser.add_argument('--max_pending_writes', type=int, default=4)
+    parser.add_argument('--nocs_cache_dir', type=str, default=None)
+    parser.add_argument('--render_cache_dir', type=str, default=None)
+    parser.add_argument('--max_rss', type=float, default=None)
+    # client side: send a render json to a running daemon and print its events
+    parser.add_argument('--submit', type=str, default=None)
+    parser.add_argument('--resume', action='store_true')
+    # blender passes the script arguments after '--'
+    args = parser.parse_args(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else None)
+
+    if args.submit is not None:
+        if args.socket is None:
+            parser.error('--submit needs --socket')
+        sys.exit(0 if submit(args.socket, {'render_json': os.path.abspath(args.submit), 'resume': args.resume})
+                 else 1)
+
+    lib.blend_nocs.cache_dir = args.nocs_cache_dir
+    lib.render_cache.cache_dir = args.render_cache_dir
+    writer_pool = lib.writer.WriterPool(args.num_writers, args.max_pending_writes)
+    try:
+        if args.socket is not None:
+            serve_socket(args.socket, writer_pool, args.threads, args.max_rss)
+        elif args.queue_dir is not None:
+            serve_queue(args.queue_dir, writer_pool, args.threads, args.poll_interval, args.max_rss)
+        else:
+            parser.error('one of --socket or --queue_dir is needed')
+    finally:
+        writer_pool.close()
@@ -4,6 +4,8 @@ import imageio
 import numpy
 from pygifsicle import pygifsicle
 
+import lib.depth
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--render_dir', type=str, default='output/caps_onlycap_small/000002')
@@ -11,7 +13,7 @@ if __name__ == '__main__':
 
     camera_mode_frames = {}
     for dir_entry in os.scandir(args.render_dir):
-        if dir_entry.name.endswith('png'):
+        if dir_entry.name.endswith('png') or dir_entry.name.endswith('npy'):
             i_frame, camera, mode = dir_entry.name.split('_')
             mode = mode.split('.')[0]
             camera_mode = f'{camera}_{mode}'
@@ -19,8 +21,7 @@ if __name__ == '__main__':
                 camera_mode_frames[camera_mode] = []
 
             if mode.startswith('depth'):
-                bgra = numpy.array(imageio.v3.imread(dir_entry.path), dtype=float)
-                depth = 2.0 ** (bgra[:, :, 2] - 128) * (bgra[:, :, 1] / 256 + bgra[:, :, 0] / 256 ** 2 + bgra[:, :, 3] / 256 ** 3)
+                depth = lib.depth.read_depth(os.path.splitext(dir_entry.path)[0])
                 normalized_depth = numpy.clip((depth - numpy.min(depth)) / (numpy.max(depth) - numpy.min(depth)) * 255, 0, 255).astype(numpy.uint8)
                 camera_mode_frames[camera_mode].append(normalized_depth)
             else:
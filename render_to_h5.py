@@ -14,18 +14,26 @@ import lib
 def write(render_data, render_dir, h5f):
     render_group = h5f.create_group(render_data.name)
     render_group.create_dataset('render_data', data=json.dumps(lib.data.render_data.to_object(render_data)))
+    render_data.output_dir = render_dir
     for scene_name, scene_data in tqdm.tqdm(render_data.scenes_data.items(), leave=False):
         scene_group = render_group.create_group(scene_name)
+        scene_manifest = lib.manifest.load_scene_manifest(render_data, scene_name)
         for camera_name in scene_data.cameras_data:
             camera_group = scene_group.create_group(camera_name)
             for mode in render_data.modes:
-                render_data.output_dir = render_dir
-                png_path = os.path.join(render_data.output_dir, render_data.name,
-                                        f'{mode}_{scene_name}_{camera_name}.png')
-                with Image.open(png_path) as imf:
+                output_path = os.path.join(render_data.output_dir, render_data.name,
+                                           lib.manifest.get_output_file(render_data, mode, scene_name, camera_name))
+                if output_path.endswith('.npy'):
+                    camera_group.create_dataset(mode, data=numpy.load(output_path))
+                    continue
+                with Image.open(output_path) as imf:
                     buf = io.BytesIO()
                     imf.save(buf, 'png')
-                camera_group.create_dataset(mode, data=numpy.array(buf.getvalue()))
+                dataset = camera_group.create_dataset(mode, data=numpy.array(buf.getvalue()))
+                # segmentation outputs carry their id to object name table
+                output_entry = scene_manifest.get(lib.manifest.get_output_key(mode, scene_name, camera_name), {})
+                if 'ids' in output_entry:
+                    dataset.attrs['ids'] = json.dumps(output_entry['ids'])
 
 
 def main():
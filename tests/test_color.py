@@ -0,0 +1,23 @@
+import numpy
+
+import lib.color
+import lib.registry
+import lib.segmentation
+
+
+def test_linear_to_srgb():
+    # values of blender's standard view transform
+    colors = numpy.array([0.0, 0.0031308, 0.18, 0.5, 1.0, 2.0])
+    expected = numpy.array([0.0, 0.04045, 0.461356, 0.735357, 1.0, 1.0])
+    assert numpy.allclose(lib.color.linear_to_srgb(colors), expected, atol=1e-5)
+
+
+def test_segmentation_rgba():
+    ids = numpy.array([[0, 1], [2, 3]])
+    rgba = lib.segmentation.get_segmentation_rgba(ids)
+    colors = lib.registry.get_segmentation_colors(3)
+    assert numpy.array_equal(rgba[0, 0], [0, 0, 0, 0])
+    for segmentation_id in (1, 2, 3):
+        expected = numpy.rint(lib.color.linear_to_srgb(colors[segmentation_id - 1, :3]) * 255)
+        assert numpy.array_equal(rgba[ids == segmentation_id][0, :3], expected)
+        assert rgba[ids == segmentation_id][0, 3] == 255
@@ -0,0 +1,67 @@
+import numpy
+import pytest
+
+import lib.cost
+import lib.data
+
+COST_MODEL = {
+    'reset_seconds': 1.0,
+    'scene_seconds': 0.5,
+    'object_seconds': 0.25,
+    'modes': {
+        'rgba': [1.0, 0.01, 0.001],
+        'depth': [0.5, 0.001, 0.0],
+    },
+}
+
+
+def get_scene_data(name, base_scene_blendfile, shapes, n_cameras):
+    scene_data = lib.data.scene_data.SceneData(name, base_scene_blendfile, None, None, None, False)
+    for object_name, shape in shapes.items():
+        scene_data.objects_data[object_name] = lib.data.object_data.ObjectData(object_name, ('shapenet', shape), None,
+                                                                               None, None, numpy.zeros(6))
+    for i_camera in range(n_cameras):
+        camera_name = f'camera_{i_camera}'
+        scene_data.cameras_data[camera_name] = lib.data.camera_data.CameraData(camera_name, numpy.zeros(6))
+    return scene_data
+
+
+def get_render_data():
+    render_data = lib.data.render_data.RenderData('test', None, False, 10, 10, None, 'CPU', 4, 0, 2, ['rgba', 'depth'])
+    # the second scene moves a, swaps the shape of b and adds c, the third changes the base scene
+    scenes_data = [get_scene_data('scene_0', 'a.blend', {'a': 'mug', 'b': 'bowl'}, 2),
+                   get_scene_data('scene_1', 'a.blend', {'a': 'mug', 'b': 'can', 'c': 'mug'}, 1),
+                   get_scene_data('scene_2', 'b.blend', {'a': 'mug'}, 1)]
+    render_data.scenes_data = {scene_data.name: scene_data for scene_data in scenes_data}
+    return render_data
+
+
+def test_scene_costs():
+    # rgba 1 + 0.01 * 400 + 0.001 * 400 * 2 and depth 0.5 + 0.001 * 100 seconds per camera
+    render_data = get_render_data()
+    assert lib.cost.get_scene_costs(render_data, COST_MODEL) == pytest.approx([1 + 0.5 + 0.5 + 2 * 6.4,
+                                                                              0.5 + 0.5 + 6.4,
+                                                                              1 + 0.5 + 0.25 + 6.4])
+    assert lib.cost.get_reset_costs(render_data, COST_MODEL) == pytest.approx([0.0, 1 + 0.25, 0.0])
+
+
+def test_frame_time_limit():
+    render_data = get_render_data()
+    render_data.frame_time_limit = 1.0
+    assert lib.cost.get_camera_cost(render_data, 'rgba', COST_MODEL) == pytest.approx(2.0)
+    assert lib.cost.get_camera_cost(render_data, 'depth', COST_MODEL) == pytest.approx(0.6)
+
+
+def test_cost_scene_ranges():
+    assert lib.cost.get_cost_scene_ranges([1, 2, 3, 4], 3) == [(0, 2), (2, 3), (3, 4)]
+    # the second range pays 1 to build scene 3 from scratch
+    reset_costs = [0, 1, 1, 1]
+    scene_ranges = lib.cost.get_cost_scene_ranges([1, 2, 3, 4], 4, reset_costs)
+    assert scene_ranges == [(0, 3), (3, 4)]
+    assert [lib.cost.get_range_cost([1, 2, 3, 4], reset_costs, start, end) for start, end in scene_ranges] == [6, 5]
+
+
+def test_makespan():
+    assert lib.cost.get_makespan([3, 2, 2, 1], 2) == 4
+    assert lib.cost.get_makespan([3, 2, 2, 1], 1) == 8
+    assert lib.cost.get_makespan([5, 1, 1, 1], 4) == 5
@@ -0,0 +1,23 @@
+import numpy
+
+import lib.depth
+
+
+def test_round_trip_relative_error():
+    zs = numpy.geomspace(1e-3, 1e4, 100000).astype(numpy.float32).reshape(100, 1000)
+    decoded = lib.depth.decode_depth(lib.depth.encode_depth(zs))
+    assert numpy.max(numpy.abs(decoded - zs) / zs) < 1e-6
+
+
+def test_powers_of_two():
+    zs = numpy.array([[0.5, 1.0, 2.0, 4.0, 1024.0]], dtype=numpy.float32)
+    assert numpy.array_equal(lib.depth.decode_depth(lib.depth.encode_depth(zs)), zs)
+
+
+def test_write_read(tmp_path):
+    zs = numpy.geomspace(0.1, 100, 64 * 64).astype(numpy.float32).reshape(64, 64)
+    filepath = str(tmp_path / 'depth')
+    for depth_format, max_error in (('png', 1e-6), ('float32', 0.0), ('float16', 1e-3)):
+        lib.depth.write_depth(filepath, zs, depth_format)
+        decoded = lib.depth.read_depth(filepath, depth_format)
+        assert numpy.max(numpy.abs(decoded - zs) / zs) <= max_error
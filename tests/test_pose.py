@@ -0,0 +1,100 @@
+import numpy
+
+import lib.pose
+
+EULERS = numpy.array([[0.1, 0.2, 0.3], [-1.2, 0.7, 2.5]])
+# pytorch3d.transforms.euler_angles_to_matrix(EULERS, 'XYZ'), the labels lib.dataset was written against
+INTRINSIC_MATRICES = numpy.array([[[0.93629336, -0.28962948, 0.19866933],
+                                   [0.31299183, 0.94470249, -0.0978434],
+                                   [-0.15934508, 0.153792, 0.97517033]],
+                                  [[-0.61274844, -0.45773674, 0.64421769],
+                                   [0.69789654, 0.06904366, 0.71286281],
+                                   [-0.37078265, 0.88640287, 0.2771465]]])
+# blender's Euler(EULERS, 'XYZ').to_matrix()
+MATRICES = numpy.array([[[0.93629336, -0.27509585, 0.21835066],
+                         [0.28962948, 0.95642509, -0.03695701],
+                         [-0.19866933, 0.0978434, 0.97517033]],
+                        [[-0.61274844, 0.2641745, -0.74481621],
+                         [0.45773674, -0.64964486, -0.60699146],
+                         [-0.64421769, -0.71286281, 0.2771465]]])
+
+
+def get_random_quaternions(n):
+    quaternions = numpy.random.default_rng(0).normal(size=(n, 4))
+    return quaternions / numpy.linalg.norm(quaternions, axis=-1, keepdims=True)
+
+
+def test_intrinsic_euler():
+    assert numpy.allclose(lib.pose.intrinsic_euler_to_matrix(EULERS), INTRINSIC_MATRICES, atol=1e-7)
+    assert numpy.allclose(lib.pose.matrix_to_intrinsic_euler(INTRINSIC_MATRICES), EULERS, atol=1e-7)
+
+
+def test_euler():
+    assert numpy.allclose(lib.pose.euler_to_matrix(EULERS), MATRICES, atol=1e-7)
+    assert numpy.allclose(lib.pose.matrix_to_euler(MATRICES), EULERS, atol=1e-7)
+    # both solutions of a rotation are the same rotation
+    for euler in lib.pose.get_euler_solutions(MATRICES):
+        assert numpy.allclose(lib.pose.euler_to_matrix(euler), MATRICES, atol=1e-7)
+
+
+def test_gimbal_lock():
+    euler = numpy.array([0.4, numpy.pi / 2, 0.0])
+    matrix = lib.pose.euler_to_matrix(euler)
+    assert numpy.allclose(lib.pose.euler_to_matrix(lib.pose.matrix_to_euler(matrix)), matrix)
+
+
+def test_compatible_euler():
+    reference = numpy.array([0.1, 0.2, 0.3 + 4 * numpy.pi])
+    euler = lib.pose.matrix_to_compatible_euler(MATRICES[0], reference)
+    assert numpy.allclose(euler, reference)
+
+
+def test_quaternion():
+    # a quarter turn about x
+    quaternion = numpy.array([numpy.cos(numpy.pi / 4), numpy.sin(numpy.pi / 4), 0, 0])
+    matrix = numpy.array([[1, 0, 0], [0, 0, -1], [0, 1, 0]])
+    assert numpy.allclose(lib.pose.quaternion_to_matrix(quaternion), matrix)
+    assert numpy.allclose(lib.pose.matrix_to_quaternion(matrix), quaternion)
+
+    quaternions = get_random_quaternions(1000)
+    matrices = lib.pose.quaternion_to_matrix(quaternions)
+    assert numpy.allclose(matrices @ numpy.swapaxes(matrices, -1, -2), numpy.eye(3))
+    # q and -q are the same rotation, matrix_to_quaternion returns the one with a non negative real part
+    round_trip = lib.pose.matrix_to_quaternion(matrices)
+    assert numpy.all(round_trip[:, 0] >= 0)
+    assert numpy.allclose(round_trip, numpy.where(quaternions[:, :1] < 0, -quaternions, quaternions))
+
+
+def test_quaternion_multiply():
+    quaternions_0 = get_random_quaternions(100)
+    quaternions_1 = get_random_quaternions(200)[100:]
+    assert numpy.allclose(lib.pose.quaternion_to_matrix(lib.pose.quaternion_multiply(quaternions_0, quaternions_1)),
+                          lib.pose.quaternion_to_matrix(quaternions_0) @ lib.pose.quaternion_to_matrix(quaternions_1))
+
+
+def test_slerp():
+    quaternion_0 = numpy.array([1.0, 0, 0, 0])
+    quaternion_1 = numpy.array([numpy.cos(numpy.pi / 4), 0, 0, numpy.sin(numpy.pi / 4)])
+    assert numpy.allclose(lib.pose.slerp(quaternion_0, quaternion_1, 0.0), quaternion_0)
+    assert numpy.allclose(lib.pose.slerp(quaternion_0, quaternion_1, 1.0), quaternion_1)
+    # half of a quarter turn about z
+    assert numpy.allclose(lib.pose.slerp(quaternion_0, quaternion_1, 0.5),
+                          [numpy.cos(numpy.pi / 8), 0, 0, numpy.sin(numpy.pi / 8)])
+    # the shorter arc, whichever sign the second quaternion has
+    assert numpy.allclose(lib.pose.slerp(quaternion_0, -quaternion_1, 0.5),
+                          [numpy.cos(numpy.pi / 8), 0, 0, numpy.sin(numpy.pi / 8)])
+
+
+def test_transform():
+    transforms = lib.pose.get_transform(numpy.array([[1.0, 2.0, 3.0], [-4.0, 0.5, 2.0]]), MATRICES)
+    assert numpy.allclose(lib.pose.invert_transform(transforms) @ transforms, numpy.eye(4))
+    poses = numpy.array([[1.0, 2.0, 3.0, 10.0, -20.0, 30.0], [0.0, -1.0, 5.0, 170.0, 45.0, -90.0]])
+    assert numpy.allclose(lib.pose.transform_to_pose(lib.pose.pose_to_transform(poses)), poses)
+
+
+def test_look_at_poses():
+    locations = numpy.array([[0.0, -5.0, 2.0], [3.0, 3.0, 3.0], [0.0, 0.0, 4.0]])
+    rotations = lib.pose.pose_to_transform(lib.pose.get_look_at_poses(locations))[:, :3, :3]
+    # the camera's -z points at the origin
+    directions = -locations / numpy.linalg.norm(locations, axis=-1, keepdims=True)
+    assert numpy.allclose(-rotations[:, :, 2], directions)
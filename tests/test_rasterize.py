@@ -0,0 +1,47 @@
+import os
+
+import cv2
+import numpy
+
+import lib.color
+import lib.data
+import lib.rasterize
+
+
+def get_cube_scene_data(meshes_dir):
+    # a 2x2x2 cube at the origin seen straight down from z=5, so only its top face is visible
+    vertices = numpy.array([[x, y, z] for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)], dtype=float)
+    triangles = numpy.array([[0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+                             [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3]])
+    numpy.savez(os.path.join(meshes_dir, 'test_cube.npz'), vertices=vertices, triangles=triangles,
+                scale=numpy.ones(3))
+
+    scene_data = lib.data.scene_data.SceneData('000000', None, None, None, None, True)
+    scene_data.objects_data['test_cube_0'] = lib.data.object_data.ObjectData(
+        'test_cube_0', ('test_cube', None), None, None, ('scale', numpy.ones(3)), numpy.zeros(6))
+    scene_data.cameras_data['camera_0'] = lib.data.camera_data.CameraData('camera_0', numpy.array([0, 0, 5, 0, 0, 0.0]))
+    return scene_data
+
+
+def test_cube_nocs(tmp_path):
+    width, height = 64, 64
+    scene_data = get_cube_scene_data(str(tmp_path))
+    lib.rasterize.rasterize_camera(scene_data, 'camera_0', width, height, str(tmp_path), str(tmp_path), ['nocs'])
+    rgba = cv2.cvtColor(cv2.imread(os.path.join(str(tmp_path), 'nocs_000000_camera_0.png'), cv2.IMREAD_UNCHANGED),
+                        cv2.COLOR_BGRA2RGBA).astype(int)
+
+    # the world point under every pixel centre of the top face at depth 4
+    focal = lib.rasterize.CAMERA_LENS / lib.rasterize.CAMERA_SENSOR_WIDTH * max(width, height)
+    xs = (numpy.arange(width) + 0.5 - width / 2) / focal * 4
+    ys = (height / 2 - numpy.arange(height) - 0.5) / focal * 4
+    xs, ys = numpy.meshgrid(xs, ys)
+    # the nocs corners of the top face are 0 or 1 in every channel, which srgb leaves as they are, so the linear
+    # interpolation blender shades with is the normalised coordinate itself
+    expected = numpy.rint(lib.color.linear_to_srgb(numpy.stack(((xs + 1) / 2, (ys + 1) / 2, numpy.ones_like(xs)),
+                                                               axis=-1)) * 255)
+
+    is_inside = (numpy.abs(xs) < 0.95) & (numpy.abs(ys) < 0.95)
+    is_outside = (numpy.abs(xs) > 1.05) | (numpy.abs(ys) > 1.05)
+    assert numpy.max(numpy.abs(rgba[is_inside, :3] - expected[is_inside])) <= 1
+    assert numpy.all(rgba[is_inside, 3] == 255)
+    assert numpy.all(rgba[is_outside] == 0)
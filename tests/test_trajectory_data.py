@@ -0,0 +1,78 @@
+import json
+
+import numpy
+
+import lib.data
+
+
+def get_key_scene_data(name, shape):
+    scene_data = lib.data.scene_data.SceneData(name, 'base_scene.blend', None, None, None, True)
+    for object_name, pose in (('moving', [0, 0, 0, 0, 0, 0]), ('still', [1, 2, 3, 0, 0, 90])):
+        scene_data.objects_data[object_name] = lib.data.object_data.ObjectData(
+            object_name, ('shapenet', shape), ('material', 'metal'), ('color', numpy.array([1.0, 0.0, 0.0, 1.0])),
+            ('scale', numpy.array([1.0, 1.0, 1.0])), numpy.array(pose, dtype=float))
+    scene_data.cameras_data['camera_0'] = lib.data.camera_data.CameraData('camera_0',
+                                                                          numpy.array([0, -5, 2, 70, 0, 0.0]))
+    return scene_data
+
+
+def get_trajectory_data():
+    # six scenes with a second key scene at the fourth, where the moving object changes shape
+    scene_names = [f'scene_{i_scene}' for i_scene in range(6)]
+    key_names = ['scene_0'] * 3 + ['scene_3'] * 3
+    poses = {'moving': [[0.1 * i_scene, 0, 0, 0, 0, 10 * i_scene] for i_scene in range(6)]}
+    return lib.data.trajectory_data.from_scenes([get_key_scene_data('scene_0', 'mug'),
+                                                 get_key_scene_data('scene_3', 'bowl')], scene_names, key_names, poses)
+
+
+def assert_scenes_equal(scene_data, expected_scene_data):
+    assert scene_data.name == expected_scene_data.name
+    assert scene_data.base_scene_blendfile == expected_scene_data.base_scene_blendfile
+    assert list(scene_data.objects_data) == list(expected_scene_data.objects_data)
+    for object_name, object_data in scene_data.objects_data.items():
+        expected_object_data = expected_scene_data.objects_data[object_name]
+        assert list(object_data.shape_pair) == list(expected_object_data.shape_pair)
+        assert numpy.array_equal(object_data.pose, expected_object_data.pose)
+    for camera_name, camera_data in scene_data.cameras_data.items():
+        assert numpy.array_equal(camera_data.pose, expected_scene_data.cameras_data[camera_name].pose)
+
+
+def test_expanded_scenes():
+    trajectory_data = get_trajectory_data()
+    assert list(trajectory_data) == [f'scene_{i_scene}' for i_scene in range(6)]
+    assert [trajectory_data[scene_name].reset_scene for scene_name in trajectory_data] == [True, False, False,
+                                                                                           True, False, False]
+    scene_data = trajectory_data['scene_4']
+    assert scene_data.objects_data['moving'].shape_pair[1] == 'bowl'
+    assert numpy.array_equal(scene_data.objects_data['moving'].pose, [0.4, 0, 0, 0, 0, 40])
+    # expanding a scene leaves its key scene alone
+    assert numpy.array_equal(trajectory_data['scene_3'].objects_data['moving'].pose, [0, 0, 0, 0, 0, 0])
+
+
+def test_object_round_trip():
+    trajectory_data = get_trajectory_data()
+    render_data = lib.data.render_data.RenderData('test', None, False, 64, 64, None, 'CPU', 16, 0, 4, ['rgba'])
+    render_data.scenes_data = trajectory_data
+    render_object = json.loads(json.dumps(lib.data.render_data.to_object(render_data)))
+    round_trip = lib.data.render_data.from_object(render_object, lib.data.render_data.RenderData).scenes_data
+
+    assert isinstance(round_trip, lib.data.trajectory_data.TrajectoryData)
+    assert list(round_trip) == list(trajectory_data)
+    assert round_trip.key_names == trajectory_data.key_names
+    for scene_name in trajectory_data:
+        assert_scenes_equal(round_trip[scene_name], trajectory_data[scene_name])
+        assert round_trip[scene_name].reset_scene == trajectory_data[scene_name].reset_scene
+
+
+def test_slice():
+    trajectory_data = get_trajectory_data()
+    for scene_start, scene_end in ((0, 6), (1, 4), (2, 6), (4, 5), (5, 5)):
+        slice_data = trajectory_data.get_slice(scene_start, scene_end)
+        scene_names = list(trajectory_data)[scene_start:scene_end]
+        assert list(slice_data) == scene_names
+        for i_scene, scene_name in enumerate(scene_names):
+            assert_scenes_equal(slice_data[scene_name], trajectory_data[scene_name])
+            # the first scene of a shard builds everything, later ones keep their own reset
+            assert slice_data[scene_name].reset_scene == (i_scene == 0 or trajectory_data[scene_name].reset_scene)
+    # slicing does not change the scenes of the trajectory
+    assert not trajectory_data['scene_1'].reset_scene
@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy
+
+import lib
+
+
+def render(render_data, output_dir, mode_engines, single_pass=False):
+    render_data.output_dir = output_dir
+    render_data.mode_engines = mode_engines
+    render_data.single_pass = single_pass
+    start_time = time.time()
+    lib.blend.blend_render(render_data)
+    return time.time() - start_time
+
+
+def compare(reference_dir, test_dir, render_data, tolerance):
+    mode_results = {}
+    for scene_name, scene_data in render_data.scenes_data.items():
+        for camera_name in scene_data.cameras_data:
+            for mode in render_data.modes:
+                output_file = lib.manifest.get_output_file(render_data, mode, scene_name, camera_name)
+                reference_path = os.path.join(reference_dir, render_data.name, output_file)
+                test_path = os.path.join(test_dir, render_data.name, output_file)
+                if mode == 'depth':
+                    reference = lib.depth.read_depth(os.path.splitext(reference_path)[0], render_data.depth_format)
+                    test = lib.depth.read_depth(os.path.splitext(test_path)[0], render_data.depth_format)
+                    is_background = reference > 1e6
+                    diff = numpy.where(is_background & (test > 1e6), 0, numpy.abs(reference - test))
+                    is_mismatched = diff > tolerance
+                else:
+                    reference = cv2.imread(reference_path, cv2.IMREAD_UNCHANGED).astype(float)
+                    test = cv2.imread(test_path, cv2.IMREAD_UNCHANGED).astype(float)
+                    if reference.ndim == 3:
+                        diff = numpy.max(numpy.abs(reference - test), axis=-1)
+                        is_mismatched = diff > tolerance
+                    else:
+                        # id segmentation, ids are labels and any other id is a mismatch
+                        is_mismatched = reference != test
+                        diff = is_mismatched.astype(float)
+
+                if mode not in mode_results:
+                    mode_results[mode] = {'n_images': 0, 'n_pixels': 0, 'n_mismatched_pixels': 0, 'max_diff': 0.0}
+                mode_results[mode]['n_images'] += 1
+                mode_results[mode]['n_pixels'] += diff.size
+                mode_results[mode]['n_mismatched_pixels'] += int(numpy.sum(is_mismatched))
+                mode_results[mode]['max_diff'] = max(mode_results[mode]['max_diff'], float(numpy.max(diff)))
+    return mode_results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--render_json', type=str, required=True)
+    parser.add_argument('--output_dir', type=str, default='./output/validate_engines/')
+    parser.add_argument('--modes', type=str, default=('nocs', 'segmentation', 'depth'), nargs='+')
+    parser.add_argument('--engine', type=str, default='BLENDER_WORKBENCH',
+                        choices=('CYCLES', 'BLENDER_EEVEE', 'BLENDER_WORKBENCH'))
+    # checks the single cycles pass instead of an engine, every generator's ground plane is a flat mesh for nocs
+    parser.add_argument('--single_pass', action='store_true')
+    parser.add_argument('--num_scenes', type=int, default=4)
+    parser.add_argument('--tolerance', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with open(args.render_json, 'r') as f:
+        render_data = lib.data.render_data.from_object(json.load(f), lib.data.render_data.RenderData)
+    render_data = lib.farm.get_shard_render_data(render_data, 0, args.num_scenes)
+    render_data.modes = args.modes
+    test_name = 'single_pass' if args.single_pass else args.engine
+
+    reference_dir = os.path.join(args.output_dir, 'CYCLES')
+    test_dir = os.path.join(args.output_dir, test_name)
+    reference_time = render(render_data, reference_dir, {})
+    if args.single_pass:
+        test_time = render(render_data, test_dir, {}, True)
+    else:
+        test_time = render(render_data, test_dir, {mode: args.engine for mode in args.modes})
+
+    mode_results = compare(reference_dir, test_dir, render_data, args.tolerance)
+    print(f'CYCLES: {reference_time:.3f} seconds, {test_name}: {test_time:.3f} seconds')
+    for mode, mode_result in mode_results.items():
+        print(f'{mode}: {mode_result["n_images"]} images,',
+              f'{mode_result["n_mismatched_pixels"]}/{mode_result["n_pixels"]} mismatched pixels,',
+              f'max difference {mode_result["max_diff"]:.6f}')
+
+    with open(os.path.join(args.output_dir, f'{render_data.name}_{test_name}.json'), 'w') as f:
+        json.dump({'reference_time': reference_time, 'test_time': test_time, 'modes': mode_results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()